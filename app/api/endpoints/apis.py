@@ -1,17 +1,17 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.crud import api as crud_api
 from app.schemas.api import Api, ApiCreate, ApiUpdate, ApiResponse
-from app.schemas import PaginatedResponse
+from app.schemas import CursorPaginatedResponse, PaginatedResponse
 from app.auth.dependencies import get_current_active_user, require_roles
 from app.models.usuario import Usuario
 
 router = APIRouter()
 
 
-@router.get("/", response_model=PaginatedResponse)
+@router.get("/", response_model=Union[PaginatedResponse, CursorPaginatedResponse])
 async def get_apis(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=1000),
@@ -20,11 +20,13 @@ async def get_apis(
     grupo: Optional[str] = Query(None),
     tipo_accion: Optional[int] = Query(None),
     activo: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None, description="Paginación por cursor: vacío para la primera página y luego next_cursor"),
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
     """
-    Obtener lista de APIs con paginación y filtros
+    Obtener lista de APIs con paginación y filtros.
+    Con ``cursor`` la paginación es por keyset y cada página cuesta lo mismo.
     """
     skip = (page - 1) * per_page
     limit = per_page
@@ -39,27 +41,32 @@ async def get_apis(
     if activo is not None:
         filters["activo"] = activo
     
-    if search:
-        apis = await crud_api.search_apis(
-            db, search_term=search, skip=skip, limit=limit
+    if cursor is not None:
+        try:
+            apis, next_cursor = await crud_api.get_multi_keyset(
+                db, limit=limit, cursor=cursor,
+                filters=None if search else filters, search_term=search
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return CursorPaginatedResponse(
+            items=[ApiResponse.model_validate(api) for api in apis],
+            per_page=per_page,
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None
         )
-        total = await crud_api.count_search(db, search_term=search)
-    else:
-        apis = await crud_api.get_multi(
-            db, skip=skip, limit=limit, filters=filters
-        )
-        total = await crud_api.count(db, filters=filters)
+
+    # Página y total en una sola consulta (COUNT(*) OVER())
+    apis, total = await crud_api.get_page(
+        db, skip=skip, limit=limit,
+        filters=None if search else filters, search_term=search
+    )
     
     
     
-    return PaginatedResponse(
-        items=[ApiResponse.model_validate(api) for api in apis],
-        total=total,
-        page=page,
-        per_page=per_page,
-        last_page=(total + per_page - 1) // per_page,
-        size=limit,
-        pages=(total + limit - 1) // limit
+    return PaginatedResponse.from_page(
+        [ApiResponse.model_validate(api) for api in apis],
+        total=total, page=page, per_page=per_page
     )
 
 
@@ -25,27 +25,17 @@ async def get_aplicaciones(
     if activo is not None:
         filters["activo"] = activo
 
-    if search:
-        aplicaciones = await crud_aplicacion.search_aplicaciones(
-            db, search_term=search, skip=skip, limit=limit
-        )
-        total = await crud_aplicacion.count_search(db, search_term=search)
-    else:
-        aplicaciones = await crud_aplicacion.get_multi(
-            db, skip=skip, limit=limit, filters=filters
-        )
-        total = await crud_aplicacion.count(db, filters=filters)
+    # Página y total en una sola consulta (COUNT(*) OVER())
+    aplicaciones, total = await crud_aplicacion.get_page(
+        db, skip=skip, limit=limit,
+        filters=None if search else filters, search_term=search
+    )
 
     
 
-    return PaginatedResponse(
-        items=[AplicacionResponse.model_validate(app) for app in aplicaciones],
-        total=total,
-        page=page,
-        per_page=per_page,
-        last_page=(total + per_page - 1) // per_page,
-        size=limit,
-        pages=(total + limit - 1) // limit
+    return PaginatedResponse.from_page(
+        [AplicacionResponse.model_validate(app) for app in aplicaciones],
+        total=total, page=page, per_page=per_page
     )
 
 
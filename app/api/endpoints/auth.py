@@ -1,21 +1,29 @@
-from datetime import datetime, timezone
-from typing import Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from app.auth.access_token import AccessTokenService
+from app.auth.login_persistence import LoginPersistenceService
+from app.auth.principal import load_principal
+from app.auth.refresh_rotation import RefreshRotationService
+from app.auth.refresh_singleflight import refresh_single_flight
 from app.auth.refresh_tokens import RefreshTokenService
+from app.auth.sessions import SessionService
+from app.core.config import settings
 from app.core.database import get_db
 from app.crud import usuario as crud_usuario
 from app.schemas.usuario import UsuarioLogin, UsuarioResponse
+from app.schemas.login_log import LoginLogPage
+from app.schemas.session import SessionResponse
 from app.auth.jwt_handler import (
     create_access_token,
     create_refresh_token,
     set_refresh_token,
-    hash_token,
     verify_token_hash
 )
+from app.auth.permission_claims import permission_claim
 from app.auth.user_data import get_user_complete_data, get_user_roles
 from app.auth.dependencies import get_current_active_user, verify_refresh_token
 from app.models.usuario import Usuario
@@ -32,6 +40,7 @@ async def login(
     request: Request,
     response: Response,
     user_credentials: UsuarioLogin,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -65,42 +74,23 @@ async def login(
     # Crear token JWT con todos los datos
     access_token = create_access_token(
         user_id=user.id,
-        roles=roles
+        roles=roles,
+        epoch=AccessTokenService.token_epoch_claim(user),
+        permissions=await permission_claim(db, [r["id_rol"] for r in roles_data])
     )
     refresh_token = create_refresh_token(
         user_id=user.id
     )
     
     try:
-        # Guardar access token en BD
-        await AccessTokenService.save_access_token(
+        # Revocar el refresh token del dispositivo y guardar los nuevos tokens
+        await LoginPersistenceService.persist_login(
             db=db,
             user_id=user.id,
-            jti=access_token["jti"],
-            expires_at=access_token["expires_at"]
+            access_token=access_token,
+            refresh_token=refresh_token,
+            session=session
         )
-
-        # Revocar cualquier token activo en el mismo dispositivo
-        await RefreshTokenService.revoke_refresh_token_by_device(db=db,
-                                                            device_id=session.device_id
-                                                            )
-        # Guardar refresh token en base de datos
-        await RefreshTokenService.save_refresh_token(db=db,
-                            user_id=user.id,
-                            token_jti=refresh_token["jti"],
-                            token_hash=hash_token(refresh_token["token"]),
-                            expires_at=refresh_token["expires_at"],
-                            ip=session.ip,
-                            user_agent=session.user_agent,
-                            device_id=session.device_id
-                            )
-            
-        # Log de login 
-        await LogLoginService.create_log(
-            user_id=user.id,
-            session_data=session
-        )
-        
         await db.commit()
     except Exception as e:
         # revierte la transaccion si hay error al guardar el token
@@ -110,6 +100,9 @@ async def login(
                 detail=f"Error al registrar el refresh token en BD: {e}"
         )
 
+    # Log de login fuera de la transacción, después de enviar la respuesta
+    background_tasks.add_task(LogLoginService.create_log, user_id=user.id, session_data=session)
+
     # Guardar el refresh token en cookies del usuario
     set_refresh_token(response=response, refresh_token=refresh_token["token"])
 
@@ -136,70 +129,90 @@ async def refresh_access_token(
     user_id = int(refresh_token["payload"].get("sub"))
     token_id = refresh_token["payload"].get("jti")
 
-    # Buscar token en BD
-    stored_token = await RefreshTokenService.get_refresh_token_id(db, token_jti=token_id)
+    # Peticiones concurrentes con el mismo token comparten una sola rotación
+    tokens = await refresh_single_flight.run(
+        token_id,
+        refresh_token["refresh_token"],
+        lambda: _rotate_refresh_token(db, request, user_id, token_id, refresh_token["refresh_token"])
+    )
 
-    # Validar propietario del token
-    if not stored_token or stored_token.user_id != user_id:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token invalido")
-        
-    # Validar hash del refresh token
-    if  not verify_token_hash(refresh_token["refresh_token"], stored_token.token_hash):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token invalido")
+    # Guardar el nuevo refresh token en cookies del usuario
+    set_refresh_token(response=response, refresh_token=tokens["refresh_token"])
     
-    # Validar si se intenta usar un token revocado
-    try:
-        if stored_token.is_revoked:
-            await RefreshTokenService.revoke_refresh_tokens_by_user(db, user_id=user_id)
-            db.commit()
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token revocado")
-    except Exception:
-        await db.rollback()
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error interno al procesar el refresh token")
-            
+    return {
+        "access_token": tokens["access_token"],
+        "token_type": "Bearer",
+    }
+
+
+async def _rotate_refresh_token(
+    db: AsyncSession,
+    request: Request,
+    user_id: int,
+    token_id: str,
+    presented_token: str
+) -> Dict[str, str]:
+    """
+    Rotar el refresh token y emitir un nuevo access token.
+    Retorna los tokens emitidos; lanza HTTPException si el token no es válido.
+    """
+    # Usuario y roles en una sola consulta
+    principal, _ = await load_principal(db, user_id=user_id)
+    if principal is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token invalido")
 
     # Obtener datos de la sesion 
     session = get_session_context(request)
 
-    # Obtener roles
-    roles_data = await get_user_roles(db, user_id=user_id)
-    roles = [r["nombre"] for r in roles_data]
-    
     # Crear token JWT con todos los datos
     access_token = create_access_token(
         user_id=user_id,
-        roles=roles
+        roles=principal.role_names,
+        epoch=AccessTokenService.token_epoch_claim(principal.user),
+        permissions=await permission_claim(db, principal.role_ids)
     )
 
     # Rotar tokens: crea un nuevo refresh token
     new_refresh_token = create_refresh_token(user_id=user_id)
 
-    # Guardar el nuevo refresh token en cookies del usuario
-    set_refresh_token(response=response, refresh_token=new_refresh_token["token"])
-    
     try:
-        # Guardar access token en BD
-        await AccessTokenService.save_access_token(
-            db=db,
+        # Consumir el token anterior y guardar sus sucesores en una operación atómica
+        used_token = await RefreshRotationService.rotate(
+            db,
             user_id=user_id,
-            jti=access_token["jti"],
-            expires_at=access_token["expires_at"]
+            token_jti=token_id,
+            token=presented_token,
+            access_token=access_token,
+            refresh_token=new_refresh_token,
+            session=session
         )
 
-        # Marca el anterior token como usado
-        await RefreshTokenService.revoke_refresh_token(db, stored_token.id)
-        
-        # Guardar nuevo refresh token en base de datos 
-        await RefreshTokenService.save_refresh_token(db=db,
-                                user_id= user_id,
-                                token_jti=new_refresh_token["jti"],
-                                token_hash=hash_token(new_refresh_token["token"]),
-                                expires_at=new_refresh_token["expires_at"],
-                                ip=session.ip,
-                                user_agent=session.user_agent,
-                                device_id=session.device_id
-                                )
+        if used_token is None:
+            revoked_at = await RefreshRotationService.revoked_at(db, user_id=user_id, token_jti=token_id)
+            if revoked_at is None:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token invalido")
+
+            # Rotado hace instantes por otra petición (otra pestaña en otro worker)
+            grace = timedelta(seconds=settings.refresh_grace_seconds)
+            if revoked_at >= datetime.now(timezone.utc) - grace:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="El refresh token acaba de rotarse, reintente con la sesión actual"
+                )
+
+            # Token ya usado: posible robo, se revocan todas las sesiones del usuario
+            await RefreshTokenService.revoke_refresh_tokens_by_user(db, user_id=user_id)
+            await db.commit()
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token revocado")
+
+        # Validar hash del refresh token
+        if not verify_token_hash(presented_token, used_token.token_hash):
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token invalido")
+
         await db.commit()
+    except HTTPException:
+        raise
     except Exception as e:
         # revierte la transaccion si hay error al guardar el token
         await db.rollback()
@@ -207,10 +220,10 @@ async def refresh_access_token(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al registrar el refresh token en BD: {e}"
         )
-    
+
     return {
         "access_token": access_token["token"],
-        "token_type": "Bearer",
+        "refresh_token": new_refresh_token["token"],
     }
 
 
@@ -218,6 +231,7 @@ async def refresh_access_token(
 async def login_form(
     request: Request,
     response: Response,
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
 ):
@@ -260,7 +274,9 @@ async def login_form(
     # Crear token JWT con todos los datos
     access_token = create_access_token(
         user_id=user.id,
-        roles=roles
+        roles=roles,
+        epoch=AccessTokenService.token_epoch_claim(user),
+        permissions=await permission_claim(db, [r["id_rol"] for r in roles_data])
     )
     refresh_token = create_refresh_token(
         user_id=user.id
@@ -270,35 +286,14 @@ async def login_form(
     set_refresh_token(response=response, refresh_token=refresh_token["token"])
     
     try:
-        # Guardar access token en BD
-        await AccessTokenService.save_access_token(
+        # Revocar el refresh token del dispositivo y guardar los nuevos tokens
+        await LoginPersistenceService.persist_login(
             db=db,
             user_id=user.id,
-            jti=access_token["jti"],
-            expires_at=access_token["expires_at"]
-        )
-        
-        # Revocar cualquier token activo en el mismo dispositivo
-        await RefreshTokenService.revoke_refresh_token_by_device(db=db,
-                                                            device_id=session.device_id
-                                                            )
-        # Guardar refresh token en base de datos
-        await RefreshTokenService.save_refresh_token(db=db,
-                            user_id=user.id,
-                            token_jti=refresh_token["jti"],
-                            token_hash=hash_token(refresh_token["token"]),
-                            expires_at=refresh_token["expires_at"],
-                            ip=session.ip,
-                            user_agent=session.user_agent,
-                            device_id=session.device_id
-                            )
-            
-        # Log de login 
-        await LogLoginService.create_log(
-            user_id=user.id,
-            session_data=session
+            access_token=access_token,
+            refresh_token=refresh_token,
+            session=session
         )
-        
         await db.commit()
     except Exception as e:
         # revierte la transaccion si hay error al guardar el token
@@ -308,6 +303,9 @@ async def login_form(
                 detail=f"Error al registrar el refresh token en BD: {e}"
         )
 
+    # Log de login fuera de la transacción, después de enviar la respuesta
+    background_tasks.add_task(LogLoginService.create_log, user_id=user.id, session_data=session)
+
     return {
         "access_token": access_token["token"],
         "token_type": "Bearer",
@@ -348,6 +346,76 @@ async def get_current_user_complete(
     return user_data
 
 
+@router.get("/me/logins", response_model=LoginLogPage, summary ="Historial de inicios de sesión del usuario actual")
+async def get_current_user_logins(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en next_cursor"),
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Obtener los inicios de sesión del usuario, más recientes primero (paginación por cursor)
+    """
+    try:
+        logs, next_cursor = await LogLoginService.list_by_user(
+            db, user_id=current_user.id, limit=limit, cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+    return LoginLogPage(items=logs, next_cursor=next_cursor)
+
+
+@router.get("/me/sessions", response_model=List[SessionResponse], summary ="Sesiones activas del usuario actual")
+async def get_current_user_sessions(
+    request: Request,
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Listar las sesiones activas (una por dispositivo), marcando la de la petición actual
+    """
+    current_device = get_session_context(request).device_id
+    sessions = await SessionService.list_sessions(db, user_id=current_user.id)
+    return [
+        SessionResponse(
+            id=s.device_id,
+            ip=s.ip,
+            user_agent=s.user_agent,
+            created_at=s.created_at,
+            expires_at=s.expires_at,
+            current=s.device_id == current_device
+        )
+        for s in sessions
+    ]
+
+
+@router.delete("/me/sessions/{session_id}", summary ="Cerrar una sesión del usuario actual")
+async def revoke_current_user_session(
+    session_id: str,
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cerrar la sesión de un dispositivo: su refresh token deja de ser válido
+    """
+    try:
+        revoked = await SessionService.revoke_session(db, user_id=current_user.id, device_id=session_id)
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error interno al cerrar la sesión: {e}"
+        )
+
+    if not revoked:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sesión no encontrada")
+    return {"message": "Sesión cerrada correctamente"}
+
+
 @router.get("/logout", summary ="Cerrar sesión del usuario actual")
 async def logout(
     response: Response,
@@ -7,10 +7,12 @@ Fecha: 2025-01-18
 from typing import Dict, Any, Optional
 from fastapi import APIRouter, HTTPException, Request, status, Depends, Response
 from fastapi.responses import RedirectResponse
+from starlette.background import BackgroundTask
 import httpx
 import urllib.parse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth.access_token import AccessTokenService
+from app.auth.login_persistence import LoginPersistenceService
 from app.core.database import get_db
 from app.crud import usuario as crud_usuario
 from app.crud.crud_cuenta_social import cuenta_social as crud_cuenta_social
@@ -18,11 +20,10 @@ from app.schemas.cuenta_social import GoogleUser
 from app.auth.jwt_handler import (
     create_access_token,
     create_refresh_token,
-    set_refresh_token,
-    hash_token
+    set_refresh_token
 )
+from app.auth.permission_claims import permission_claim
 from app.auth.user_data import get_user_roles
-from app.auth.refresh_tokens import RefreshTokenService
 import secrets
 from app.core.config import settings
 from app.utils.Logs_login_service import LogLoginService
@@ -231,42 +232,23 @@ async def google_authenticate(
     # Generar tokens
     access_token = create_access_token(
         user_id=user.id,
-        roles=roles
+        roles=roles,
+        epoch=AccessTokenService.token_epoch_claim(user),
+        permissions=await permission_claim(db, [r["id_rol"] for r in roles_data])
     )
     refresh_token = create_refresh_token(
         user_id=user.id
     )
 
     try:
-        # Guardar access token en BD
-        await AccessTokenService.save_access_token(
+        # Revocar el refresh token del dispositivo y guardar los nuevos tokens
+        await LoginPersistenceService.persist_login(
             db=db,
             user_id=user.id,
-            jti=access_token["jti"],
-            expires_at=access_token["expires_at"]
+            access_token=access_token,
+            refresh_token=refresh_token,
+            session=session
         )
-        
-        # Revocar cualquier token activo en el mismo dispositivo
-        await RefreshTokenService.revoke_refresh_token_by_device(db=db,
-                                                            device_id=session.device_id
-                                                            )
-        # Guardar refresh token en base de datos
-        await RefreshTokenService.save_refresh_token(db=db,
-                            user_id=user.id,
-                            token_jti=refresh_token["jti"],
-                            token_hash=hash_token(refresh_token["token"]),
-                            expires_at=refresh_token["expires_at"],
-                            ip=session.ip,
-                            user_agent=session.user_agent,
-                            device_id=session.device_id
-                            )
-            
-        # Log de login 
-        await LogLoginService.create_log(
-            user_id=user.id,
-            session_data=session
-        )
-        
         await db.commit()
     except Exception as e:
         # revierte la transaccion si hay error al guardar el token
@@ -276,7 +258,11 @@ async def google_authenticate(
                 detail=f"Error al registrar el refresh token en BD: {e}"
         )
     
-    redirect = RedirectResponse("http://localhost:4200/callback?access_token=" + access_token["token"] + "&token_type=Bearer")
+    # Log de login fuera de la transacción, después de enviar la respuesta
+    redirect = RedirectResponse(
+        "http://localhost:4200/callback?access_token=" + access_token["token"] + "&token_type=Bearer",
+        background=BackgroundTask(LogLoginService.create_log, user_id=user.id, session_data=session)
+    )
 
     
     # Guardar el refresh token en cookies del usuario
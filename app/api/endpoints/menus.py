@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,7 +6,7 @@ from sqlalchemy import select, and_
 from app.core.database import get_db
 from app.crud import menu as crud_menu
 from app.schemas.menu import MenuCreate, MenuUpdate, MenuResponse
-from app.schemas import PaginatedResponse
+from app.schemas import CursorPaginatedResponse, PaginatedResponse
 from app.auth.dependencies import require_roles, get_current_active_user
 from app.models.usuario import Usuario
 
@@ -26,7 +26,7 @@ def _build_tree(menu_list):
         return tree
 
 
-@router.get("/", response_model=PaginatedResponse, summary="Obtener menús con paginación y filtros")
+@router.get("/", response_model=Union[PaginatedResponse, CursorPaginatedResponse], summary="Obtener menús con paginación y filtros")
 async def get_menus(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=1000),
@@ -35,11 +35,13 @@ async def get_menus(
     padre: Optional[int] = Query(None),
     visible: Optional[int] = Query(None),
     activo: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None, description="Paginación por cursor: vacío para la primera página y luego next_cursor"),
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
     """
-    Obtener lista de menús con paginación y filtros
+    Obtener lista de menús con paginación y filtros.
+    Con ``cursor`` la paginación es por keyset y cada página cuesta lo mismo.
     """
     skip = (page - 1) * per_page
     limit = per_page
@@ -53,27 +55,32 @@ async def get_menus(
     if activo is not None:
         filters["activo"] = activo
     
-    if search:
-        menus = await crud_menu.search_menus(
-            db, search_term=search, skip=skip, limit=limit
-        )
-        total = await crud_menu.count_search(db, search_term=search)
-    else:
-        menus = await crud_menu.get_multi(
-            db, skip=skip, limit=limit, filters=filters, order_by="orden"
+    if cursor is not None:
+        try:
+            menus, next_cursor = await crud_menu.get_multi_keyset(
+                db, limit=limit, cursor=cursor,
+                filters=None if search else filters, search_term=search, order_by="orden"
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return CursorPaginatedResponse(
+            items=[MenuResponse.model_validate(menu) for menu in menus],
+            per_page=per_page,
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None
         )
-        total = await crud_menu.count(db, filters=filters)
+
+    # Página y total en una sola consulta (COUNT(*) OVER())
+    menus, total = await crud_menu.get_page(
+        db, skip=skip, limit=limit,
+        filters=None if search else filters, search_term=search, order_by="orden"
+    )
     
     
     
-    return PaginatedResponse(
-        items=[MenuResponse.model_validate(menu) for menu in menus],
-        total=total,
-        page=page,
-        per_page=per_page,
-        last_page=(total + per_page - 1) // per_page,
-        size=limit,
-        pages=(total + limit - 1) // limit
+    return PaginatedResponse.from_page(
+        [MenuResponse.model_validate(menu) for menu in menus],
+        total=total, page=page, per_page=per_page
     )
 
 
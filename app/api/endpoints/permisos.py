@@ -1,7 +1,7 @@
 from typing import List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import insert, select
+from sqlalchemy import select
 from app.core.database import get_db
 from app.crud import permiso_menu as crud_permiso_menu
 from app.crud import permiso_api as crud_permiso_api
@@ -13,7 +13,8 @@ from app.schemas.permiso import (
     PermisoMenuUpdate, PermisoApiCreate, PermisoApiResponse, PermisoApiDelete, PermisoApiBulkSave
 )
 from app.auth.dependencies import get_current_active_user, require_roles
-from app.models.permiso import PermisoMenu, PermisoApi
+from app.auth.permission_index import permission_index
+from app.auth.revocation_bus import revocation_bus
 from app.models.usuario import Usuario
 from app.models.menu import Menu
 from app.models.api import Api
@@ -202,7 +203,7 @@ async def guardar_permisos_menu_bulk(
     
     # Crear nuevos permisos    
     data_to_insert = [{"rol_id": rol_id, "menu_id": m_id, "id_persona": current_user.id} for m_id in menus_find]
-    await db.execute(insert(PermisoMenu), data_to_insert)    
+    await crud_permiso_menu.create_many(db, objs_in=data_to_insert, returning=False, commit=False)
     await db.commit()
     
     return {
@@ -395,8 +396,12 @@ async def guardar_permisos_api_bulk(
     
     # Crear nuevos permisos    
     data_to_insert = [{"rol_id": rol_id, "api_id": a_id, "id_persona": current_user.id} for a_id in apis_find]
-    await db.execute(insert(PermisoApi), data_to_insert)    
+    await crud_permiso_api.create_many(db, objs_in=data_to_insert, returning=False, commit=False)
+    # El insert masivo no dispara eventos ORM: avisar a los demás workers e
+    # invalidar el rol explícitamente
+    await revocation_bus.publish_permissions_async(db, "rol", rol_id)
     await db.commit()
+    permission_index.invalidate_role(rol_id)
     
     return {
         "message": "Permisos guardados exitosamente",
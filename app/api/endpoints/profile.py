@@ -5,7 +5,7 @@ from app.models.usuario import Usuario
 from app.schemas.profile import UpdateProfileRequest, ChangePasswordRequest, ProfileResponse
 from app.auth.dependencies import get_current_active_user
 from app.crud import usuario as crud_usuario
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 from app.services.storage_service import send_file_to_external_service
 
 router = APIRouter()
@@ -114,7 +114,7 @@ async def change_password(
     """
     try:
         # Verificar contraseña actual
-        if not verify_password(password_data.current_password, current_user.hash_clave):
+        if not await verify_password_async(password_data.current_password, current_user.hash_clave):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="La contraseña actual es incorrecta"
@@ -128,7 +128,7 @@ async def change_password(
             )
         
         # Actualizar contraseña
-        hashed_password = get_password_hash(password_data.new_password)
+        hashed_password = await get_password_hash_async(password_data.new_password)
         await crud_usuario.update(db, db_obj=current_user, obj_in={"hash_clave": hashed_password})
         
         return ProfileResponse(
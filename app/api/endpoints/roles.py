@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
@@ -6,25 +6,27 @@ from app.crud import rol as crud_rol
 from app.crud import permiso_menu as crud_permiso_menu
 from app.crud import permiso_api as crud_permiso_api
 from app.schemas.rol import Rol, RolCreate, RolUpdate, RolResponse
-from app.schemas import PaginatedResponse
+from app.schemas import CursorPaginatedResponse, PaginatedResponse
 from app.auth.dependencies import get_current_active_user, require_roles
 from app.models.usuario import Usuario
 
 router = APIRouter()
 
 
-@router.get("/", response_model=PaginatedResponse)
+@router.get("/", response_model=Union[PaginatedResponse, CursorPaginatedResponse])
 async def get_roles(
     page: int = Query(0, ge=0),
     per_page: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
     id_aplicacion: Optional[int] = Query(None),
     activo: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None, description="Paginación por cursor: vacío para la primera página y luego next_cursor"),
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
     """
-    Obtener lista de roles con paginación y filtros
+    Obtener lista de roles con paginación y filtros.
+    Con ``cursor`` la paginación es por keyset y cada página cuesta lo mismo.
     """
     # Convertir page y per_page a skip y limit si se reciben como query params
     skip = (page - 1) * per_page
@@ -37,26 +39,31 @@ async def get_roles(
     else:
         filters["activo"] = 1
     
-    if search:
-        roles = await crud_rol.search_roles(
-            db, search_term=search, skip=skip, limit=limit
-        )
-        total = await crud_rol.count_search(db, search_term=search)
-    else:
-        roles = await crud_rol.get_multi(
-            db, skip=skip, limit=limit, filters=filters
+    if cursor is not None:
+        try:
+            roles, next_cursor = await crud_rol.get_multi_keyset(
+                db, limit=limit, cursor=cursor,
+                filters=None if search else filters, search_term=search
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return CursorPaginatedResponse(
+            items=[RolResponse.model_validate(rol) for rol in roles],
+            per_page=per_page,
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None
         )
-        total = await crud_rol.count(db, filters=filters)
+
+    # Página y total en una sola consulta (COUNT(*) OVER())
+    roles, total = await crud_rol.get_page(
+        db, skip=skip, limit=limit,
+        filters=None if search else filters, search_term=search
+    )
     
     
-    return PaginatedResponse(
-        items=[RolResponse.model_validate(rol) for rol in roles],
-        total=total,
-        page=page,
-        per_page=per_page,
-        last_page=(total + per_page - 1) // per_page,
-        size=limit,
-        pages=(total + limit - 1) // limit
+    return PaginatedResponse.from_page(
+        [RolResponse.model_validate(rol) for rol in roles],
+        total=total, page=page, per_page=per_page
     )
 
 
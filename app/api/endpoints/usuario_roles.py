@@ -2,16 +2,17 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import insert, select
+from sqlalchemy import select
 from app.core.database import get_db
 from app.crud import usuario_rol as crud_usuario_rol
 from app.crud import usuario as crud_usuario
 from app.schemas.usuario_rol import UsuarioRolCreate, UsuarioRolUpdate, UsuarioRolResponse
 from app.schemas import PaginatedResponse
 from app.auth.dependencies import get_current_active_user, require_roles
+from app.auth.token_cache import access_token_cache
+from app.auth.revocation_bus import revocation_bus
 from app.models.usuario import Usuario
 from app.models.rol import Rol
-from app.models.usuario_rol import UsuarioRol
 from app.schemas.usuario_rol import UsuarioRolBulkAssignRequest, UsuarioRolResponse
 
 router = APIRouter()
@@ -25,16 +26,10 @@ async def get_usuario_roles(
 ):
     skip = (page - 1) * per_page
     limit = per_page
-    usuario_roles = await crud_usuario_rol.get_multi(db, skip=skip, limit=limit)
-    total = await crud_usuario_rol.count(db)
-    return PaginatedResponse(
-        items=[UsuarioRolResponse.model_validate(ur) for ur in usuario_roles],
-        total=total,
-        page=page,
-        per_page=per_page,
-        last_page=(total + per_page - 1) // per_page,
-        size=limit,
-        pages=(total + limit - 1) // limit
+    usuario_roles, total = await crud_usuario_rol.get_page(db, skip=skip, limit=limit)
+    return PaginatedResponse.from_page(
+        [UsuarioRolResponse.model_validate(ur) for ur in usuario_roles],
+        total=total, page=page, per_page=per_page
     )
 
 @router.get("/all", response_model=List[UsuarioRolResponse])
@@ -147,8 +142,12 @@ async def bulk_assign_roles_to_usuario(
                     "id_rol": r_id,
                     "id_persona": current_user.id
                     } for r_id in roles_find]
-                await db.execute(insert(UsuarioRol), data_to_insert)
+                await crud_usuario_rol.create_many(db, objs_in=data_to_insert, returning=False, commit=False)
+        # El insert masivo no dispara eventos ORM: invalidar el principal cacheado
+        # en los demás workers (al confirmar) y en este
+        await revocation_bus.publish_user_change_async(db, bulk_assign.id_usuario)
         await db.commit()
+        access_token_cache.forget_user(bulk_assign.id_usuario)
     except Exception as e:
         await db.rollback()
         raise HTTPException(
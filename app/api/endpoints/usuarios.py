@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
@@ -11,7 +11,7 @@ from app.schemas.usuario import (
     Usuario, UsuarioChangePasswordAdmin, UsuarioCreate, UsuarioUpdate, UsuarioResponse, 
     UsuarioChangePassword
 )
-from app.schemas import PaginatedResponse
+from app.schemas import CursorPaginatedResponse, PaginatedResponse
 from app.auth.dependencies import get_current_active_user, require_roles
 from app.models.usuario import Usuario as UsuarioModel
 from fastapi import File, UploadFile, Form
@@ -22,17 +22,19 @@ from sqlalchemy import select
 router = APIRouter()
 
 
-@router.get("/", response_model=PaginatedResponse)
+@router.get("/", response_model=Union[PaginatedResponse, CursorPaginatedResponse])
 async def get_usuarios(
     page: int = Query(1, ge=1),
     per_page: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
     activo: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None, description="Paginación por cursor: vacío para la primera página y luego next_cursor"),
     db: AsyncSession = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
     """
-    Obtener lista de usuarios con paginación y filtros
+    Obtener lista de usuarios con paginación y filtros.
+    Con ``cursor`` la paginación es por keyset y cada página cuesta lo mismo.
     """
     skip = (page - 1) * per_page
     limit = per_page
@@ -41,64 +43,58 @@ async def get_usuarios(
         filters["activo"] = activo
     else:
         filters["activo"] = 1
-    # Si hay término de búsqueda, usar búsqueda avanzada
-    if search:
-        usuarios = await crud_usuario.search_users(
-            db, search_term=search, skip=skip, limit=limit
-        )
-        total = await crud_usuario.count_search(db, search_term=search)
+    next_cursor = None
+    if cursor is not None:
+        try:
+            usuarios, next_cursor = await crud_usuario.get_multi_keyset(
+                db, limit=limit, cursor=cursor,
+                filters=None if search else filters, search_term=search
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     else:
-        usuarios = await crud_usuario.get_multi(
-            db, skip=skip, limit=limit, filters=filters
+        # Página y total en una sola consulta (COUNT(*) OVER())
+        usuarios, total = await crud_usuario.get_page(
+            db, skip=skip, limit=limit,
+            filters=None if search else filters, search_term=search
         )
-        total = await crud_usuario.count(db, filters=filters)
 
     items = []
-    # Si no hay usuarios, retornar paginación vacía
-    if not usuarios:
-            return PaginatedResponse(
-                items=items,
-                total=total,
-                page=page,
-                per_page=per_page,
-                last_page=(total + per_page - 1) // per_page,
-                size=limit,
-                pages=(total + limit - 1) // limit
-            )
-        
     # Construir lista de usuarios con roles y aplicaciones
-    usuarios_out = [UsuarioResponse.model_validate(u) for u in usuarios]
-
-    user_ids = [u.id for u in usuarios_out]
-
-    roles_map = await get_users_roles_map(db, user_ids)
-
-    role_ids = {
-        rol["id_rol"]
-        for roles in roles_map.values()
-        for rol in roles
-    }
-
-    applications = []
-    if role_ids:
-        applications = await get_roles_aplicaciones_map(db, list(role_ids))
+    if usuarios:
+        usuarios_out = [UsuarioResponse.model_validate(u) for u in usuarios]
+
+        user_ids = [u.id for u in usuarios_out]
+
+        roles_map = await get_users_roles_map(db, user_ids)
+
+        role_ids = {
+            rol["id_rol"]
+            for roles in roles_map.values()
+            for rol in roles
+        }
+
+        applications = []
+        if role_ids:
+            applications = await get_roles_aplicaciones_map(db, list(role_ids))
+
+        for user in usuarios_out:
+            data = user.model_dump()
+            data["roles"] = roles_map.get(user.id, [])
+            data["aplicaciones"] = applications
+            items.append(data)
+
+    if cursor is not None:
+        return CursorPaginatedResponse(
+            items=items,
+            per_page=per_page,
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None
+        )
 
-    items = []
-    for user in usuarios_out:
-        data = user.model_dump()
-        data["roles"] = roles_map.get(user.id, [])
-        data["aplicaciones"] = applications
-        items.append(data)
-
-
-    return PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        per_page=per_page,
-        last_page=(total + per_page - 1) // per_page,
-        size=limit,
-        pages=(total + limit - 1) // limit
+    return PaginatedResponse.from_page(
+        items,
+        total=total, page=page, per_page=per_page
     )
 
 
@@ -248,7 +244,7 @@ async def change_password(
     Cambiar contraseña del usuario actual
     """
     # Verificar contraseña actual
-    if not crud_usuario.verify_password(password_data.current_password, current_user.hash_clave):
+    if not await crud_usuario.verify_password(password_data.current_password, current_user.hash_clave):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Contraseña actual incorrecta"
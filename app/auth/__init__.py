@@ -9,11 +9,13 @@ from app.auth.jwt_handler import (
     verify_token_hash
 )
 from app.auth.dependencies import (
+    get_current_principal,
     get_current_user,
     get_current_active_user,
     verify_refresh_token,
     require_roles,
-    require_permissions
+    require_permissions,
+    require_route_permission
 )
 from app.auth.user_data import (
     get_user_roles,
@@ -34,11 +36,13 @@ __all__ = [
     "set_refresh_token",
     "hash_token",
     "verify_token_hash",
+    "get_current_principal",
     "get_current_user",
     "get_current_active_user",
     "verify_refresh_token",
     "require_roles",
     "require_permissions",
+    "require_route_permission",
     "get_user_roles",
     "get_user_complete_data",
     "get_users_roles_map",
@@ -1,8 +1,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import update
-from datetime import datetime, timezone
-from app.models.access_token import AccessToken
+from datetime import datetime
+from app.core.config import settings
+from app.models.usuario import Usuario
+from app.auth.revocation_bus import revocation_bus
+from app.auth.token_cache import access_token_cache
+from app.auth.token_store import token_store
 
 
 class AccessTokenService():
@@ -13,43 +17,48 @@ class AccessTokenService():
                                 ) -> None:
         """
         Guarda un nuevo access token en la base de datos.
+        En modo epoch no se persiste nada: el token se valida por su claim ``epc``.
         """
-        entity = AccessToken(
-            user_id=user_id,
-            jti=jti,
-            expires_at=expires_at
-        )
+        if settings.access_token_mode == "epoch":
+            return
 
-        db.add(entity)
+        await token_store.save_access_token(db, user_id=user_id, jti=jti, expires_at=expires_at)
         #await db.commit()
 
-    async def get_access_token_id(db: AsyncSession, jti: str) -> AccessToken | None:
-        result = await db.execute(select(AccessToken)
-                                  .where(AccessToken.jti == jti)
-                                  )
-        return result.scalar_one_or_none()
+    def token_epoch_claim(user: Usuario) -> int | None:
+        """
+        Epoch a incluir en un nuevo access token (None en modo stateful).
+        """
+        if settings.access_token_mode != "epoch":
+            return None
+        return user.token_epoch or 0
 
-    async def revoke_access_token(db: AsyncSession, token_id: int) -> AccessToken | None:
+    async def get_token_epoch(db: AsyncSession, user_id: int) -> int | None:
         """
-        Marca un access token específico como revocado.
+        Igual que token_epoch_claim cuando solo se conoce el id del usuario.
+        Usa el snapshot en cache antes de consultar la BD.
         """
-        result = await db.execute(select(AccessToken).where(AccessToken.id == token_id))
-        token = result.scalars().first()
-        if not token:
+        if settings.access_token_mode != "epoch":
             return None
-        
-        # Marcar como revocado
-        token.is_revoked = True
-        token.revoked_at = datetime.now(timezone.utc)
-        
-        return token
+
+        epoch = access_token_cache.get_user_epoch(user_id)
+        if epoch is None:
+            result = await db.execute(select(Usuario.token_epoch).where(Usuario.id == user_id))
+            epoch = result.scalar_one_or_none()
+        return epoch or 0
 
     async def revoke_access_tokens_by_user(db: AsyncSession, user_id: int):
         """
         Marca todos los access tokens de un usuario como revocados.
+        Incrementa además su token_epoch, lo que invalida los tokens sin estado.
         """
-        await db.execute(update(AccessToken)
-                        .where(AccessToken.user_id == user_id, AccessToken.is_revoked == False)
-                        .values(is_revoked=True, revoked_at=datetime.now(timezone.utc))
+        await token_store.revoke_access_tokens_by_user(db, user_id)
+        await db.execute(update(Usuario)
+                        .where(Usuario.id == user_id)
+                        .values(token_epoch=Usuario.token_epoch + 1,
+                                updated_at=Usuario.updated_at)
                         )
+        access_token_cache.revoke_user(user_id)
+        # Los demás workers descartan su cache al confirmarse la transacción
+        await revocation_bus.publish(db, user_id)
         
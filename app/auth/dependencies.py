@@ -1,13 +1,17 @@
 from typing import Optional
-from fastapi import Depends, HTTPException, Request, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError
 import jwt
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.auth.access_token import AccessTokenService
+from app.auth.permission_claims import bitset_allows, is_stale, token_api_bitset
+from app.auth.permission_index import permission_index
+from app.auth.principal import Principal, TOKEN_REVOKED, TOKEN_VALID, load_principal
+from app.auth.token_cache import access_token_cache
+from app.auth.token_store import token_store
 from app.core.database import get_db
 from app.crud import usuario as crud_usuario
 from app.auth.jwt_handler import verify_token
+from app.auth.signing import keyring
 from app.models.usuario import Usuario
 from app.core.config import settings
 
@@ -15,11 +19,20 @@ from app.core.config import settings
 security = HTTPBearer()
 
 
-async def get_current_user(
+async def get_current_principal(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
-) -> Usuario:
-    """Obtener el usuario actual desde el token JWT"""
+) -> Principal:
+    """
+    Resolver el principal (usuario + roles) desde el token JWT.
+    Se memoriza en request.state, y en el caso común sale del cache del
+    worker sin consultar la BD; si no, se resuelve en un único SELECT.
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
@@ -29,25 +42,69 @@ async def get_current_user(
     try:
         # Verificar el token
         payload = verify_token(credentials.credentials)
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+        user_id = int(payload.get("sub"))
         
-        # Verificar que el access token no este revocado
+        # Tokens sin estado (claim epc): se validan contra el epoch del usuario
+        token_epoch = payload.get("epc")
+
+        # Verificar que el access token no este revocado (cache primero)
         jti: str = payload.get("jti")
-        stored_token = await AccessTokenService.get_access_token_id(db, jti)
-        if stored_token is None or stored_token.is_revoked:
+        cached = None
+        if token_epoch is None and settings.auth_cache_enabled:
+            cached = access_token_cache.is_valid(jti)
+        if cached is False:
             raise credentials_exception
+        check_jti = token_epoch is None and cached is None
+
+        if check_jti and not token_store.joins_principal:
+            # El estado vive fuera de la BD (Redis, memoria): consulta aparte
+            state = await token_store.access_token_state(db, user_id=user_id, jti=jti)
+            if state is not True:
+                if state is False and settings.auth_cache_enabled:
+                    access_token_cache.remember_revoked(jti, payload["exp"])
+                raise credentials_exception
+            if settings.auth_cache_enabled:
+                access_token_cache.remember_valid(jti, user_id, payload["exp"])
+            check_jti = False
+
+        snapshot = None
+        if not check_jti and settings.auth_cache_enabled:
+            snapshot = access_token_cache.get_principal(user_id)
+
+        if snapshot is not None:
+            user, roles = snapshot
+            principal = Principal(await db.merge(user, load=False), roles, payload)
+        else:
+            principal, token_state = await load_principal(
+                db, user_id=user_id, jti=jti if check_jti else None
+            )
+            if check_jti and token_state != TOKEN_VALID:
+                if token_state == TOKEN_REVOKED and settings.auth_cache_enabled:
+                    access_token_cache.remember_revoked(jti, payload["exp"])
+                raise credentials_exception
+            if principal is None:
+                raise credentials_exception
+            principal.claims = payload
+            if settings.auth_cache_enabled:
+                if check_jti:
+                    access_token_cache.remember_valid(jti, user_id, payload["exp"])
+                access_token_cache.remember_principal(principal.user, principal.roles)
         
     except Exception:
         raise credentials_exception
-    
-    # Obtener el usuario de la base de datos
-    user = await crud_usuario.get(db, id=int(user_id))
-    if user is None:
+
+    if token_epoch is not None and token_epoch != (principal.user.token_epoch or 0):
         raise credentials_exception
-    
-    return user
+
+    request.state.principal = principal
+    return principal
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal)
+) -> Usuario:
+    """Obtener el usuario actual desde el token JWT"""
+    return principal.user
 
 
 async def get_current_active_user(
@@ -73,18 +130,16 @@ def verify_refresh_token(
             detail="Refresh token no enviado"
         )
     try:
-        payload = jwt.decode(refresh_token,
-                            settings.secret_key,
-                            algorithms=[settings.algorithm],
-                            options={"verify_signature": True,
-                                    "verify_exp": True})
+        payload = keyring.decode(refresh_token,
+                                 options={"verify_signature": True,
+                                          "verify_exp": True})
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Refresh token expirado, por favor incie sesion nuevamente",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    except JWTError:
+    except jwt.PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Refresh token inválido",
@@ -97,20 +152,10 @@ def require_roles(required_roles: list):
     """Decorator para requerir roles específicos"""
     async def role_checker(
         current_user: Usuario = Depends(get_current_active_user),
-        db: AsyncSession = Depends(get_db)
+        principal: Principal = Depends(get_current_principal)
     ):
-        # Obtener roles del usuario
-        user_with_roles = await crud_usuario.get_with_roles(db, user_id=current_user.id)
-        if not user_with_roles:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="No se pudieron obtener los roles del usuario"
-            )
-
-        user_roles = [ur.rol_obj.nombre for ur in user_with_roles.usuario_roles if ur.rol_obj]
-
         # Verificar si el usuario tiene alguno de los roles requeridos
-        if not any(role in user_roles for role in required_roles):
+        if not principal.has_any_role(required_roles):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Se requiere uno de los siguientes roles: {', '.join(required_roles)}"
@@ -121,26 +166,38 @@ def require_roles(required_roles: list):
     return role_checker
 
 
+def _token_permissions(principal: Principal, response: Response) -> Optional[int]:
+    """
+    Bitset de APIs del claim ``prm`` si corresponde a la matriz vigente.
+    Si el claim es de una versión anterior se avisa al cliente para que
+    refresque el token.
+    """
+    bits = token_api_bitset(principal.claims, principal.role_names)
+    if bits is None and is_stale(principal.claims):
+        response.headers["X-Permissions-Stale"] = "1"
+    return bits
+
+
 def require_permissions(required_apis: list):
     """Decorator para requerir permisos específicos de API"""
     async def permission_checker(
+        response: Response,
         current_user: Usuario = Depends(get_current_active_user),
+        principal: Principal = Depends(get_current_principal),
         db: AsyncSession = Depends(get_db)
     ):
-        from app.crud import permiso_api as crud_permiso_api
-        from app.crud import usuario_rol as crud_usuario_rol
-        
-        # Obtener roles del usuario
-        user_roles = await crud_usuario_rol.get_roles_by_usuario(db, usuario_id=current_user.id)
-        
-        # Verificar permisos para cada rol
-        user_apis = []
-        for user_role in user_roles:
-            role_apis = await crud_permiso_api.get_apis_by_rol(db, rol_id=user_role.id_rol)
-            user_apis.extend([api.api_obj.url_api for api in role_apis if api.api_obj])
-        
+        # Solo consulta la BD si el índice está vencido o tiene roles marcados
+        await permission_index.ensure_fresh(db)
+
+        # Autorizar desde el token si su claim está vigente; si no, por el índice
+        bits = _token_permissions(principal, response)
+        if bits is not None:
+            allowed = bitset_allows(bits, permission_index.api_ids_for_urls(required_apis))
+        else:
+            allowed = permission_index.allows(principal.role_ids, required_apis)
+
         # Verificar si el usuario tiene acceso a alguna de las APIs requeridas
-        if not any(api in user_apis for api in required_apis):
+        if not allowed:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"No tiene permisos para acceder a esta funcionalidad"
@@ -150,3 +207,30 @@ def require_permissions(required_apis: list):
     
     return permission_checker
 
+
+def require_route_permission():
+    """Dependency que exige permiso sobre la ruta y método de la petición (Api.url_api)"""
+    async def route_checker(
+        request: Request,
+        response: Response,
+        current_user: Usuario = Depends(get_current_active_user),
+        principal: Principal = Depends(get_current_principal),
+        db: AsyncSession = Depends(get_db)
+    ):
+        await permission_index.ensure_fresh(db)
+
+        bits = _token_permissions(principal, response)
+        if bits is not None:
+            allowed = bitset_allows(bits, permission_index.routes.match(request.method, request.url.path))
+        else:
+            allowed = permission_index.allows_route(principal.role_ids, request.method, request.url.path)
+
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tiene permisos para acceder a esta funcionalidad"
+            )
+
+        return current_user
+
+    return route_checker
@@ -1,21 +1,29 @@
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any
 from uuid import uuid4
+import hashlib
+import hmac
 import bcrypt
-from jose import JWTError, jwt
+import jwt
 from fastapi import HTTPException, Response, status
 from app.core.config import settings
+from app.auth.signing import keyring
 
 
 def create_access_token(
     user_id: int,
-    roles: List[Dict[str, Any]]
+    roles: List[Dict[str, Any]],
+    epoch: int | None = None,
+    permissions: Dict[str, Any] | None = None
 ) -> str:
     """
     Crear token de acceso JWT utilizado para autenticar peticiones
     Retorna:
     - access_token (string) → se envía al cliente
-    - jti (string) → se guarda en BD
+    - jti (string) → se guarda en BD (modo stateful)
+    Si se indica ``epoch`` el token lleva el claim ``epc`` y se valida contra
+    el token_epoch actual del usuario en lugar de buscar el jti en BD.
+    ``permissions`` es el claim ``prm`` (bitset de APIs permitidas).
     """
     try:
         # Crear el identificador unico del token
@@ -32,12 +40,12 @@ def create_access_token(
             "iss": settings.app_name,
             "token_type": "access",
         }
+        if epoch is not None:
+            to_encode["epc"] = epoch
+        if permissions is not None:
+            to_encode["prm"] = permissions
 
-        token = jwt.encode(
-            to_encode,
-            settings.secret_key,
-            algorithm=settings.algorithm
-        )
+        token = keyring.encode(to_encode)
         
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -75,10 +83,7 @@ def create_refresh_token(user_id: str) -> dict[str, Any]:
             "iss": settings.app_name,       # emisor del token
             "token_type": "refresh",        # tipo de token
         }
-        token = jwt.encode(payload,
-                           settings.secret_key,
-                           algorithm=settings.algorithm
-                           )
+        token = keyring.encode(payload)
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -115,10 +120,7 @@ def create_reset_token(user_id: str) -> dict[str, Any]:
             "iss": settings.app_name,       # emisor del token
             "token_type": "reset_password", # tipo de token
         }
-        token = jwt.encode(payload,
-                           settings.secret_key,
-                           algorithm=settings.algorithm
-                           )
+        token = keyring.encode(payload)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Error al generar reset token: {e}"
@@ -133,13 +135,13 @@ def create_reset_token(user_id: str) -> dict[str, Any]:
 def verify_token(token: str) -> Dict[str, Any]:
     """Verificar y decodificar token JWT"""
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm], issuer=settings.app_name, options={"require": ["sub", "exp", "iat", "iss"],
+        payload = keyring.decode(token, issuer=settings.app_name, options={"require": ["sub", "exp", "iat", "iss"],
                                                                                                    "verify_signature": True,
                                                                                                    "verify_exp": True,
                                                                                                    "verify_iss": True})
         
         return payload
-    except JWTError:
+    except jwt.PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
@@ -157,8 +159,28 @@ def set_refresh_token(response: Response, refresh_token):
             max_age=settings.REFRESH_TOKEN_EXPIRE_SECONDS
         )
     
+# Clave del HMAC de tokens: explícita o derivada de la secret_key
+_token_hash_key = (
+    settings.token_hash_key.encode()
+    if settings.token_hash_key
+    else hashlib.sha256(b"token-hash:" + settings.secret_key.encode()).digest()
+)
+
+
 def hash_token(token: str) -> str:
-    return bcrypt.hashpw(token.encode(), bcrypt.gensalt()).decode()
+    """
+    Digest HMAC-SHA256 (64 caracteres hex) de un token de alta entropía.
+    Es determinista, por lo que puede buscarse por índice en token_hash.
+    """
+    return hmac.new(_token_hash_key, token.encode(), hashlib.sha256).hexdigest()
 
 def verify_token_hash(token: str, hashed: str) -> bool:
-    return bcrypt.checkpw(token.encode(), hashed.encode())
\ No newline at end of file
+    """
+    Comparar en tiempo constante. Los hashes bcrypt heredados ($2a$/$2b$)
+    se siguen aceptando mientras token_hash_accept_bcrypt esté activo.
+    """
+    if hashed.startswith("$2"):
+        if not settings.token_hash_accept_bcrypt:
+            return False
+        return bcrypt.checkpw(token.encode(), hashed.encode())
+    return hmac.compare_digest(hash_token(token), hashed)
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Persistencia de los tokens de un login en un solo viaje al almacén
+"""
+
+from typing import Any, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.token_store import token_store
+from app.utils.GeoIp2 import SessionContext
+
+
+class LoginPersistenceService():
+    async def persist_login(db: AsyncSession, *,
+                            user_id: int,
+                            access_token: Dict[str, Any],
+                            refresh_token: Dict[str, Any],
+                            session: SessionContext
+                            ) -> None:
+        """
+        Escribe todo el estado de tokens de un login:
+        - revoca el refresh token activo del usuario en el dispositivo,
+        - guarda el access token (solo en modo stateful),
+        - guarda el nuevo refresh token.
+
+        Con el backend SQL es una única sentencia en PostgreSQL y no hace
+        commit: el llamador confirma la transacción. Redis lo aplica en un
+        script Lua atómico.
+        """
+        await token_store.persist_login(
+            db,
+            user_id=user_id,
+            access_token=access_token,
+            refresh_token=refresh_token,
+            session=session,
+        )
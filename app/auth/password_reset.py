@@ -1,31 +1,28 @@
 from pydantic_core import ValidationError
-from sqlalchemy import select, update
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta, timezone
 from app.auth.access_token import AccessTokenService
-from app.models.password_reset_token import PasswordResetToken
 from app.auth.refresh_tokens import RefreshTokenService
+from app.auth.token_store import token_store
 from app.crud import usuario as crud_usuario
 from app.core.config import settings
 
-from app.auth.jwt_handler import hash_token, create_reset_token, verify_token
+from app.auth.jwt_handler import hash_token, create_reset_token, verify_token, verify_token_hash
 from app.schemas.usuario import UsuarioChangePasswordAdmin
 
 class PasswordResetService:
 
     async def save_reset_token(db, user_id: int, jti: str, token_hash: str, expires_at: datetime, ip_address: str, user_agent: str):
-        # Guardar el token de restablecimiento en la base de datos
+        # Guardar el token de restablecimiento en el almacén de tokens
         try:
-            smt = PasswordResetToken(
-                user_id=user_id,
-                jti=jti,
-                token_hash=token_hash,
-                expires_at=expires_at,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                )
-
-            db.add(smt)
+            await token_store.save_reset_token(db,
+                                               user_id=user_id,
+                                               jti=jti,
+                                               token_hash=token_hash,
+                                               expires_at=expires_at,
+                                               ip_address=ip_address,
+                                               user_agent=user_agent,
+                                               )
             await db.commit()
 
         except Exception as e:
@@ -34,25 +31,13 @@ class PasswordResetService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error al guardar el token de restablecimiento: {str(e)}"
             )
-        return smt
     
     async def get_reset_token_by_jti(db, jti: str):
-        result = await db.execute(
-            select(PasswordResetToken).where(PasswordResetToken.jti == jti)
-        )
-        return result.scalar_one_or_none()
+        return await token_store.get_reset_token(db, jti)
     
     async def revoke_all_reset_tokens(db, user_id: int):
         # Marcar todos los tokens como usados
-        await db.execute(update(PasswordResetToken)
-                        .where(
-                            PasswordResetToken.user_id == user_id,
-                            PasswordResetToken.used_at.is_(None),
-                            )
-                            .values(
-                                used_at=datetime.now(timezone.utc)
-                                )
-            )
+        await token_store.use_reset_tokens_by_user(db, user_id)
     
     async def request_reset_token(db, user_id, ip: str, user_agent: str):
         # Crear el token de restablecimiento
@@ -81,7 +66,7 @@ class PasswordResetService:
 
         result  = await PasswordResetService.get_reset_token_by_jti(db, jti)
         
-        if not result or result.used_at is not None:
+        if not result or result.used_at is not None or not verify_token_hash(token, result.token_hash):
             raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido o usado previamente"
@@ -0,0 +1,105 @@
+"""
+Claim compacto de permisos (``prm``) para los access tokens
+
+El claim lleva los ids de API permitidos como un bitset (bit ``n`` = api id
+``n``) comprimido con zlib y codificado en base64url, junto con la versión de
+la matriz de permisos con la que se calculó::
+
+    {"v": 81985529216486, "b": "eJzjYGBgAA..."}
+
+Si el bitset supera ``permission_claims_max_bytes`` se emite solo una
+referencia (``{"v": ..., "ref": ...}``) y el consumidor debe resolver los
+permisos en el servidor. Un token cuya ``v`` no coincide con la versión actual
+está desactualizado y debe refrescarse.
+"""
+
+import base64
+import hashlib
+import zlib
+from typing import Any, Dict, Iterable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.permission_index import permission_index
+from app.core.config import settings
+
+CLAIM_NAME = "prm"
+
+# Límite del bitset sin comprimir (ids de API hasta ~524k)
+_MAX_RAW_BYTES = 65_536
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def encode_api_bitset(api_ids: Iterable[int]) -> Optional[str]:
+    """Bitset comprimido en base64url, o None si los ids son demasiado grandes"""
+    bits = 0
+    for api_id in api_ids:
+        bits |= 1 << api_id
+    raw_length = (bits.bit_length() + 7) // 8
+    if raw_length > _MAX_RAW_BYTES:
+        return None
+    return _b64encode(zlib.compress(bits.to_bytes(raw_length, "little"), 9))
+
+
+def decode_api_bitset(value: str) -> int:
+    """Entero cuyo bit ``n`` indica si el api id ``n`` está permitido"""
+    inflater = zlib.decompressobj()
+    raw = inflater.decompress(_b64decode(value), _MAX_RAW_BYTES)
+    if inflater.unconsumed_tail:
+        raise ValueError("Bitset de permisos demasiado grande")
+    return int.from_bytes(raw, "little")
+
+
+def build_claim(api_ids: Iterable[int], version: int,
+                max_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """Construir el claim, con referencia si el bitset excede el presupuesto"""
+    api_ids = sorted(api_ids)
+    max_bytes = settings.permission_claims_max_bytes if max_bytes is None else max_bytes
+    bitset = encode_api_bitset(api_ids)
+    if bitset is not None and len(bitset) <= max_bytes:
+        return {"v": version, "b": bitset}
+    digest = hashlib.sha256(",".join(map(str, api_ids)).encode()).hexdigest()[:16]
+    return {"v": version, "ref": digest}
+
+
+async def permission_claim(db: AsyncSession, role_ids: Iterable[int]) -> Optional[Dict[str, Any]]:
+    """Claim ``prm`` para los roles dados (None si la opción está desactivada)"""
+    if not settings.permission_claims_enabled:
+        return None
+    await permission_index.ensure_fresh(db)
+    return build_claim(permission_index.api_ids_for_roles(role_ids), permission_index.version)
+
+
+def token_api_bitset(claims: Optional[Dict[str, Any]], role_names: Iterable[str]) -> Optional[int]:
+    """
+    Bitset del token si es utilizable: versión igual a la de la matriz actual
+    y roles del token iguales a los roles vigentes del usuario.
+    """
+    if not claims:
+        return None
+    claim = claims.get(CLAIM_NAME)
+    if not isinstance(claim, dict) or "b" not in claim:
+        return None
+    if claim.get("v") != permission_index.version:
+        return None
+    if sorted(claims.get("roles") or []) != sorted(role_names):
+        return None
+    try:
+        return decode_api_bitset(claim["b"])
+    except (ValueError, zlib.error):
+        return None
+
+
+def is_stale(claims: Optional[Dict[str, Any]]) -> bool:
+    """True si el token trae un claim de una versión anterior de la matriz"""
+    claim = (claims or {}).get(CLAIM_NAME)
+    return isinstance(claim, dict) and claim.get("v") != permission_index.version
+
+
+def bitset_allows(bits: int, api_ids: Iterable[int]) -> bool:
+    return any((bits >> api_id) & 1 for api_id in api_ids)
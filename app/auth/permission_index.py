@@ -0,0 +1,272 @@
+"""
+Índice compilado de permisos rol → API por worker
+
+Se construye con una sola consulta sobre ``permiso_api``/``api`` y se
+mantiene en memoria como conjuntos, de modo que ``require_permissions``
+resuelve cada verificación con búsquedas O(1) sin tocar la BD. Los patrones
+``url_api`` se compilan además en un ``RouteMatcher`` para resolver la ruta y
+el método de una petición a sus ids de API.
+
+Invalidación:
+- Cambios ORM sobre PermisoApi, Rol o Api marcan los roles afectados; se
+  aplican al hacer commit de la sesión (nunca antes, para no recargar datos
+  aún no confirmados) y se recargan solo esos roles en la siguiente consulta.
+- Los demás workers se enteran por el bus de revocaciones: cada rol o API
+  marcado se publica (``publisher``) en la misma transacción del cambio y
+  el bus lo entrega al hacer commit (``apply_change``).
+- Inserciones con ``insert()`` (sin eventos ORM) deben publicar el cambio
+  antes del commit y llamar a ``invalidate_role`` después.
+- Un TTL fuerza la reconstrucción completa por si se pierde algún aviso.
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+from sqlalchemy import Connection, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session, object_session
+from app.auth.route_matcher import RouteMatcher
+from app.core.config import settings
+from app.models.api import Api
+from app.models.permiso import PermisoApi
+from app.models.rol import Rol
+
+_EMPTY: FrozenSet = frozenset()
+
+# Clave en Session.info donde se acumulan los roles a invalidar hasta el commit
+_PENDING_KEY = "permission_index_pending"
+
+
+class PermissionIndex:
+    def __init__(self, ttl: float, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._urls: Dict[int, FrozenSet[str]] = {}
+        self._api_ids: Dict[int, FrozenSet[int]] = {}
+        self._roles_by_api: Dict[int, Set[int]] = {}
+        self.routes = RouteMatcher()
+        self._ids_by_url: Dict[str, FrozenSet[int]] = {}
+        self.version: Optional[int] = None
+        self._loaded_at: Optional[float] = None
+        self._dirty_roles: Set[int] = set()
+        self._lock = asyncio.Lock()
+        self.full_builds = 0
+        self.partial_builds = 0
+        # Publica ``(connection, kind, id)`` a los demás workers; lo asigna el bus
+        self.publisher: Optional[Callable[[Connection, str, int], None]] = None
+
+    # ---------- consulta ----------
+
+    def is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and not self._dirty_roles
+            and self._clock() - self._loaded_at < self.ttl
+        )
+
+    def role_urls(self, rol_id: int) -> FrozenSet[str]:
+        return self._urls.get(rol_id, _EMPTY)
+
+    def role_api_ids(self, rol_id: int) -> FrozenSet[int]:
+        return self._api_ids.get(rol_id, _EMPTY)
+
+    def api_ids_for_roles(self, role_ids: Iterable[int]) -> Set[int]:
+        api_ids: Set[int] = set()
+        for rol_id in role_ids:
+            api_ids |= self._api_ids.get(rol_id, _EMPTY)
+        return api_ids
+
+    def api_ids_for_urls(self, urls: Iterable[str]) -> Set[int]:
+        api_ids: Set[int] = set()
+        for url in urls:
+            api_ids |= self._ids_by_url.get(url, _EMPTY)
+        return api_ids
+
+    def allows(self, role_ids: Iterable[int], required_apis: Iterable[str]) -> bool:
+        """True si alguno de los roles tiene acceso a alguna de las URLs requeridas"""
+        required = tuple(required_apis)
+        for rol_id in role_ids:
+            urls = self._urls.get(rol_id)
+            if urls and any(url in urls for url in required):
+                return True
+        return False
+
+    def allows_route(self, role_ids: Iterable[int], method: str, path: str) -> bool:
+        """True si alguno de los roles tiene la API que resuelve ``method path``"""
+        api_ids = self.routes.match(method, path)
+        if not api_ids:
+            return False
+        return any(not api_ids.isdisjoint(self._api_ids.get(rol_id, _EMPTY))
+                   for rol_id in role_ids)
+
+    # ---------- carga ----------
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Reconstruir (total o solo roles marcados) si el índice no está vigente"""
+        if self.is_fresh():
+            return
+        async with self._lock:
+            if self._loaded_at is None or self._clock() - self._loaded_at >= self.ttl:
+                await self._build(db)
+            elif self._dirty_roles:
+                await self._build(db, roles=set(self._dirty_roles))
+
+    async def _build(self, db: AsyncSession, roles: Optional[Set[int]] = None) -> None:
+        # Mismas filas que CRUDPermisoApi.get_apis_by_rol: sin filtrar por ``activo``
+        query = (
+            select(PermisoApi.rol_id, Api.id, Api.url_api, Api.tipo_accion)
+            .join(Api, Api.id == PermisoApi.api_id)
+        )
+        if roles is not None:
+            query = query.where(PermisoApi.rol_id.in_(roles))
+        rows = (await db.execute(query)).all()
+        self.load_rows(rows, roles=roles)
+
+    def load_rows(self, rows: Iterable[Tuple[int, int, str, Optional[int]]],
+                  roles: Optional[Set[int]] = None) -> None:
+        """
+        Compilar filas ``(rol_id, api_id, url_api, tipo_accion)``. Con ``roles``
+        se reemplazan solo esos roles; sin él se reemplaza el índice completo.
+        """
+        if roles is None:
+            self.routes = RouteMatcher()
+
+        urls: Dict[int, Set[str]] = {}
+        api_ids: Dict[int, Set[int]] = {}
+        for rol_id, api_id, url_api, tipo_accion in rows:
+            urls.setdefault(rol_id, set()).add(url_api)
+            api_ids.setdefault(rol_id, set()).add(api_id)
+            self.routes.add(api_id, url_api, tipo_accion)
+
+        if roles is None:
+            self._urls = {}
+            self._api_ids = {}
+            self._roles_by_api = {}
+            self._loaded_at = self._clock()
+            self._dirty_roles.clear()
+            self.full_builds += 1
+            roles = set(urls)
+        else:
+            self._dirty_roles.difference_update(roles)
+            self.partial_builds += 1
+
+        for rol_id in roles:
+            for api_id in self._api_ids.pop(rol_id, _EMPTY):
+                api_roles = self._roles_by_api.get(api_id)
+                if api_roles is not None:
+                    api_roles.discard(rol_id)
+                    if not api_roles:
+                        del self._roles_by_api[api_id]
+            self._urls.pop(rol_id, None)
+            if rol_id in urls:
+                self._urls[rol_id] = frozenset(urls[rol_id])
+                self._api_ids[rol_id] = frozenset(api_ids[rol_id])
+                for api_id in api_ids[rol_id]:
+                    self._roles_by_api.setdefault(api_id, set()).add(rol_id)
+
+        self._compile_derived()
+
+    def _compile_derived(self) -> None:
+        """URL → ids de API y versión de la matriz (hash del contenido)"""
+        ids_by_url: Dict[str, Set[int]] = {}
+        for api_id in self._roles_by_api:
+            entry = self.routes.entry(api_id)
+            if entry is not None:
+                ids_by_url.setdefault(entry[0], set()).add(api_id)
+        self._ids_by_url = {url: frozenset(ids) for url, ids in ids_by_url.items()}
+
+        # La versión depende solo del contenido: es la misma en todos los workers
+        digest = hashlib.blake2b(digest_size=6)
+        for rol_id in sorted(self._api_ids):
+            digest.update(f"{rol_id}:{','.join(map(str, sorted(self._api_ids[rol_id])))};".encode())
+        self.version = int.from_bytes(digest.digest(), "big")
+
+    # ---------- invalidación ----------
+
+    def invalidate_role(self, rol_id: int) -> None:
+        if self._loaded_at is not None:
+            self._dirty_roles.add(rol_id)
+
+    def invalidate_api(self, api_id: int) -> None:
+        """Marcar los roles que usan la API; si no hay ninguno, reconstruir todo"""
+        self.routes.remove(api_id)
+        roles = self._roles_by_api.get(api_id)
+        if roles:
+            self._dirty_roles.update(roles)
+        else:
+            self.invalidate_all()
+
+    def invalidate_all(self) -> None:
+        self._loaded_at = None
+
+    def apply_change(self, kind: str, key: int) -> None:
+        """Aplicar un cambio publicado por otro worker (``rol`` o ``api``)"""
+        if kind == "rol":
+            self.invalidate_role(key)
+        else:
+            self.invalidate_api(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "roles": len(self._urls),
+            "apis": len(self._roles_by_api),
+            "routes": len(self.routes),
+            "dirty_roles": len(self._dirty_roles),
+            "version": self.version,
+            "full_builds": self.full_builds,
+            "partial_builds": self.partial_builds,
+        }
+
+
+permission_index = PermissionIndex(ttl=settings.permission_index_ttl_seconds)
+
+
+def _defer(connection: Connection, target, key) -> None:
+    """
+    Acumular la invalidación en la sesión hasta su commit y publicarla, una
+    vez por transacción, en la misma conexión
+    """
+    session = object_session(target)
+    if session is None:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    if key in pending:
+        return
+    pending.add(key)
+    if permission_index.publisher is not None:
+        permission_index.publisher(connection, *key)
+
+
+@event.listens_for(PermisoApi, "after_insert")
+@event.listens_for(PermisoApi, "after_update")
+@event.listens_for(PermisoApi, "after_delete")
+def _on_permiso_api(mapper, connection, target: PermisoApi) -> None:
+    _defer(connection, target, ("rol", target.rol_id))
+    # Si el permiso cambió de rol, el rol anterior también queda afectado
+    for old_rol_id in inspect(target).attrs.rol_id.history.deleted:
+        _defer(connection, target, ("rol", old_rol_id))
+
+
+@event.listens_for(Rol, "after_update")
+@event.listens_for(Rol, "after_delete")
+def _on_rol(mapper, connection, target: Rol) -> None:
+    _defer(connection, target, ("rol", target.id))
+
+
+@event.listens_for(Api, "after_update")
+@event.listens_for(Api, "after_delete")
+def _on_api(mapper, connection, target: Api) -> None:
+    _defer(connection, target, ("api", target.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    for kind, key in session.info.pop(_PENDING_KEY, ()):
+        permission_index.apply_change(kind, key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,98 @@
+"""
+Principal autenticado: usuario + roles resueltos en una sola consulta
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, literal, null
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.access_token import AccessToken
+from app.models.rol import Rol
+from app.models.usuario import Usuario
+from app.models.usuario_rol import UsuarioRol
+
+# Estados del access token devueltos por load_principal
+TOKEN_NOT_CHECKED = "not_checked"
+TOKEN_MISSING = "missing"
+TOKEN_REVOKED = "revoked"
+TOKEN_VALID = "valid"
+
+
+class Principal:
+    """Usuario autenticado con sus roles y aplicaciones, uno por petición"""
+
+    __slots__ = ("user", "roles", "claims")
+
+    def __init__(self, user: Usuario, roles: List[Tuple[int, str, int]],
+                 claims: Optional[Dict[str, Any]] = None):
+        self.user = user
+        self.roles = roles
+        self.claims = claims
+
+    @property
+    def id(self) -> int:
+        return self.user.id
+
+    @property
+    def role_ids(self) -> List[int]:
+        return [r[0] for r in self.roles]
+
+    @property
+    def role_names(self) -> List[str]:
+        return [r[1] for r in self.roles]
+
+    @property
+    def application_ids(self) -> List[int]:
+        return sorted({r[2] for r in self.roles})
+
+    def has_any_role(self, required_roles: Iterable[str]) -> bool:
+        names = set(self.role_names)
+        return any(role in names for role in required_roles)
+
+
+async def load_principal(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    jti: Optional[str] = None
+) -> Tuple[Optional[Principal], str]:
+    """
+    Cargar usuario, roles y (opcionalmente) el estado del access token en
+    un único SELECT con LEFT JOINs. Retorna ``(principal, estado_token)``.
+    """
+    if jti is not None:
+        token_cols = (AccessToken.id, AccessToken.is_revoked)
+    else:
+        token_cols = (null(), literal(False))
+
+    query = (
+        select(Usuario, *token_cols, Rol.id, Rol.nombre, Rol.id_aplicacion)
+        .outerjoin(UsuarioRol, UsuarioRol.id_usuario == Usuario.id)
+        .outerjoin(Rol, Rol.id == UsuarioRol.id_rol)
+        .where(Usuario.id == user_id)
+    )
+    if jti is not None:
+        query = query.outerjoin(
+            AccessToken,
+            and_(AccessToken.jti == jti, AccessToken.user_id == Usuario.id)
+        )
+
+    rows = (await db.execute(query)).all()
+    if not rows:
+        return None, TOKEN_MISSING if jti is not None else TOKEN_NOT_CHECKED
+
+    user, token_id, token_revoked = rows[0][0], rows[0][1], rows[0][2]
+    roles = [(rol_id, nombre, id_aplicacion)
+             for _, _, _, rol_id, nombre, id_aplicacion in rows
+             if rol_id is not None]
+
+    if jti is None:
+        token_state = TOKEN_NOT_CHECKED
+    elif token_id is None:
+        token_state = TOKEN_MISSING
+    elif token_revoked:
+        token_state = TOKEN_REVOKED
+    else:
+        token_state = TOKEN_VALID
+
+    return Principal(user, roles), token_state
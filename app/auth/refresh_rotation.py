@@ -0,0 +1,51 @@
+"""
+Rotación atómica del refresh token
+
+Marcar el token anterior como usado e insertar su sucesor (y el access token
+en modo stateful) es una única operación del almacén: en SQL un ``UPDATE ...
+WHERE is_revoked = false RETURNING`` del que leen los ``INSERT``, en Redis un
+script Lua. Sin token vigente no se crea nada, y de dos peticiones
+concurrentes con el mismo token solo una lo consume: la reutilización se
+detecta por el resultado y no por una lectura previa.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.jwt_handler import hash_token
+from app.auth.token_store import RefreshRecord, token_store
+from app.utils.GeoIp2 import SessionContext
+
+
+class RefreshRotationService():
+    async def rotate(db: AsyncSession, *,
+                     user_id: int,
+                     token_jti: str,
+                     token: str,
+                     access_token: Dict[str, Any],
+                     refresh_token: Dict[str, Any],
+                     session: SessionContext
+                     ) -> Optional[RefreshRecord]:
+        """
+        Consumir el refresh token ``token_jti`` y guardar sus sucesores.
+        Retorna el token consumido (``token_hash``, ``device_id``), o None si
+        no estaba vigente (inexistente, de otro usuario o ya usado). El sucesor
+        conserva el ``device_id`` de la sesión. No hace commit: el llamador
+        verifica el hash y confirma o revierte.
+        """
+        return await token_store.rotate_refresh_token(
+            db,
+            user_id=user_id,
+            token_jti=token_jti,
+            token_hash=hash_token(token),
+            access_token=access_token,
+            refresh_token=refresh_token,
+            session=session,
+        )
+
+    async def revoked_at(db: AsyncSession, *, user_id: int, token_jti: str) -> Optional[datetime]:
+        """
+        Fecha en que se usó o revocó el token, o None si no existe para el
+        usuario. Un token revocado sin fecha se trata como revocado hace mucho.
+        """
+        return await token_store.refresh_revoked_at(db, user_id=user_id, token_jti=token_jti)
@@ -0,0 +1,113 @@
+"""
+Single-flight del refresh por jti
+
+Varias pestañas que refrescan a la vez presentan el mismo refresh token. La
+primera petición ejecuta la rotación; las concurrentes esperan su resultado y
+las que llegan dentro de ``refresh_grace_seconds`` reciben el mismo par de
+tokens ya rotado, sin tocar la BD ni disparar la detección de reutilización.
+El resultado solo se comparte con quien presenta exactamente el mismo token
+(se compara su hash). Si el líder se cancela (cliente desconectado), los que
+esperaban no heredan la cancelación: uno de ellos rota en su lugar. Es por
+proceso: entre workers la carrera se resuelve en
+el endpoint con un 409 dentro de la misma ventana de gracia.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from fastapi import HTTPException, status
+from app.auth.jwt_handler import hash_token
+from app.core.config import settings
+from app.utils.cache import LRUTTLCache
+
+
+class _LeaderCancelled(Exception):
+    """El líder se canceló antes de rotar: los que esperan reintentan"""
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # Evita el aviso "exception was never retrieved" cuando nadie esperaba
+    if not future.cancelled():
+        future.exception()
+
+
+class RefreshSingleFlight:
+    def __init__(self, grace_seconds: float, max_entries: int):
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._recent = LRUTTLCache(maxsize=max_entries, ttl=grace_seconds)
+        self.leaders = 0
+        self.shared = 0
+        self.mismatches = 0
+        self.takeovers = 0
+
+    async def run(self, jti: str, token: str,
+                  rotate: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Ejecutar ``rotate`` una vez por jti y compartir su resultado"""
+        fingerprint = hash_token(token)
+
+        while True:
+            recent = self._recent.get(jti)
+            if recent is not None:
+                return self._share(fingerprint, *recent)
+
+            inflight = self._inflight.get(jti)
+            if inflight is None:
+                return await self._lead(jti, fingerprint, rotate)
+
+            owner, future = inflight
+            self._check(fingerprint, owner)
+            try:
+                result = await asyncio.shield(future)
+            except _LeaderCancelled:
+                self.takeovers += 1
+                continue
+            self.shared += 1
+            return result
+
+    async def _lead(self, jti: str, fingerprint: str,
+                    rotate: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self._inflight[jti] = (fingerprint, future)
+        self.leaders += 1
+        try:
+            result = await rotate()
+        except asyncio.CancelledError:
+            # La cancelación es del líder, no de quienes esperan su resultado
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            self._recent.set(jti, (fingerprint, result))
+            return result
+        finally:
+            self._inflight.pop(jti, None)
+
+    def _share(self, fingerprint: str, owner: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        self._check(fingerprint, owner)
+        self.shared += 1
+        return result
+
+    def _check(self, fingerprint: str, owner: str) -> None:
+        if fingerprint != owner:
+            # Mismo jti con otro token: no se comparte nada
+            self.mismatches += 1
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token invalido")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": len(self._inflight),
+            "recent": len(self._recent),
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "mismatches": self.mismatches,
+            "takeovers": self.takeovers,
+        }
+
+
+refresh_single_flight = RefreshSingleFlight(
+    grace_seconds=settings.refresh_grace_seconds,
+    max_entries=settings.refresh_singleflight_max_entries,
+)
@@ -0,0 +1,332 @@
+"""
+Bus de revocaciones entre workers
+
+Cada worker cachea el estado de tokens y usuarios (``access_token_cache``)
+y el índice de permisos (``permission_index``). Cuando un worker revoca las
+sesiones de un usuario (logout, restablecimiento de contraseña) publica
+``(user_id, epoch)`` y el resto descarta sus entradas locales de ese usuario;
+cuando cambian los permisos de un rol o una API publica ``(kind, id)`` y el
+resto los recarga en su índice; cuando cambia un usuario, sus roles o un rol
+publica el ``user_id`` (``null``: todos) y el resto descarta ese snapshot.
+
+- ``PostgresRevocationBus``: ``pg_notify`` dentro de la transacción de la
+  revocación, así que el evento solo se entrega si hay commit, y justo después
+  de él. Cada worker escucha el canal en una conexión propia y reconecta si
+  se cae; al reconectar vacía su cache e invalida el índice, porque pudo
+  perder eventos.
+- ``LoopbackRevocationBus``: entrega en el propio proceso; para pruebas, un
+  único worker u otros motores. Los cambios de permisos y usuarios ya se
+  aplican en el propio worker, así que no publica nada.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import Connection, Text, cast, extract, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.permission_index import permission_index
+from app.auth.token_cache import access_token_cache
+from app.core.config import settings
+from app.core.database import engine
+from app.models.usuario import Usuario
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationEvent:
+    __slots__ = ("user_id", "epoch", "sent_at")
+
+    def __init__(self, user_id: int, epoch: Optional[int] = None, sent_at: Optional[float] = None):
+        self.user_id = user_id
+        self.epoch = epoch
+        self.sent_at = sent_at
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any]) -> "RevocationEvent":
+        return cls(int(data["user_id"]), data.get("epoch"), data.get("sent_at"))
+
+
+Handler = Callable[[RevocationEvent], None]
+PermissionHandler = Callable[[str, int], None]
+UserChangeHandler = Callable[[Optional[int]], None]
+
+# Tipo de los eventos de permisos y usuarios en el canal (los de revocación no lo llevan)
+PERMISSIONS_EVENT = "permissions"
+USERS_EVENT = "users"
+
+
+class LoopbackRevocationBus:
+    """Entrega los eventos a los suscriptores del mismo proceso"""
+
+    name = "loopback"
+
+    def __init__(self):
+        self._handlers: List[Handler] = []
+        self._permission_handlers: List[PermissionHandler] = []
+        self._user_handlers: List[UserChangeHandler] = []
+        self.published = 0
+        self.received = 0
+        self.permissions_published = 0
+        self.permissions_received = 0
+        self.users_published = 0
+        self.users_received = 0
+        self.errors = 0
+        self.last_lag_ms: Optional[float] = None
+
+    def subscribe(self, handler: Handler) -> None:
+        self._handlers.append(handler)
+
+    def subscribe_permissions(self, handler: PermissionHandler) -> None:
+        self._permission_handlers.append(handler)
+
+    def publish_permissions(self, connection: Connection, kind: str, key: int) -> None:
+        """Publicar el cambio de permisos de un rol o API (``kind``: rol | api)"""
+        return None
+
+    async def publish_permissions_async(self, db: AsyncSession, kind: str, key: int) -> None:
+        """Como publish_permissions, desde una sesión async (p. ej. tras un insert masivo)"""
+        return None
+
+    def deliver_permissions(self, kind: str, key: int) -> None:
+        self.permissions_received += 1
+        for handler in self._permission_handlers:
+            try:
+                handler(kind, key)
+            except Exception as e:
+                self.errors += 1
+                logger.error("Error aplicando el cambio de permisos %s %s: %s", kind, key, e)
+
+    def subscribe_user_changes(self, handler: UserChangeHandler) -> None:
+        self._user_handlers.append(handler)
+
+    def publish_user_change(self, connection: Connection, user_id: Optional[int]) -> None:
+        """Publicar el cambio de un usuario o sus roles (``None``: de todos)"""
+        return None
+
+    async def publish_user_change_async(self, db: AsyncSession, user_id: Optional[int]) -> None:
+        """Como publish_user_change, desde una sesión async (p. ej. tras un insert masivo)"""
+        return None
+
+    def deliver_user_change(self, user_id: Optional[int]) -> None:
+        self.users_received += 1
+        for handler in self._user_handlers:
+            try:
+                handler(user_id)
+            except Exception as e:
+                self.errors += 1
+                logger.error("Error aplicando el cambio del usuario %s: %s", user_id, e)
+
+    async def publish(self, db: AsyncSession, user_id: int) -> None:
+        """Publicar la revocación de un usuario (el epoch ya incrementado en ``db``)"""
+        self.published += 1
+        self.deliver(RevocationEvent(user_id, sent_at=time.time()))
+
+    def deliver(self, event: RevocationEvent) -> None:
+        self.received += 1
+        if event.sent_at is not None:
+            self.last_lag_ms = round((time.time() - event.sent_at) * 1000, 3)
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                self.errors += 1
+                logger.error("Error aplicando la revocación del usuario %s: %s", event.user_id, e)
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "published": self.published,
+            "received": self.received,
+            "permissions_published": self.permissions_published,
+            "permissions_received": self.permissions_received,
+            "users_published": self.users_published,
+            "users_received": self.users_received,
+            "errors": self.errors,
+            "last_lag_ms": self.last_lag_ms,
+        }
+
+
+class PostgresRevocationBus(LoopbackRevocationBus):
+    """LISTEN/NOTIFY sobre la BD principal"""
+
+    name = "postgres"
+
+    def __init__(self, channel: str, reconnect_seconds: float, bind=engine):
+        super().__init__()
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self._bind = bind
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+        self.listening = False
+        self.reconnects = 0
+
+    async def publish(self, db: AsyncSession, user_id: int) -> None:
+        """
+        ``pg_notify`` en la transacción del llamador: PostgreSQL lo entrega al
+        hacer commit y lo descarta en rollback. El epoch se lee en la misma
+        sentencia, después del incremento.
+        """
+        epoch = (
+            select(Usuario.token_epoch)
+            .where(Usuario.id == user_id)
+            .scalar_subquery()
+        )
+        payload = func.json_build_object(
+            "user_id", user_id,
+            "epoch", epoch,
+            "sent_at", extract("epoch", func.clock_timestamp()),
+        )
+        await db.execute(select(func.pg_notify(self.channel, cast(payload, Text))))
+        self.published += 1
+
+    def _permissions_statement(self, kind: str, key: int):
+        payload = func.json_build_object(
+            "type", PERMISSIONS_EVENT,
+            "kind", kind,
+            "id", key,
+            "sent_at", extract("epoch", func.clock_timestamp()),
+        )
+        return select(func.pg_notify(self.channel, cast(payload, Text)))
+
+    def publish_permissions(self, connection: Connection, kind: str, key: int) -> None:
+        """``pg_notify`` en la conexión del flush: se entrega solo si hay commit"""
+        connection.execute(self._permissions_statement(kind, key))
+        self.permissions_published += 1
+
+    async def publish_permissions_async(self, db: AsyncSession, kind: str, key: int) -> None:
+        await db.execute(self._permissions_statement(kind, key))
+        self.permissions_published += 1
+
+    def _users_statement(self, user_id: Optional[int]):
+        payload = func.json_build_object(
+            "type", USERS_EVENT,
+            "user_id", user_id,
+            "sent_at", extract("epoch", func.clock_timestamp()),
+        )
+        return select(func.pg_notify(self.channel, cast(payload, Text)))
+
+    def publish_user_change(self, connection: Connection, user_id: Optional[int]) -> None:
+        """``pg_notify`` en la conexión del flush: se entrega solo si hay commit"""
+        connection.execute(self._users_statement(user_id))
+        self.users_published += 1
+
+    async def publish_user_change_async(self, db: AsyncSession, user_id: Optional[int]) -> None:
+        await db.execute(self._users_statement(user_id))
+        self.users_published += 1
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            data = json.loads(payload)
+            kind = data.get("type")
+            if kind == PERMISSIONS_EVENT:
+                args = (data["kind"], int(data["id"]))
+                if args[0] not in ("rol", "api"):
+                    raise ValueError(f"tipo desconocido {args[0]!r}")
+            elif kind == USERS_EVENT:
+                user_id = data["user_id"]
+                args = (None if user_id is None else int(user_id),)
+            else:
+                args = (RevocationEvent.from_data(data),)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.errors += 1
+            logger.warning("Evento de revocación inválido %r: %s", payload, e)
+            return
+        if kind == PERMISSIONS_EVENT:
+            self.deliver_permissions(*args)
+        elif kind == USERS_EVENT:
+            self.deliver_user_change(*args)
+        else:
+            self.deliver(*args)
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    async def _connect(self) -> None:
+        conn = await self._bind.connect()
+        try:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.add_listener(self.channel, self._on_notify)
+        except Exception:
+            await conn.close()
+            raise
+        self._conn = conn
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                if self._conn is None:
+                    await self._connect()
+                    if self.reconnects:
+                        # Pudieron perderse eventos mientras no se escuchaba
+                        access_token_cache.clear()
+                        permission_index.invalidate_all()
+                    self.listening = True
+                else:
+                    await self._conn.execute(text("SELECT 1"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Bus de revocaciones desconectado: %s", e)
+                self.reconnects += 1
+                self.listening = False
+                await self._close()
+            await asyncio.sleep(self.reconnect_seconds)
+
+    async def _close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            # Se descarta en lugar de volver al pool: conserva el listener
+            await conn.invalidate()
+            await conn.close()
+        except Exception:
+            pass
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close()
+        self.listening = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "channel": self.channel,
+            "listening": self.listening,
+            "reconnects": self.reconnects,
+        }
+
+
+def create_revocation_bus(bind=engine) -> LoopbackRevocationBus:
+    if settings.revocation_bus_enabled and bind.dialect.name == "postgresql":
+        return PostgresRevocationBus(
+            channel=settings.revocation_bus_channel,
+            reconnect_seconds=settings.revocation_bus_reconnect_seconds,
+            bind=bind,
+        )
+    return LoopbackRevocationBus()
+
+
+revocation_bus = create_revocation_bus()
+revocation_bus.subscribe(lambda event: access_token_cache.apply_revocation(event.user_id, event.epoch))
+revocation_bus.subscribe_permissions(permission_index.apply_change)
+permission_index.publisher = revocation_bus.publish_permissions
+revocation_bus.subscribe_user_changes(access_token_cache.apply_user_change)
+access_token_cache.publisher = revocation_bus.publish_user_change
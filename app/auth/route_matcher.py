@@ -0,0 +1,146 @@
+"""
+Matcher de rutas para los patrones de ``Api.url_api``
+
+Los patrones se compilan en un árbol por segmentos de ruta, de modo que
+resolver una petición cuesta lo proporcional a la longitud de la ruta y no
+al número de APIs registradas.
+
+Sintaxis de patrones:
+- ``/api/v1/usuarios``: segmentos estáticos.
+- ``/api/v1/usuarios/{id}`` o ``/api/v1/usuarios/*``: un segmento cualquiera.
+- ``/api/v1/archivos/**``: cero o más segmentos (solo al final).
+
+Prioridad al resolver: estático > parámetro > comodín final.
+"""
+
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+ANY_METHOD = "*"
+
+# Api.tipo_accion → método HTTP (1 o nulo: cualquier método)
+TIPO_ACCION_METHODS = {
+    2: "GET",
+    3: "POST",
+    4: "PUT",
+    5: "DELETE",
+}
+
+
+def method_for_tipo_accion(tipo_accion: Optional[int]) -> str:
+    return TIPO_ACCION_METHODS.get(tipo_accion, ANY_METHOD)
+
+
+def split_path(path: str) -> List[str]:
+    """Separar una ruta en segmentos, ignorando barras repetidas o finales"""
+    return [segment for segment in path.split("?", 1)[0].split("/") if segment]
+
+
+def _is_param(segment: str) -> bool:
+    return segment == "*" or (segment.startswith("{") and segment.endswith("}"))
+
+
+class _Node:
+    __slots__ = ("static", "param", "handlers", "tail")
+
+    def __init__(self):
+        self.static: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        self.handlers: Dict[str, Set[int]] = {}
+        self.tail: Dict[str, Set[int]] = {}
+
+
+class RouteMatcher:
+    """Árbol de patrones de ruta → ids de API, separado por método HTTP"""
+
+    def __init__(self):
+        self._root = _Node()
+        self._entries: Dict[int, Tuple[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, api_id: int) -> bool:
+        return api_id in self._entries
+
+    def entry(self, api_id: int) -> Optional[Tuple[str, str]]:
+        """Patrón y método registrados para una API"""
+        return self._entries.get(api_id)
+
+    def add(self, api_id: int, pattern: str, tipo_accion: Optional[int] = None) -> None:
+        """Registrar (o reemplazar) el patrón de una API"""
+        method = method_for_tipo_accion(tipo_accion)
+        if self._entries.get(api_id) == (pattern, method):
+            return
+        self.remove(api_id)
+
+        handlers = self._walk(pattern, create=True)
+        handlers.setdefault(method, set()).add(api_id)
+        self._entries[api_id] = (pattern, method)
+
+    def remove(self, api_id: int) -> None:
+        entry = self._entries.pop(api_id, None)
+        if entry is None:
+            return
+        pattern, method = entry
+        handlers = self._walk(pattern, create=False)
+        if handlers is not None:
+            handlers.get(method, set()).discard(api_id)
+
+    def _walk(self, pattern: str, create: bool) -> Optional[Dict[str, Set[int]]]:
+        """Ubicar el diccionario de handlers del patrón (creando nodos si se pide)"""
+        node = self._root
+        segments = split_path(pattern)
+        for position, segment in enumerate(segments):
+            if segment == "**" and position == len(segments) - 1:
+                return node.tail
+            if _is_param(segment):
+                if node.param is None:
+                    if not create:
+                        return None
+                    node.param = _Node()
+                node = node.param
+            else:
+                child = node.static.get(segment)
+                if child is None:
+                    if not create:
+                        return None
+                    child = node.static[segment] = _Node()
+                node = child
+        return node.handlers
+
+    def match(self, method: str, path: str) -> FrozenSet[int]:
+        """Ids de API del patrón más específico que coincide con la petición"""
+        return self._match(self._root, split_path(path), 0, method.upper()) or frozenset()
+
+    def _match(self, node: _Node, segments: List[str], position: int,
+               method: str) -> Optional[FrozenSet[int]]:
+        if position == len(segments):
+            found = _pick(node.handlers, method)
+            if found:
+                return found
+        else:
+            child = node.static.get(segments[position])
+            if child is not None:
+                found = self._match(child, segments, position + 1, method)
+                if found:
+                    return found
+            if node.param is not None:
+                found = self._match(node.param, segments, position + 1, method)
+                if found:
+                    return found
+        return _pick(node.tail, method)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Tuple[int, str, Optional[int]]]) -> "RouteMatcher":
+        """Compilar filas ``(api_id, url_api, tipo_accion)``"""
+        matcher = cls()
+        for api_id, pattern, tipo_accion in entries:
+            matcher.add(api_id, pattern, tipo_accion)
+        return matcher
+
+
+def _pick(handlers: Dict[str, Set[int]], method: str) -> Optional[FrozenSet[int]]:
+    if not handlers:
+        return None
+    found = handlers.get(method, set()) | handlers.get(ANY_METHOD, set())
+    return frozenset(found) if found else None
@@ -0,0 +1,28 @@
+"""
+Registro de sesiones activas sobre el almacén de refresh tokens
+
+Una sesión es el refresh token vigente de un usuario en un dispositivo
+(``device_id``): el login revoca el anterior del mismo dispositivo y el refresh
+lo rota conservando el ``device_id``, así que el dispositivo identifica la
+sesión de forma estable. Con el backend SQL todas las operaciones son una sola
+sentencia sobre ``ix_refresh_tokens_user_device_active``.
+"""
+
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.token_store import token_store
+
+
+class SessionService():
+    async def list_sessions(db: AsyncSession, user_id: int) -> List:
+        """Sesiones vigentes del usuario, la de actividad más reciente primero"""
+        return await token_store.list_sessions(db, user_id)
+
+    async def revoke_session(db: AsyncSession, user_id: int, device_id: str) -> bool:
+        """
+        Cerrar la sesión de un dispositivo. El refresh token vigente se elimina
+        en lugar de marcarse revocado: presentar un token revocado se trata como
+        reutilización y revocaría todas las sesiones del usuario, mientras que
+        uno inexistente solo se rechaza. No hace commit.
+        """
+        return await token_store.delete_session(db, user_id, device_id)
@@ -0,0 +1,127 @@
+"""
+Firma y verificación de JWT con llaves precargadas
+
+Dos modos:
+- Simétrico (por defecto): HS256 con ``settings.secret_key``.
+- Asimétrico: si ``jwt_keys_dir`` está configurado se cargan las llaves PEM
+  del directorio una sola vez al iniciar. Cada archivo ``<kid>.pem`` es una
+  llave privada (EC P-256 → ES256, Ed25519 → EdDSA) y ``<kid>.pub.pem`` una
+  llave pública retirada que solo se usa para verificar. Se firma con
+  ``jwt_active_kid`` y los tokens llevan el ``kid`` en el header, de modo que
+  rotar es agregar una llave nueva, activarla y retirar la anterior cuando
+  expiren sus tokens. Las llaves públicas se publican en
+  ``/.well-known/jwks.json`` para que otros servicios verifiquen localmente.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+from app.core.config import settings
+
+
+class SigningKey:
+    __slots__ = ("kid", "algorithm", "private_key", "public_key")
+
+    def __init__(self, kid: Optional[str], algorithm: str, private_key: Any, public_key: Any):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.private_key = private_key
+        self.public_key = public_key
+
+    def to_jwk(self) -> Optional[Dict[str, Any]]:
+        """JWK público (None para llaves simétricas)"""
+        if self.algorithm == "ES256":
+            jwk = ECAlgorithm.to_jwk(self.public_key, as_dict=True)
+        elif self.algorithm == "EdDSA":
+            jwk = OKPAlgorithm.to_jwk(self.public_key, as_dict=True)
+        else:
+            return None
+        jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return jwk
+
+
+def _algorithm_for(public_key: Any) -> str:
+    if isinstance(public_key, ec.EllipticCurvePublicKey) and isinstance(public_key.curve, ec.SECP256R1):
+        return "ES256"
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return "EdDSA"
+    raise ValueError("Tipo de llave no soportado (se admite EC P-256 o Ed25519)")
+
+
+def _load_key_file(path: Path) -> SigningKey:
+    data = path.read_bytes()
+    if path.name.endswith(".pub.pem"):
+        kid = path.name[:-len(".pub.pem")]
+        private_key = None
+        public_key = load_pem_public_key(data)
+    else:
+        kid = path.stem
+        private_key = load_pem_private_key(data, password=None)
+        public_key = private_key.public_key()
+    return SigningKey(kid, _algorithm_for(public_key), private_key, public_key)
+
+
+class KeyRing:
+    """Llaves de firma cargadas en memoria, indexadas por kid"""
+
+    def __init__(self, active: SigningKey, keys: Optional[Dict[str, SigningKey]] = None):
+        self.active = active
+        self.keys = keys or {}
+        jwks = {"keys": [jwk for jwk in (k.to_jwk() for k in self.keys.values()) if jwk]}
+        # JWKS serializado una vez; el ETag cambia solo al rotar llaves
+        self.jwks_body = json.dumps(jwks, separators=(",", ":")).encode()
+        self.jwks_etag = '"%s"' % hashlib.sha256(self.jwks_body).hexdigest()[:32]
+
+    @property
+    def is_asymmetric(self) -> bool:
+        return self.active.kid is not None
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        headers = {"kid": self.active.kid} if self.active.kid else None
+        return jwt.encode(payload, self.active.private_key,
+                          algorithm=self.active.algorithm, headers=headers)
+
+    def _key_for(self, token: str) -> SigningKey:
+        if not self.is_asymmetric:
+            return self.active
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError("kid desconocido")
+        return key
+
+    def decode(self, token: str, **kwargs) -> Dict[str, Any]:
+        """
+        Verificar firma y claims. El algoritmo lo fija la llave del ``kid``,
+        nunca el header del token.
+        """
+        key = self._key_for(token)
+        return jwt.decode(token, key.public_key, algorithms=[key.algorithm], **kwargs)
+
+
+def load_keyring() -> KeyRing:
+    """Construir el keyring según la configuración (se llama una vez)"""
+    if not settings.jwt_keys_dir:
+        secret = SigningKey(None, settings.algorithm, settings.secret_key, settings.secret_key)
+        return KeyRing(secret)
+
+    keys: Dict[str, SigningKey] = {}
+    for path in sorted(Path(settings.jwt_keys_dir).glob("*.pem")):
+        key = _load_key_file(path)
+        keys[key.kid] = key
+
+    active = keys.get(settings.jwt_active_kid)
+    if active is None or active.private_key is None:
+        raise RuntimeError(
+            f"jwt_active_kid '{settings.jwt_active_kid}' no corresponde a una llave privada "
+            f"en {settings.jwt_keys_dir}"
+        )
+    return KeyRing(active, keys)
+
+
+keyring = load_keyring()
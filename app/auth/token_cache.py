@@ -0,0 +1,194 @@
+"""
+Cache de revocación de access tokens por worker
+
+Evita consultar la BD en cada petición autenticada:
+- jti válido → se mantiene hasta el ``exp`` del JWT.
+- jti revocado → se guarda como negativo para no volver a consultarlo.
+- principal → snapshot de columnas del usuario y sus roles con TTL corto
+  (incluye token_epoch, usado para validar los tokens sin estado).
+
+Los cambios ORM sobre usuarios, sus roles o los roles descartan el snapshot en
+este worker y se publican (``publisher``) en la misma transacción para que el
+bus de revocaciones lo descarte en los demás al hacer commit.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import Connection, event
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from app.core.config import settings
+from app.models.rol import Rol
+from app.models.usuario import Usuario
+from app.models.usuario_rol import UsuarioRol
+from app.utils.cache import LRUTTLCache
+
+_REVOKED = object()
+
+# Ventana tras una revocación en la que no se cachean jtis válidos del usuario:
+# cubre lecturas concurrentes hechas antes del commit de la revocación.
+REVOCATION_SETTLE_SECONDS = 5
+
+# Clave en Session.info con los usuarios ya publicados en la transacción
+_PUBLISHED_KEY = "principal_cache_published"
+
+
+class AccessTokenCache:
+    def __init__(self, max_tokens: int, max_users: int, user_ttl: float):
+        self.tokens = LRUTTLCache(maxsize=max_tokens)
+        self.users = LRUTTLCache(maxsize=max_users, ttl=user_ttl)
+        self._jtis_by_user: Dict[int, Set[str]] = {}
+        self._recently_revoked = LRUTTLCache(maxsize=max_users, ttl=REVOCATION_SETTLE_SECONDS)
+        # Publica ``(connection, user_id)`` a los demás workers (None: todos); lo asigna el bus
+        self.publisher: Optional[Callable[[Connection, Optional[int]], None]] = None
+
+    # ---------- jti ----------
+
+    def is_valid(self, jti: str) -> Optional[bool]:
+        """
+        True si el jti está en cache como válido, False si está revocado,
+        None si no hay información (hay que consultar la BD).
+        """
+        value = self.tokens.get(str(jti))
+        if value is None:
+            return None
+        return value is not _REVOKED
+
+    def remember_valid(self, jti: str, user_id: int, expires_at: float) -> None:
+        """Guardar un jti válido hasta su expiración (epoch en segundos)"""
+        if self._recently_revoked.get(user_id, count=False) is not None:
+            return
+        jti = str(jti)
+        self.tokens.set(jti, user_id, expires_at=expires_at)
+
+        jtis = self._jtis_by_user.setdefault(user_id, set())
+        jtis.add(jti)
+        if len(jtis) > 32:
+            # Purgar jtis que ya expiraron o fueron desalojados
+            jtis.intersection_update(j for j in jtis if j in self.tokens)
+
+    def remember_revoked(self, jti: str, expires_at: float) -> None:
+        self.tokens.set(str(jti), _REVOKED, expires_at=expires_at)
+
+    def revoke(self, jti: str) -> None:
+        """Invalidar un jti específico"""
+        jti = str(jti)
+        user_id = self.tokens.pop(jti)
+        if isinstance(user_id, int):
+            self._jtis_by_user.get(user_id, set()).discard(jti)
+
+    def revoke_user(self, user_id: int) -> None:
+        """Invalidar todos los jtis cacheados de un usuario y su snapshot"""
+        for jti in self._jtis_by_user.pop(user_id, set()):
+            self.tokens.pop(jti)
+        self.users.pop(user_id)
+        self._recently_revoked.set(user_id, True)
+
+    def apply_revocation(self, user_id: int, epoch: Optional[int] = None) -> None:
+        """
+        Revocación publicada en el bus (por otro worker o por este mismo). Si
+        el snapshot ya refleja ese epoch y no quedan jtis cacheados, el evento
+        llegó después de recargar el usuario y no hay nada que invalidar.
+        """
+        data = self.users.get(user_id, count=False)
+        if (epoch is not None and data is not None
+                and (data["user"]["token_epoch"] or 0) >= epoch
+                and not self._jtis_by_user.get(user_id)):
+            return
+        self.revoke_user(user_id)
+
+    # ---------- usuario ----------
+
+    def get_principal(self, user_id: int) -> Optional[Tuple[Usuario, List[Tuple[int, str, int]]]]:
+        """
+        Reconstruir el usuario desde el snapshot como instancia *detached*
+        junto con sus roles ``(id, nombre, id_aplicacion)``.
+        El usuario debe adjuntarse a la sesión con ``await db.merge(user, load=False)``.
+        """
+        data = self.users.get(user_id)
+        if data is None:
+            return None
+        user = Usuario(**data["user"])
+        make_transient_to_detached(user)
+        return user, data["roles"]
+
+    def get_user_epoch(self, user_id: int) -> Optional[int]:
+        data = self.users.get(user_id)
+        return data["user"]["token_epoch"] if data is not None else None
+
+    def remember_principal(self, user: Usuario, roles: List[Tuple[int, str, int]]) -> None:
+        if self._recently_revoked.get(user.id, count=False) is not None:
+            return
+        data = {c.key: getattr(user, c.key) for c in Usuario.__table__.columns}
+        self.users.set(user.id, {"user": data, "roles": list(roles)})
+
+    def forget_user(self, user_id: int) -> None:
+        self.users.pop(user_id)
+
+    def apply_user_change(self, user_id: Optional[int]) -> None:
+        """Cambio de usuario publicado por otro worker (None: todos los usuarios)"""
+        if user_id is None:
+            self.users.clear()
+        else:
+            self.forget_user(user_id)
+
+    def clear(self) -> None:
+        self.tokens.clear()
+        self.users.clear()
+        self._jtis_by_user.clear()
+        self._recently_revoked.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.auth_cache_enabled,
+            "tokens": self.tokens.stats(),
+            "users": self.users.stats(),
+        }
+
+
+access_token_cache = AccessTokenCache(
+    max_tokens=settings.auth_cache_max_tokens,
+    max_users=settings.auth_cache_max_users,
+    user_ttl=settings.auth_cache_user_ttl_seconds,
+)
+
+
+def _publish(connection: Connection, target, user_id: Optional[int]) -> None:
+    """Publicar el cambio una vez por transacción, en la misma conexión"""
+    if access_token_cache.publisher is None:
+        return
+    session = object_session(target)
+    if session is not None:
+        published = session.info.setdefault(_PUBLISHED_KEY, set())
+        if user_id in published:
+            return
+        published.add(user_id)
+    access_token_cache.publisher(connection, user_id)
+
+
+@event.listens_for(Usuario, "after_update")
+@event.listens_for(Usuario, "after_delete")
+def _invalidate_user_snapshot(mapper, connection, target: Usuario) -> None:
+    """Cualquier cambio ORM sobre un usuario descarta su snapshot"""
+    access_token_cache.forget_user(target.id)
+    _publish(connection, target, target.id)
+
+
+@event.listens_for(UsuarioRol, "after_insert")
+@event.listens_for(UsuarioRol, "after_update")
+@event.listens_for(UsuarioRol, "after_delete")
+def _invalidate_user_roles(mapper, connection, target: UsuarioRol) -> None:
+    access_token_cache.forget_user(target.id_usuario)
+    _publish(connection, target, target.id_usuario)
+
+
+@event.listens_for(Rol, "after_update")
+@event.listens_for(Rol, "after_delete")
+def _invalidate_all_principals(mapper, connection, target: Rol) -> None:
+    """Un rol modificado puede afectar a muchos usuarios: se vacía el snapshot"""
+    access_token_cache.users.clear()
+    _publish(connection, target, None)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _reset_published(session: Session) -> None:
+    session.info.pop(_PUBLISHED_KEY, None)
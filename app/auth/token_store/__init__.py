@@ -0,0 +1,44 @@
+"""
+Almacén de estado de tokens (access, refresh y reset)
+
+``TOKEN_STORE_BACKEND`` elige dónde vive ese estado:
+
+- ``sql`` (por defecto): tablas ``access_tokens``, ``refresh_tokens`` y
+  ``password_reset_tokens`` de la BD principal, dentro de la transacción del
+  llamador.
+- ``redis``: claves con TTL por token; descarga de la BD las escrituras de
+  cada login y refresh.
+- ``memory``: diccionarios del proceso; para pruebas o un único worker.
+
+Los servicios de ``app.auth`` delegan en ``token_store`` y no dependen del
+backend concreto.
+"""
+
+from app.auth.token_store.base import RefreshRecord, ResetRecord, TokenStore
+from app.auth.token_store.memory import MemoryTokenStore
+from app.auth.token_store.sql import SQLTokenStore
+from app.core.config import settings
+
+
+def create_token_store(backend: str) -> TokenStore:
+    if backend == "sql":
+        return SQLTokenStore()
+    if backend == "memory":
+        return MemoryTokenStore()
+    if backend == "redis":
+        from app.auth.token_store.redis_store import RedisTokenStore
+        return RedisTokenStore(settings.token_store_redis_url, settings.token_store_redis_prefix)
+    raise ValueError(f"TOKEN_STORE_BACKEND desconocido: {backend!r} (sql, redis o memory)")
+
+
+token_store = create_token_store(settings.token_store_backend)
+
+__all__ = [
+    "RefreshRecord",
+    "ResetRecord",
+    "TokenStore",
+    "MemoryTokenStore",
+    "SQLTokenStore",
+    "create_token_store",
+    "token_store",
+]
@@ -0,0 +1,129 @@
+"""
+Interfaz común de los almacenes de estado de tokens
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.utils.GeoIp2 import SessionContext
+
+
+class RefreshRecord:
+    """Estado de un refresh token (una sesión de dispositivo mientras está vigente)"""
+
+    __slots__ = ("user_id", "token_hash", "device_id", "ip", "user_agent",
+                 "created_at", "expires_at", "is_revoked", "revoked_at")
+
+    def __init__(self, user_id: int, token_hash: str, device_id: str,
+                 expires_at: datetime, created_at: Optional[datetime] = None,
+                 ip: Optional[str] = None, user_agent: Optional[Dict[str, Any]] = None,
+                 is_revoked: bool = False, revoked_at: Optional[datetime] = None):
+        self.user_id = user_id
+        self.token_hash = token_hash
+        self.device_id = device_id
+        self.ip = ip
+        self.user_agent = user_agent
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.is_revoked = is_revoked
+        self.revoked_at = revoked_at
+
+
+class ResetRecord:
+    """Estado de un token de restablecimiento de contraseña"""
+
+    __slots__ = ("user_id", "token_hash", "expires_at", "used_at")
+
+    def __init__(self, user_id: int, token_hash: str, expires_at: datetime,
+                 used_at: Optional[datetime] = None):
+        self.user_id = user_id
+        self.token_hash = token_hash
+        self.expires_at = expires_at
+        self.used_at = used_at
+
+
+class TokenStore(ABC):
+    """
+    Estado de access, refresh y reset tokens.
+
+    Todos los métodos reciben la sesión de BD del llamador: el backend SQL
+    escribe dentro de su transacción (el llamador hace commit) y los demás la
+    ignoran y escriben de inmediato. Los ``token_jti`` se normalizan a str.
+    """
+
+    name: str = ""
+
+    # El backend SQL resuelve el estado del access token en el mismo SELECT
+    # que el principal (LEFT JOIN en load_principal)
+    joins_principal: bool = False
+
+    # Access tokens (solo modo stateful)
+
+    @abstractmethod
+    async def save_access_token(self, db, *, user_id: int, jti: str, expires_at: datetime) -> None: ...
+
+    @abstractmethod
+    async def access_token_state(self, db, *, user_id: int, jti: str) -> Optional[bool]:
+        """True vigente, False revocado, None inexistente o expirado"""
+
+    @abstractmethod
+    async def revoke_access_tokens_by_user(self, db, user_id: int) -> None: ...
+
+    # Refresh tokens / sesiones
+
+    @abstractmethod
+    async def persist_login(self, db, *, user_id: int, access_token: Dict[str, Any],
+                            refresh_token: Dict[str, Any], session: SessionContext) -> None:
+        """
+        Revocar la sesión previa del dispositivo y guardar los tokens del login
+        (el access token solo en modo stateful)
+        """
+
+    @abstractmethod
+    async def rotate_refresh_token(self, db, *, user_id: int, token_jti: str, token_hash: str,
+                                   access_token: Dict[str, Any],
+                                   refresh_token: Dict[str, Any],
+                                   session: SessionContext) -> Optional[RefreshRecord]:
+        """
+        Consumir el refresh token vigente y guardar sus sucesores de forma
+        atómica. ``token_hash`` es el hash del token presentado: los backends
+        sin hashes heredados lo comparan antes de consumir; el SQL lo deja al
+        llamador (puede haber hashes bcrypt). Retorna el token consumido (con
+        ``token_hash`` y ``device_id``) o None si no estaba vigente.
+        """
+
+    @abstractmethod
+    async def refresh_revoked_at(self, db, *, user_id: int, token_jti: str) -> Optional[datetime]:
+        """Fecha de uso/revocación del token, None si no existe o sigue vigente"""
+
+    @abstractmethod
+    async def revoke_refresh_tokens_by_user(self, db, user_id: int) -> None: ...
+
+    @abstractmethod
+    async def revoke_refresh_token_by_device(self, db, user_id: int, device_id: str) -> None: ...
+
+    @abstractmethod
+    async def list_sessions(self, db, user_id: int) -> List[RefreshRecord]:
+        """Refresh tokens vigentes del usuario, el más reciente primero"""
+
+    @abstractmethod
+    async def delete_session(self, db, user_id: int, device_id: str) -> bool: ...
+
+    # Tokens de restablecimiento de contraseña
+
+    @abstractmethod
+    async def save_reset_token(self, db, *, user_id: int, jti: str, token_hash: str,
+                               expires_at: datetime, ip_address: Optional[str],
+                               user_agent: Optional[Dict[str, Any]]) -> None: ...
+
+    @abstractmethod
+    async def get_reset_token(self, db, jti: str) -> Optional[ResetRecord]: ...
+
+    @abstractmethod
+    async def use_reset_tokens_by_user(self, db, user_id: int) -> None: ...
+
+    async def close(self) -> None:
+        """Liberar conexiones propias del backend (al apagar el worker)"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
@@ -0,0 +1,180 @@
+"""
+Backend en memoria: para pruebas y despliegues de un solo proceso
+
+Cada operación se ejecuta sin ``await`` intermedios, por lo que es atómica
+respecto al event loop. Las entradas expiradas se ignoran al leer y se purgan
+cada ``PRUNE_EVERY`` escrituras. El estado se pierde al reiniciar el proceso.
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+from app.auth.jwt_handler import hash_token
+from app.auth.token_store.base import RefreshRecord, ResetRecord, TokenStore
+from app.core.config import settings
+from app.utils.GeoIp2 import SessionContext
+
+PRUNE_EVERY = 1000
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class MemoryTokenStore(TokenStore):
+    name = "memory"
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        # jti → [user_id, revocado, expira (epoch)]
+        self._access: Dict[str, list] = {}
+        self._refresh: Dict[str, RefreshRecord] = {}
+        self._reset: Dict[str, ResetRecord] = {}
+        self._access_by_user: Dict[int, Set[str]] = {}
+        self._refresh_by_user: Dict[int, Set[str]] = {}
+        self._reset_by_user: Dict[int, Set[str]] = {}
+        self._writes = 0
+
+    def _alive(self, expires_at: datetime) -> bool:
+        return expires_at.timestamp() > self._clock()
+
+    def _written(self) -> None:
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        """Eliminar las entradas expiradas"""
+        now = self._clock()
+        for jti in [j for j, entry in self._access.items() if entry[2] <= now]:
+            self._access_by_user.get(self._access.pop(jti)[0], set()).discard(jti)
+        for jti in [j for j, r in self._refresh.items() if r.expires_at.timestamp() <= now]:
+            self._refresh_by_user.get(self._refresh.pop(jti).user_id, set()).discard(jti)
+        for jti in [j for j, r in self._reset.items() if r.expires_at.timestamp() <= now]:
+            self._reset_by_user.get(self._reset.pop(jti).user_id, set()).discard(jti)
+
+    def _user_refresh(self, user_id: int) -> List[RefreshRecord]:
+        return [self._refresh[jti] for jti in self._refresh_by_user.get(user_id, ())
+                if jti in self._refresh and self._alive(self._refresh[jti].expires_at)]
+
+    def _save_refresh(self, user_id: int, refresh_token: Dict[str, Any],
+                      session: SessionContext, device_id: str) -> None:
+        jti = str(refresh_token["jti"])
+        self._refresh[jti] = RefreshRecord(
+            user_id=user_id,
+            token_hash=hash_token(refresh_token["token"]),
+            device_id=device_id,
+            ip=session.ip,
+            user_agent=session.user_agent,
+            created_at=_now(),
+            expires_at=refresh_token["expires_at"],
+        )
+        self._refresh_by_user.setdefault(user_id, set()).add(jti)
+        self._written()
+
+    def _save_access(self, user_id: int, access_token: Dict[str, Any]) -> None:
+        if settings.access_token_mode == "epoch":
+            return
+        jti = str(access_token["jti"])
+        self._access[jti] = [user_id, False, access_token["expires_at"].timestamp()]
+        self._access_by_user.setdefault(user_id, set()).add(jti)
+        self._written()
+
+    def _revoke(self, records: List[RefreshRecord]) -> None:
+        now = _now()
+        for record in records:
+            if not record.is_revoked:
+                record.is_revoked = True
+                record.revoked_at = now
+
+    # Access tokens
+
+    async def save_access_token(self, db, *, user_id: int, jti: str, expires_at: datetime) -> None:
+        self._save_access(user_id, {"jti": jti, "expires_at": expires_at})
+
+    async def access_token_state(self, db, *, user_id: int, jti: str) -> Optional[bool]:
+        entry = self._access.get(str(jti))
+        if entry is None or entry[0] != user_id or entry[2] <= self._clock():
+            return None
+        return not entry[1]
+
+    async def revoke_access_tokens_by_user(self, db, user_id: int) -> None:
+        for jti in self._access_by_user.get(user_id, ()):
+            if jti in self._access:
+                self._access[jti][1] = True
+
+    # Refresh tokens / sesiones
+
+    async def persist_login(self, db, *, user_id: int, access_token: Dict[str, Any],
+                            refresh_token: Dict[str, Any], session: SessionContext) -> None:
+        self._revoke([r for r in self._user_refresh(user_id) if r.device_id == session.device_id])
+        self._save_access(user_id, access_token)
+        self._save_refresh(user_id, refresh_token, session, session.device_id)
+
+    async def rotate_refresh_token(self, db, *, user_id: int, token_jti: str, token_hash: str,
+                                   access_token: Dict[str, Any], refresh_token: Dict[str, Any],
+                                   session: SessionContext) -> Optional[RefreshRecord]:
+        used = self._refresh.get(str(token_jti))
+        if (used is None or used.user_id != user_id or used.is_revoked
+                or used.token_hash != token_hash or not self._alive(used.expires_at)):
+            return None
+        self._revoke([used])
+        self._save_access(user_id, access_token)
+        self._save_refresh(user_id, refresh_token, session, used.device_id)
+        return used
+
+    async def refresh_revoked_at(self, db, *, user_id: int, token_jti: str) -> Optional[datetime]:
+        record = self._refresh.get(str(token_jti))
+        if record is None or record.user_id != user_id or not record.is_revoked:
+            return None
+        return record.revoked_at
+
+    async def revoke_refresh_tokens_by_user(self, db, user_id: int) -> None:
+        self._revoke(self._user_refresh(user_id))
+
+    async def revoke_refresh_token_by_device(self, db, user_id: int, device_id: str) -> None:
+        self._revoke([r for r in self._user_refresh(user_id) if r.device_id == device_id])
+
+    async def list_sessions(self, db, user_id: int) -> List[RefreshRecord]:
+        active = [r for r in self._user_refresh(user_id) if not r.is_revoked]
+        return sorted(active, key=lambda r: r.created_at, reverse=True)
+
+    async def delete_session(self, db, user_id: int, device_id: str) -> bool:
+        jtis = [jti for jti in self._refresh_by_user.get(user_id, ())
+                if jti in self._refresh
+                and self._refresh[jti].device_id == device_id
+                and not self._refresh[jti].is_revoked]
+        for jti in jtis:
+            del self._refresh[jti]
+            self._refresh_by_user[user_id].discard(jti)
+        return bool(jtis)
+
+    # Tokens de restablecimiento de contraseña
+
+    async def save_reset_token(self, db, *, user_id: int, jti: str, token_hash: str,
+                               expires_at: datetime, ip_address: Optional[str],
+                               user_agent: Optional[Dict[str, Any]]) -> None:
+        self._reset[str(jti)] = ResetRecord(user_id, token_hash, expires_at)
+        self._reset_by_user.setdefault(user_id, set()).add(str(jti))
+        self._written()
+
+    async def get_reset_token(self, db, jti: str) -> Optional[ResetRecord]:
+        record = self._reset.get(str(jti))
+        if record is None or not self._alive(record.expires_at):
+            return None
+        return record
+
+    async def use_reset_tokens_by_user(self, db, user_id: int) -> None:
+        now = _now()
+        for jti in self._reset_by_user.get(user_id, ()):
+            record = self._reset.get(jti)
+            if record is not None and record.used_at is None:
+                record.used_at = now
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "access_tokens": len(self._access),
+            "refresh_tokens": len(self._refresh),
+            "reset_tokens": len(self._reset),
+        }
@@ -0,0 +1,311 @@
+"""
+Backend Redis: estado de tokens fuera de la BD principal
+
+Cada token es una clave con TTL igual a su expiración, así que Redis los
+descarta solo y el job de limpieza de la BD no aplica. Las claves de un
+usuario comparten el hash tag ``{user_id}`` (mismo slot en Redis Cluster) y
+las operaciones que leen y escriben varias claves (login, rotación,
+revocaciones) son scripts Lua, atómicos en el servidor:
+
+- ``at:{uid}:<jti>``  access token: "0" vigente, "1" revocado
+- ``atu:{uid}``       jtis de access tokens del usuario
+- ``rt:{uid}:<jti>``  hash del refresh token
+- ``rtu:{uid}``       jtis de refresh tokens del usuario
+- ``prt:{uid}:<jti>`` hash del token de restablecimiento
+- ``prtu:{uid}``      jtis de tokens de restablecimiento del usuario
+- ``prtj:<jti>``      user_id del token de restablecimiento (el confirm solo trae el jti)
+
+Las fechas se guardan como epoch (segundos) y el user_agent como JSON.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from app.auth.jwt_handler import hash_token
+from app.auth.token_store.base import RefreshRecord, ResetRecord, TokenStore
+from app.core.config import settings
+from app.utils.GeoIp2 import SessionContext
+
+
+# Helpers comunes de los scripts. ``save_refresh`` y ``save_access`` escriben
+# el token con su expiración y extienden la del índice del usuario (los tokens
+# nuevos siempre expiran después que los anteriores).
+_LUA_HELPERS = """
+local function save_refresh(set_key, key, jti, uid, token_hash, device_id, ip, ua, now, exp)
+  redis.call('HSET', key, 'user_id', uid, 'token_hash', token_hash, 'device_id', device_id,
+             'ip', ip, 'user_agent', ua, 'created_at', now, 'expires_at', exp, 'is_revoked', '0')
+  redis.call('EXPIREAT', key, exp)
+  redis.call('SADD', set_key, jti)
+  redis.call('EXPIREAT', set_key, exp)
+end
+
+local function save_access(set_key, key, jti, exp)
+  redis.call('SET', key, '0', 'EXAT', exp)
+  redis.call('SADD', set_key, jti)
+  redis.call('EXPIREAT', set_key, exp)
+end
+
+-- Revoca (o elimina) los refresh tokens vigentes del usuario; device '' = todos
+local function revoke_refresh(set_key, prefix, device_id, now, remove)
+  local count = 0
+  for _, jti in ipairs(redis.call('SMEMBERS', set_key)) do
+    local key = prefix .. jti
+    local fields = redis.call('HMGET', key, 'device_id', 'is_revoked')
+    if not fields[1] then
+      redis.call('SREM', set_key, jti)
+    elseif (device_id == '' or fields[1] == device_id) and fields[2] == '0' then
+      if remove then
+        redis.call('DEL', key)
+        redis.call('SREM', set_key, jti)
+      else
+        redis.call('HSET', key, 'is_revoked', '1', 'revoked_at', now)
+      end
+      count = count + 1
+    end
+  end
+  return count
+end
+"""
+
+# KEYS: rtu, rt nuevo, at nuevo, atu
+# ARGV: uid, device_id, now, jti refresh, hash, ip, user_agent, exp refresh,
+#       guardar access ('1'/'0'), jti access, exp access, prefijo rt del usuario
+_PERSIST_LOGIN = _LUA_HELPERS + """
+revoke_refresh(KEYS[1], ARGV[12], ARGV[2], ARGV[3], false)
+if ARGV[9] == '1' then
+  save_access(KEYS[4], KEYS[3], ARGV[10], ARGV[11])
+end
+save_refresh(KEYS[1], KEYS[2], ARGV[4], ARGV[1], ARGV[5], ARGV[2], ARGV[6], ARGV[7], ARGV[3], ARGV[8])
+return 1
+"""
+
+# KEYS: rtu, rt usado, rt nuevo, at nuevo, atu
+# ARGV: uid, now, hash presentado, jti refresh, hash nuevo, ip, user_agent,
+#       exp refresh, guardar access ('1'/'0'), jti access, exp access
+_ROTATE = _LUA_HELPERS + """
+local used = redis.call('HMGET', KEYS[2], 'user_id', 'is_revoked', 'token_hash', 'device_id', 'expires_at')
+if used[1] ~= ARGV[1] or used[2] ~= '0' or used[3] ~= ARGV[3] then
+  return false
+end
+redis.call('HSET', KEYS[2], 'is_revoked', '1', 'revoked_at', ARGV[2])
+if ARGV[9] == '1' then
+  save_access(KEYS[5], KEYS[4], ARGV[10], ARGV[11])
+end
+save_refresh(KEYS[1], KEYS[3], ARGV[4], ARGV[1], ARGV[5], used[4], ARGV[6], ARGV[7], ARGV[2], ARGV[8])
+return {used[3], used[4], used[5]}
+"""
+
+# KEYS: rtu   ARGV: prefijo rt del usuario, device_id ('' = todos), now, eliminar ('1'/'0')
+_REVOKE_REFRESH = _LUA_HELPERS + """
+return revoke_refresh(KEYS[1], ARGV[1], ARGV[2], ARGV[3], ARGV[4] == '1')
+"""
+
+# KEYS: atu   ARGV: prefijo at del usuario
+_REVOKE_ACCESS = """
+for _, jti in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+  redis.call('SET', ARGV[1] .. jti, '1', 'KEEPTTL', 'XX')
+end
+return 1
+"""
+
+# KEYS: prtu   ARGV: prefijo prt del usuario, now
+_USE_RESET = """
+for _, jti in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+  local key = ARGV[1] .. jti
+  if redis.call('EXISTS', key) == 1 then
+    redis.call('HSETNX', key, 'used_at', ARGV[2])
+  else
+    redis.call('SREM', KEYS[1], jti)
+  end
+end
+return 1
+"""
+
+
+def _epoch(moment: datetime) -> int:
+    return int(moment.timestamp())
+
+
+def _from_epoch(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromtimestamp(float(value), timezone.utc)
+
+
+class RedisTokenStore(TokenStore):
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "auth:"):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as e:
+            raise RuntimeError("TOKEN_STORE_BACKEND=redis requiere el paquete 'redis'") from e
+        self._redis = aioredis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self._persist_login = self._redis.register_script(_PERSIST_LOGIN)
+        self._rotate = self._redis.register_script(_ROTATE)
+        self._revoke_refresh = self._redis.register_script(_REVOKE_REFRESH)
+        self._revoke_access = self._redis.register_script(_REVOKE_ACCESS)
+        self._use_reset = self._redis.register_script(_USE_RESET)
+
+    # Claves
+
+    def _key(self, kind: str, user_id: int, jti: str = "") -> str:
+        return f"{self._prefix}{kind}:{{{user_id}}}:{jti}"
+
+    def _set_key(self, kind: str, user_id: int) -> str:
+        return f"{self._prefix}{kind}:{{{user_id}}}"
+
+    def _access_args(self, access_token: Dict[str, Any]) -> List[Any]:
+        if settings.access_token_mode == "epoch":
+            return ["0", "", 0]
+        return ["1", str(access_token["jti"]), _epoch(access_token["expires_at"])]
+
+    # Access tokens
+
+    async def save_access_token(self, db, *, user_id: int, jti: str, expires_at: datetime) -> None:
+        if settings.access_token_mode == "epoch":
+            return
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._key("at", user_id, str(jti)), "0", exat=_epoch(expires_at))
+            pipe.sadd(self._set_key("atu", user_id), str(jti))
+            pipe.expireat(self._set_key("atu", user_id), _epoch(expires_at))
+            await pipe.execute()
+
+    async def access_token_state(self, db, *, user_id: int, jti: str) -> Optional[bool]:
+        value = await self._redis.get(self._key("at", user_id, str(jti)))
+        if value is None:
+            return None
+        return value == "0"
+
+    async def revoke_access_tokens_by_user(self, db, user_id: int) -> None:
+        await self._revoke_access(keys=[self._set_key("atu", user_id)],
+                                  args=[self._key("at", user_id)])
+
+    # Refresh tokens / sesiones
+
+    async def persist_login(self, db, *, user_id: int, access_token: Dict[str, Any],
+                            refresh_token: Dict[str, Any], session: SessionContext) -> None:
+        access_jti = str(access_token["jti"]) if settings.access_token_mode != "epoch" else ""
+        await self._persist_login(
+            keys=[
+                self._set_key("rtu", user_id),
+                self._key("rt", user_id, str(refresh_token["jti"])),
+                self._key("at", user_id, access_jti),
+                self._set_key("atu", user_id),
+            ],
+            args=[
+                user_id, session.device_id, _epoch(datetime.now(timezone.utc)),
+                str(refresh_token["jti"]), hash_token(refresh_token["token"]),
+                session.ip or "", json.dumps(session.user_agent), _epoch(refresh_token["expires_at"]),
+                *self._access_args(access_token),
+                self._key("rt", user_id),
+            ],
+        )
+
+    async def rotate_refresh_token(self, db, *, user_id: int, token_jti: str, token_hash: str,
+                                   access_token: Dict[str, Any], refresh_token: Dict[str, Any],
+                                   session: SessionContext) -> Optional[RefreshRecord]:
+        access_jti = str(access_token["jti"]) if settings.access_token_mode != "epoch" else ""
+        used = await self._rotate(
+            keys=[
+                self._set_key("rtu", user_id),
+                self._key("rt", user_id, str(token_jti)),
+                self._key("rt", user_id, str(refresh_token["jti"])),
+                self._key("at", user_id, access_jti),
+                self._set_key("atu", user_id),
+            ],
+            args=[
+                user_id, _epoch(datetime.now(timezone.utc)), token_hash,
+                str(refresh_token["jti"]), hash_token(refresh_token["token"]),
+                session.ip or "", json.dumps(session.user_agent), _epoch(refresh_token["expires_at"]),
+                *self._access_args(access_token),
+            ],
+        )
+        if not used:
+            return None
+        return RefreshRecord(user_id=user_id, token_hash=used[0], device_id=used[1],
+                             expires_at=_from_epoch(used[2]), is_revoked=True)
+
+    async def refresh_revoked_at(self, db, *, user_id: int, token_jti: str) -> Optional[datetime]:
+        is_revoked, revoked_at = await self._redis.hmget(
+            self._key("rt", user_id, str(token_jti)), "is_revoked", "revoked_at")
+        if is_revoked != "1":
+            return None
+        return _from_epoch(revoked_at) or datetime.min.replace(tzinfo=timezone.utc)
+
+    async def _revoke_refresh_tokens(self, user_id: int, device_id: str, remove: bool) -> int:
+        return await self._revoke_refresh(
+            keys=[self._set_key("rtu", user_id)],
+            args=[self._key("rt", user_id), device_id,
+                  _epoch(datetime.now(timezone.utc)), "1" if remove else "0"],
+        )
+
+    async def revoke_refresh_tokens_by_user(self, db, user_id: int) -> None:
+        await self._revoke_refresh_tokens(user_id, "", remove=False)
+
+    async def revoke_refresh_token_by_device(self, db, user_id: int, device_id: str) -> None:
+        await self._revoke_refresh_tokens(user_id, device_id, remove=False)
+
+    async def list_sessions(self, db, user_id: int) -> List[RefreshRecord]:
+        jtis = await self._redis.smembers(self._set_key("rtu", user_id))
+        if not jtis:
+            return []
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for jti in jtis:
+                pipe.hgetall(self._key("rt", user_id, jti))
+            rows = await pipe.execute()
+        sessions = [
+            RefreshRecord(
+                user_id=user_id,
+                token_hash=row["token_hash"],
+                device_id=row["device_id"],
+                ip=row.get("ip") or None,
+                user_agent=json.loads(row.get("user_agent") or "null"),
+                created_at=_from_epoch(row.get("created_at")),
+                expires_at=_from_epoch(row["expires_at"]),
+            )
+            for row in rows if row and row.get("is_revoked") == "0"
+        ]
+        return sorted(sessions, key=lambda r: r.created_at, reverse=True)
+
+    async def delete_session(self, db, user_id: int, device_id: str) -> bool:
+        return await self._revoke_refresh_tokens(user_id, device_id, remove=True) > 0
+
+    # Tokens de restablecimiento de contraseña
+
+    async def save_reset_token(self, db, *, user_id: int, jti: str, token_hash: str,
+                               expires_at: datetime, ip_address: Optional[str],
+                               user_agent: Optional[Dict[str, Any]]) -> None:
+        key = self._key("prt", user_id, str(jti))
+        exp = _epoch(expires_at)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={
+                "user_id": user_id,
+                "token_hash": token_hash,
+                "expires_at": exp,
+                "ip_address": ip_address or "",
+                "user_agent": json.dumps(user_agent),
+            })
+            pipe.expireat(key, exp)
+            pipe.set(f"{self._prefix}prtj:{jti}", user_id, exat=exp)
+            pipe.sadd(self._set_key("prtu", user_id), str(jti))
+            pipe.expireat(self._set_key("prtu", user_id), exp)
+            await pipe.execute()
+
+    async def get_reset_token(self, db, jti: str) -> Optional[ResetRecord]:
+        user_id = await self._redis.get(f"{self._prefix}prtj:{jti}")
+        if user_id is None:
+            return None
+        row = await self._redis.hgetall(self._key("prt", int(user_id), str(jti)))
+        if not row:
+            return None
+        return ResetRecord(int(row["user_id"]), row["token_hash"],
+                           _from_epoch(row["expires_at"]), _from_epoch(row.get("used_at")))
+
+    async def use_reset_tokens_by_user(self, db, user_id: int) -> None:
+        await self._use_reset(keys=[self._set_key("prtu", user_id)],
+                              args=[self._key("prt", user_id), _epoch(datetime.now(timezone.utc))])
+
+    async def close(self) -> None:
+        await self._redis.aclose()
@@ -0,0 +1,283 @@
+"""
+Backend SQL: estado de tokens en la BD principal (comportamiento original)
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Boolean, DateTime, String, delete, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.jwt_handler import hash_token
+from app.auth.token_store.base import ResetRecord, TokenStore
+from app.core.config import settings
+from app.models.access_token import AccessToken
+from app.models.password_reset_token import PasswordResetToken
+from app.models.refresh_token import RefreshToken
+from app.utils.GeoIp2 import SessionContext
+
+
+def _stateful() -> bool:
+    return settings.access_token_mode != "epoch"
+
+
+class SQLTokenStore(TokenStore):
+    name = "sql"
+    joins_principal = True
+
+    # Access tokens
+
+    async def save_access_token(self, db: AsyncSession, *, user_id: int, jti: str,
+                                expires_at: datetime) -> None:
+        db.add(AccessToken(user_id=user_id, jti=jti, expires_at=expires_at))
+
+    async def access_token_state(self, db: AsyncSession, *, user_id: int, jti: str) -> Optional[bool]:
+        result = await db.execute(
+            select(AccessToken.is_revoked)
+            .where(AccessToken.jti == jti, AccessToken.user_id == user_id)
+        )
+        revoked = result.scalar_one_or_none()
+        return None if revoked is None else not revoked
+
+    async def revoke_access_tokens_by_user(self, db: AsyncSession, user_id: int) -> None:
+        await db.execute(update(AccessToken)
+                         .where(AccessToken.user_id == user_id, AccessToken.is_revoked == False)
+                         .values(is_revoked=True, revoked_at=datetime.now(timezone.utc))
+                         )
+
+    # Refresh tokens / sesiones
+
+    async def persist_login(self, db: AsyncSession, *, user_id: int, access_token: Dict[str, Any],
+                            refresh_token: Dict[str, Any], session: SessionContext) -> None:
+        """
+        En PostgreSQL se envía como una única sentencia (CTEs con RETURNING);
+        en otros motores como sentencias core sin pasar por el flush del ORM.
+        """
+        revoke_device = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.user_id == user_id,
+                RefreshToken.device_id == session.device_id,
+                RefreshToken.is_revoked == False,
+            )
+            .values(is_revoked=True, revoked_at=datetime.now(timezone.utc))
+        )
+        save_access = None
+        if _stateful():
+            save_access = insert(AccessToken).values(
+                user_id=user_id,
+                jti=access_token["jti"],
+                expires_at=access_token["expires_at"],
+                is_revoked=False,
+            )
+        save_refresh = insert(RefreshToken).values(
+            user_id=user_id,
+            token_jti=refresh_token["jti"],
+            token_hash=hash_token(refresh_token["token"]),
+            expires_at=refresh_token["expires_at"],
+            ip=session.ip,
+            user_agent=session.user_agent,
+            device_id=session.device_id,
+            is_revoked=False,
+        )
+
+        if db.get_bind().dialect.name == "postgresql":
+            # Los CTE que modifican datos ven el mismo snapshot: el UPDATE no
+            # alcanza al refresh token que se inserta en la misma sentencia.
+            ctes = [revoke_device.returning(RefreshToken.id).cte("revoked_device")]
+            if save_access is not None:
+                ctes.append(save_access.returning(AccessToken.id).cte("new_access_token"))
+            await db.execute(save_refresh.add_cte(*ctes))
+            return
+
+        await db.execute(revoke_device)
+        if save_access is not None:
+            await db.execute(save_access)
+        await db.execute(save_refresh)
+
+    async def rotate_refresh_token(self, db: AsyncSession, *, user_id: int, token_jti: str,
+                                   token_hash: str, access_token: Dict[str, Any], refresh_token: Dict[str, Any],
+                                   session: SessionContext):
+        """
+        El ``UPDATE ... WHERE is_revoked = false RETURNING`` solo afecta una
+        fila si el token seguía vigente, y los ``INSERT`` leen de ese
+        resultado, así que sin fila afectada no se crea nada. Dos peticiones
+        concurrentes se serializan en el bloqueo de la fila y la segunda no
+        afecta filas. Retorna ``(id, token_hash, device_id)`` del token consumido.
+        """
+        now = datetime.now(timezone.utc)
+        consume = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_jti == token_jti,
+                RefreshToken.user_id == user_id,
+                RefreshToken.is_revoked == False,
+            )
+            .values(is_revoked=True, revoked_at=now)
+        )
+
+        if db.get_bind().dialect.name != "postgresql":
+            return await self._rotate_statements(
+                db, consume, token_jti=token_jti, user_id=user_id,
+                access_token=access_token, refresh_token=refresh_token, session=session,
+            )
+
+        used = consume.returning(
+            RefreshToken.id, RefreshToken.token_hash, RefreshToken.device_id
+        ).cte("used_refresh_token")
+
+        ctes = []
+        if _stateful():
+            ctes.append(
+                AccessToken.__table__.insert()
+                .from_select(
+                    ["user_id", "jti", "expires_at", "is_revoked"],
+                    select(
+                        literal(user_id),
+                        literal(access_token["jti"], AccessToken.jti.type),
+                        literal(access_token["expires_at"], DateTime(timezone=True)),
+                        literal(False, Boolean),
+                    ).select_from(used)
+                )
+                .returning(AccessToken.id)
+                .cte("new_access_token")
+            )
+        ctes.append(
+            RefreshToken.__table__.insert()
+            .from_select(
+                ["user_id", "token_jti", "token_hash", "expires_at",
+                 "ip", "user_agent", "device_id", "is_revoked"],
+                select(
+                    literal(user_id),
+                    literal(refresh_token["jti"], RefreshToken.token_jti.type),
+                    literal(hash_token(refresh_token["token"]), String),
+                    literal(refresh_token["expires_at"], DateTime(timezone=True)),
+                    literal(session.ip, String),
+                    literal(session.user_agent, JSONB),
+                    used.c.device_id,
+                    literal(False, Boolean),
+                )
+            )
+            .returning(RefreshToken.id)
+            .cte("new_refresh_token")
+        )
+
+        result = await db.execute(
+            select(used.c.id, used.c.token_hash, used.c.device_id).add_cte(*ctes)
+        )
+        return result.first()
+
+    async def _rotate_statements(self, db: AsyncSession, consume, *, token_jti: str, user_id: int,
+                                 access_token: Dict[str, Any], refresh_token: Dict[str, Any],
+                                 session: SessionContext):
+        """Motores sin RETURNING en UPDATE: misma semántica en varias sentencias"""
+        result = await db.execute(consume.execution_options(synchronize_session=False))
+        if result.rowcount != 1:
+            return None
+
+        used = (await db.execute(
+            select(RefreshToken.id, RefreshToken.token_hash, RefreshToken.device_id)
+            .where(RefreshToken.token_jti == token_jti)
+        )).first()
+
+        if _stateful():
+            await db.execute(AccessToken.__table__.insert().values(
+                user_id=user_id,
+                jti=access_token["jti"],
+                expires_at=access_token["expires_at"],
+                is_revoked=False,
+            ))
+        await db.execute(RefreshToken.__table__.insert().values(
+            user_id=user_id,
+            token_jti=refresh_token["jti"],
+            token_hash=hash_token(refresh_token["token"]),
+            expires_at=refresh_token["expires_at"],
+            ip=session.ip,
+            user_agent=session.user_agent,
+            device_id=used.device_id,
+            is_revoked=False,
+        ))
+        return used
+
+    async def refresh_revoked_at(self, db: AsyncSession, *, user_id: int, token_jti: str) -> Optional[datetime]:
+        result = await db.execute(
+            select(RefreshToken.is_revoked, RefreshToken.revoked_at)
+            .where(RefreshToken.token_jti == token_jti, RefreshToken.user_id == user_id)
+        )
+        row = result.first()
+        if row is None or not row.is_revoked:
+            return None
+        # Un token revocado sin fecha se trata como revocado hace mucho
+        return row.revoked_at or datetime.min.replace(tzinfo=timezone.utc)
+
+    async def revoke_refresh_tokens_by_user(self, db: AsyncSession, user_id: int) -> None:
+        await db.execute(update(RefreshToken)
+                         .where(RefreshToken.user_id == user_id, RefreshToken.is_revoked == False)
+                         .values(is_revoked=True, revoked_at=datetime.now(timezone.utc))
+                         )
+
+    async def revoke_refresh_token_by_device(self, db: AsyncSession, user_id: int, device_id: str) -> None:
+        await db.execute(update(RefreshToken)
+                         .where(RefreshToken.user_id == user_id,
+                                RefreshToken.device_id == device_id,
+                                RefreshToken.is_revoked == False)
+                         .values(is_revoked=True, revoked_at=datetime.now(timezone.utc))
+                         )
+
+    async def list_sessions(self, db: AsyncSession, user_id: int) -> List:
+        result = await db.execute(
+            select(
+                RefreshToken.device_id,
+                RefreshToken.ip,
+                RefreshToken.user_agent,
+                RefreshToken.created_at,
+                RefreshToken.expires_at,
+            )
+            .where(
+                RefreshToken.user_id == user_id,
+                RefreshToken.is_revoked == False,
+                RefreshToken.expires_at > datetime.now(timezone.utc),
+            )
+            .order_by(RefreshToken.created_at.desc())
+        )
+        return list(result.all())
+
+    async def delete_session(self, db: AsyncSession, user_id: int, device_id: str) -> bool:
+        result = await db.execute(
+            delete(RefreshToken)
+            .where(
+                RefreshToken.user_id == user_id,
+                RefreshToken.device_id == device_id,
+                RefreshToken.is_revoked == False,
+            )
+        )
+        return result.rowcount > 0
+
+    # Tokens de restablecimiento de contraseña
+
+    async def save_reset_token(self, db: AsyncSession, *, user_id: int, jti: str, token_hash: str,
+                               expires_at: datetime, ip_address: Optional[str],
+                               user_agent: Optional[Dict[str, Any]]) -> None:
+        db.add(PasswordResetToken(
+            user_id=user_id,
+            jti=jti,
+            token_hash=token_hash,
+            expires_at=expires_at,
+            ip_address=ip_address,
+            user_agent=user_agent,
+        ))
+
+    async def get_reset_token(self, db: AsyncSession, jti: str) -> Optional[ResetRecord]:
+        result = await db.execute(
+            select(PasswordResetToken).where(PasswordResetToken.jti == jti)
+        )
+        token = result.scalar_one_or_none()
+        if token is None:
+            return None
+        return ResetRecord(token.user_id, token.token_hash, token.expires_at, token.used_at)
+
+    async def use_reset_tokens_by_user(self, db: AsyncSession, user_id: int) -> None:
+        await db.execute(update(PasswordResetToken)
+                         .where(PasswordResetToken.user_id == user_id,
+                                PasswordResetToken.used_at.is_(None))
+                         .values(used_at=datetime.now(timezone.utc))
+                         )
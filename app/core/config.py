@@ -31,7 +31,72 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
     pass_reset_token_expire_minutes: int = 15
+    access_token_mode: str = "stateful"  # stateful (fila por jti) | epoch (sin estado)
+
+    # Firma asimétrica (ES256/EdDSA): directorio con <kid>.pem y kid activo.
+    # Vacío: se firma con HS256 y secret_key
+    jwt_keys_dir: str = ""
+    jwt_active_kid: str = ""
+    jwks_max_age_seconds: int = 86400
+
+    # Hash de refresh/reset tokens (HMAC-SHA256)
+    token_hash_key: str = ""  # vacío: se deriva de secret_key
+    token_hash_accept_bcrypt: bool = True  # ventana de migración de hashes bcrypt
     REFRESH_TOKEN_EXPIRE_SECONDS: int = 60 * 60 * 24 * refresh_token_expire_days
+
+    # Hash de contraseñas (bcrypt fuera del event loop)
+    password_hash_workers: int = 4
+    password_hash_queue_limit: int = 32
+
+    # Cache de autenticación (por worker)
+    auth_cache_enabled: bool = True
+    auth_cache_max_tokens: int = 100_000
+    auth_cache_max_users: int = 20_000
+    auth_cache_user_ttl_seconds: int = 30
+    permission_index_ttl_seconds: int = 300  # reconstrucción completa del índice de permisos
+    permission_claims_enabled: bool = False  # claim prm (bitset de APIs) en el access token
+    permission_claims_max_bytes: int = 512  # si el bitset excede, se emite una referencia
+
+    # GeoLite2: ruta del .mmdb (vacío: app/utils/GeoLite2-City) y revisión de cambios
+    geoip_db_path: str = ""
+    geoip_reload_interval_seconds: int = 60
+    # Cache de geolocalización por IP (GeoLite2)
+    geoip_cache_max_entries: int = 50_000
+    geoip_cache_ttl_seconds: int = 3600
+    user_agent_cache_max_entries: int = 10_000
+
+    # Escritor en bloque de logs de login
+    login_log_batch_size: int = 200
+    login_log_flush_interval_ms: int = 250
+    login_log_queue_limit: int = 10_000
+    # Particiones mensuales de login_logs y retención (0 = conservar todo)
+    login_log_retention_months: int = 12
+    login_log_partitions_ahead: int = 2
+    login_log_maintenance_interval_seconds: int = 3600
+
+    # Scheduler de jobs: solo el worker que obtiene el lock (advisory lock o GET_LOCK) los ejecuta
+    scheduler_enabled: bool = True
+    scheduler_lock_id: int = 7_310_001
+    scheduler_leader_retry_seconds: int = 30
+
+    # Limpieza de tokens expirados por lotes
+    token_cleanup_interval_minutes: int = 60
+    token_cleanup_batch_size: int = 5000
+    token_cleanup_pause_ms: int = 100
+
+    # Refresh concurrente (varias pestañas): mismo par de tokens dentro de la ventana
+    refresh_grace_seconds: int = 10
+    refresh_singleflight_max_entries: int = 10_000
+
+    # Almacén del estado de tokens: sql (BD principal), redis o memory
+    token_store_backend: str = "sql"
+    token_store_redis_url: str = "redis://localhost:6379/0"
+    token_store_redis_prefix: str = "auth:"
+
+    # Bus de revocaciones entre workers (LISTEN/NOTIFY; en otros motores solo local)
+    revocation_bus_enabled: bool = True
+    revocation_bus_channel: str = "auth_revocations"
+    revocation_bus_reconnect_seconds: int = 5
     
     # Microsoft OAuth2
     microsoft_client_id: str = ""
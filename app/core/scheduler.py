@@ -0,0 +1,170 @@
+"""
+Scheduler de tareas en segundo plano
+
+Un único ``AsyncIOScheduler`` por proceso; los módulos registran sus jobs con
+``@scheduler.scheduled_job`` al importarse. Con varios workers solo uno ejecuta
+los jobs: el líder, que es quien obtiene el lock ``scheduler_lock_id`` en una
+conexión dedicada (advisory lock en PostgreSQL, ``GET_LOCK()`` en MySQL). Los
+demás reintentan cada ``scheduler_leader_retry_seconds`` y toman el relevo si
+el líder cae (al cerrarse su conexión el motor libera el lock). En otros
+motores (SQLite, un solo proceso) el proceso se considera líder.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+scheduler = AsyncIOScheduler(timezone="UTC")
+
+# Sentencias (obtener sin esperar, liberar) del lock de sesión por motor
+_LOCK_SQL = {
+    "postgresql": ("SELECT pg_try_advisory_lock(:lock)", "SELECT pg_advisory_unlock(:lock)"),
+    "mysql": ("SELECT GET_LOCK(:lock, 0)", "SELECT RELEASE_LOCK(:lock)"),
+}
+
+
+class LeaderLock:
+    """Lock de sesión retenido en una conexión propia (autocommit)"""
+
+    def __init__(self, lock_id: int, bind=engine):
+        self.lock_id = lock_id
+        self._bind = bind
+        self._conn = None
+        self.held = False
+
+    @property
+    def _sql(self) -> Optional[Tuple[str, str]]:
+        return _LOCK_SQL.get(self._bind.dialect.name)
+
+    @property
+    def _params(self) -> Dict[str, Any]:
+        # GET_LOCK usa nombres; el advisory lock de PostgreSQL, un entero
+        if self._bind.dialect.name == "mysql":
+            return {"lock": f"scheduler_{self.lock_id}"}
+        return {"lock": self.lock_id}
+
+    async def try_acquire(self) -> bool:
+        if self._sql is None:
+            self.held = True
+            return True
+        conn = await self._bind.connect()
+        try:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = (await conn.execute(text(self._sql[0]), self._params)).scalar()
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return False
+        self._conn = conn
+        self.held = True
+        return True
+
+    async def is_alive(self) -> bool:
+        """Comprobar que la conexión que retiene el lock sigue abierta"""
+        if not self.held:
+            return False
+        if self._conn is None:
+            return True
+        try:
+            await self._conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            await self._drop_connection()
+            return False
+
+    async def release(self) -> None:
+        if self._conn is not None:
+            try:
+                await self._conn.execute(text(self._sql[1]), self._params)
+            except Exception as e:
+                logger.warning("No se pudo liberar el lock del scheduler: %s", e)
+        await self._drop_connection()
+
+    async def _drop_connection(self) -> None:
+        conn, self._conn = self._conn, None
+        self.held = False
+        if conn is None:
+            return
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+
+class SchedulerRunner:
+    """Campaña de liderazgo: arranca los jobs al ser líder y los pausa al perderlo"""
+
+    def __init__(self, lock: LeaderLock, retry_seconds: int):
+        self.lock = lock
+        self.retry_seconds = retry_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.leader = False
+        self.elections = 0
+
+    def start(self) -> None:
+        if not settings.scheduler_enabled:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._campaign())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+        await self.lock.release()
+        self.leader = False
+
+    async def _campaign(self) -> None:
+        while True:
+            try:
+                await self.step()
+            except Exception as e:
+                logger.error("Error en la elección de líder del scheduler: %s", e)
+            await asyncio.sleep(self.retry_seconds)
+
+    async def step(self) -> None:
+        if self.leader and not await self.lock.is_alive():
+            self.leader = False
+            scheduler.pause()
+            logger.warning("Scheduler: se perdió el lock de líder, jobs en pausa")
+        if not self.leader and await self.lock.try_acquire():
+            self.leader = True
+            self.elections += 1
+            if scheduler.running:
+                scheduler.resume()
+            else:
+                scheduler.start()
+            logger.info("Scheduler: este worker es el líder")
+
+    def stats(self) -> Dict[str, Any]:
+        jobs = []
+        for job in scheduler.get_jobs():
+            # Los jobs pendientes (scheduler sin arrancar) aún no tienen próxima ejecución
+            next_run = getattr(job, "next_run_time", None)
+            jobs.append({"id": job.id, "next_run_time": next_run.isoformat() if next_run else None})
+        return {
+            "enabled": settings.scheduler_enabled,
+            "leader": self.leader,
+            "elections": self.elections,
+            "jobs": jobs,
+        }
+
+
+scheduler_runner = SchedulerRunner(
+    LeaderLock(settings.scheduler_lock_id),
+    retry_seconds=settings.scheduler_leader_retry_seconds,
+)
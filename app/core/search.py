@@ -0,0 +1,62 @@
+"""
+Búsqueda de texto de CRUDBase según el motor, e índices que la sirven
+
+- PostgreSQL: ``ILIKE '%term%'`` por columna, que el planner resuelve con los
+  índices GIN ``gin_trgm_ops`` de pg_trgm (``trigram_index``) en lugar de un
+  recorrido secuencial. Los resultados se ordenan por ``word_similarity``.
+- MySQL: ``LIKE 'term%'`` (la collation ya ignora mayúsculas) sobre índices
+  B-tree: búsqueda por prefijo, primero las coincidencias exactas.
+- Otros motores: ``ILIKE '%term%'`` sin ranking (comportamiento anterior).
+
+Los comodines ``%`` y ``_`` del término se escapan.
+"""
+
+from typing import List, Optional
+from sqlalchemy import Index, case, func, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def trigram_index(name: str, column: str) -> Index:
+    """Índice GIN de trigramas; solo se crea en PostgreSQL (requiere pg_trgm)"""
+    return Index(
+        name, column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+
+
+def prefix_index(name: str, column: str) -> Index:
+    """Índice B-tree para la búsqueda por prefijo; solo se crea en MySQL"""
+    return Index(name, column).ddl_if(dialect="mysql")
+
+
+def _columns(model, fields: List[str]) -> List[ColumnElement]:
+    return [getattr(model, field) for field in fields if hasattr(model, field)]
+
+
+def search_condition(model, dialect: str, term: str, fields: List[str]) -> Optional[ColumnElement]:
+    """Condición OR del término sobre los campos (None si no hay campos)"""
+    columns = _columns(model, fields)
+    if not term or not columns:
+        return None
+    if dialect == "mysql":
+        return or_(*(column.startswith(term, autoescape=True) for column in columns))
+    return or_(*(column.icontains(term, autoescape=True) for column in columns))
+
+
+def search_rank(model, dialect: str, term: str, fields: List[str]) -> Optional[ColumnElement]:
+    """Relevancia del registro para el término (mayor es mejor); None sin ranking"""
+    columns = _columns(model, fields)
+    if not term or not columns:
+        return None
+    if dialect == "postgresql":
+        ranks = [func.word_similarity(term, column) for column in columns]
+    elif dialect == "mysql":
+        ranks = [
+            case((column == term, 2), (column.startswith(term, autoescape=True), 1), else_=0)
+            for column in columns
+        ]
+    else:
+        return None
+    # GREATEST exige al menos dos argumentos en MySQL
+    return ranks[0] if len(ranks) == 1 else func.greatest(*ranks)
@@ -4,15 +4,26 @@ Autor: Fabio Garcia
 Fecha: 2025-11-27
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from fastapi import HTTPException, status
 from jose import jwt, JWTError
 from app.core.config import settings
 
 # Configuración para hash de contraseñas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt libera el GIL mientras calcula, por lo que un pool de hilos da
+# paralelismo real sin el costo de serializar hacia un pool de procesos.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="password-hash"
+)
+_hash_pending = 0
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -47,6 +58,73 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password_truncated)
 
 
+async def _run_hash_job(func, *args):
+    """
+    Ejecutar una operación bcrypt en el pool acotado.
+    Si ya hay más trabajos pendientes que hilos + cola permitida, se rechaza
+    de inmediato con 503 en lugar de encolar sin límite.
+    """
+    global _hash_pending
+    if _hash_pending >= settings.password_hash_workers + settings.password_hash_queue_limit:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de autenticación saturado, intente nuevamente",
+            headers={"Retry-After": "1"},
+        )
+
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Versión no bloqueante de verify_password para handlers async
+    """
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Versión no bloqueante de get_password_hash para handlers async
+    """
+    return await _run_hash_job(get_password_hash, password)
+
+
+async def get_password_hashes_async(passwords: List[str]) -> List[str]:
+    """
+    Hash de varias contraseñas (altas masivas): como mucho
+    password_hash_workers a la vez, esperando turno en lugar de responder 503
+    """
+    global _hash_pending
+    loop = asyncio.get_running_loop()
+    step = max(settings.password_hash_workers, 1)
+    hashes: List[str] = []
+    for start in range(0, len(passwords), step):
+        chunk = passwords[start:start + step]
+        _hash_pending += len(chunk)
+        try:
+            hashes.extend(await asyncio.gather(*(
+                loop.run_in_executor(_hash_executor, get_password_hash, password)
+                for password in chunk
+            )))
+        finally:
+            _hash_pending -= len(chunk)
+    return hashes
+
+
+def password_hash_stats() -> Dict[str, Any]:
+    """Estado del pool de hash de contraseñas"""
+    return {
+        "workers": settings.password_hash_workers,
+        "queue_limit": settings.password_hash_queue_limit,
+        "pending": _hash_pending,
+    }
+
+
 def hash_password(password: str) -> str:
     """
     Alias de get_password_hash para compatibilidad
@@ -1,16 +1,56 @@
-from datetime import datetime
-from typing import Generic, TypeVar, Type, Optional, List, Dict, Any
+import base64
+import json
+from datetime import date, datetime
+from typing import Generic, TypeVar, Type, Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import and_, or_, func, desc, asc
+from sqlalchemy import and_, or_, func, desc, asc, tuple_, insert, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from pydantic import BaseModel
 from app.core.database import Base
+from app.core.search import search_condition, search_rank
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def encode_cursor(order_by: str, value: Any, id: Any) -> str:
+    """Cursor opaco (base64url) con la columna de orden y la clave de la última fila"""
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    raw = json.dumps([order_by, value, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Any, Any]:
+    """Inverso de encode_cursor; lanza ValueError si el cursor no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        order_by, value, id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+    return order_by, value, id
+
+
+def _cursor_value(column, value: Any) -> Any:
+    """Restaurar el tipo de la columna a un valor leído del cursor"""
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        return python_type(value)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -22,6 +62,9 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         self.model = model
 
+    # Campos de búsqueda por defecto de search/get_multi_keyset
+    search_fields: List[str] = []
+
     async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
         """Obtener un registro por ID"""
         result = await db.execute(select(self.model).where(self.model.id == id))
@@ -66,6 +109,158 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         result = await db.execute(query)
         return result.scalars().all()
 
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+        order_by: Optional[str] = None,
+        order_direction: str = "asc",
+        search_term: Optional[str] = None,
+        search_fields: Optional[List[str]] = None
+    ) -> Tuple[List[ModelType], int]:
+        """
+        Página y total en una sola consulta: ``COUNT(*) OVER()`` cuenta las
+        filas que pasan los filtros (y la búsqueda) antes de LIMIT/OFFSET, así
+        que los filtros se evalúan una vez. Solo si la página queda fuera de
+        rango, sin filas que traigan el total, se cuenta aparte.
+        """
+        conditions = self._filter_conditions(filters)
+        fields = search_fields or self.search_fields
+        condition = self._search_condition(db, search_term, fields)
+        if condition is not None:
+            conditions.append(condition)
+
+        query = select(self.model, func.count().over().label("total"))
+        if conditions:
+            query = query.where(and_(*conditions))
+        if order_by and hasattr(self.model, order_by):
+            order_column = getattr(self.model, order_by)
+            query = query.order_by(desc(order_column) if order_direction.lower() == "desc" else asc(order_column))
+        elif condition is not None:
+            query = self._order_by_rank(db, query, search_term, fields)
+        skip = max(skip, 0)
+        rows = (await db.execute(query.offset(skip).limit(limit))).all()
+        if rows:
+            return [row[0] for row in rows], rows[0].total
+        if skip == 0:
+            return [], 0
+
+        count_query = select(func.count(self.model.id))
+        if conditions:
+            count_query = count_query.where(and_(*conditions))
+        return [], (await db.execute(count_query)).scalar_one()
+
+    async def get_multi_keyset(
+        self,
+        db: AsyncSession,
+        *,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        order_by: Optional[str] = None,
+        order_direction: str = "asc",
+        search_term: Optional[str] = None,
+        search_fields: Optional[List[str]] = None
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Paginación por cursor (keyset): ordena por ``(order_by, id)`` y
+        continúa después de la última fila de la página anterior, así que
+        cualquier página cuesta lo mismo que la primera. Retorna
+        ``(registros, next_cursor)``; ``next_cursor`` es None en la última
+        página. Lanza ValueError si el cursor no es válido o es de otro orden.
+
+        En columnas nullable los NULL van al final (al inicio en ``desc``).
+        """
+        id_column = self.model.id
+        key = order_by if order_by and order_by != "id" and hasattr(self.model, order_by) else "id"
+        descending = order_direction.lower() == "desc"
+        query = select(self.model)
+
+        conditions = self._filter_conditions(filters)
+        condition = self._search_condition(db, search_term, search_fields or self.search_fields)
+        if condition is not None:
+            conditions.append(condition)
+
+        nullable = False
+        if key == "id":
+            order_column = None
+            ordering = [id_column]
+        else:
+            order_column = getattr(self.model, key)
+            nullable = getattr(order_column, "nullable", True)
+            ordering = ([order_column.is_(None)] if nullable else []) + [order_column, id_column]
+
+        if cursor:
+            cursor_key, value, last_id = decode_cursor(cursor)
+            if cursor_key != key:
+                raise ValueError("El cursor corresponde a otro orden")
+            last_id = _cursor_value(id_column, last_id)
+            if order_column is None:
+                conditions.append(id_column < last_id if descending else id_column > last_id)
+            else:
+                conditions.append(self._after_cursor(
+                    order_column, id_column, _cursor_value(order_column, value), last_id,
+                    descending, nullable
+                ))
+
+        if conditions:
+            query = query.where(and_(*conditions))
+        query = query.order_by(*(desc(c) if descending else asc(c) for c in ordering))
+
+        result = await db.execute(query.limit(limit + 1))
+        rows = list(result.scalars().all())
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        value = getattr(last, key) if key != "id" else None
+        return rows, encode_cursor(key, value, last.id)
+
+    @staticmethod
+    def _after_cursor(order_column, id_column, value: Any, last_id: Any,
+                      descending: bool, nullable: bool):
+        """
+        Filas posteriores a ``(value, last_id)`` en el orden
+        ``(order_column IS NULL, order_column, id)``
+        """
+        after = tuple_(order_column, id_column) > tuple_(value, last_id)
+        before = tuple_(order_column, id_column) < tuple_(value, last_id)
+        if not nullable:
+            return before if descending else after
+        if not descending:
+            if value is None:
+                return and_(order_column.is_(None), id_column > last_id)
+            return or_(order_column.is_(None), after)
+        if value is None:
+            return or_(order_column.is_not(None), and_(order_column.is_(None), id_column < last_id))
+        return and_(order_column.is_not(None), before)
+
+    def _filter_conditions(self, filters: Optional[Dict[str, Any]]) -> List[Any]:
+        conditions = []
+        for key, value in (filters or {}).items():
+            if hasattr(self.model, key):
+                if isinstance(value, list):
+                    conditions.append(getattr(self.model, key).in_(value))
+                else:
+                    conditions.append(getattr(self.model, key) == value)
+        return conditions
+
+    def _search_condition(self, db: AsyncSession, search_term: Optional[str], search_fields: List[str]):
+        """Condición de búsqueda del motor de la sesión (ver app.core.search)"""
+        if not search_term:
+            return None
+        return search_condition(self.model, db.get_bind().dialect.name, search_term, search_fields)
+
+    def _order_by_rank(self, db: AsyncSession, query, search_term: str, search_fields: List[str]):
+        """Ordenar por relevancia si el motor la ofrece; el id desempata"""
+        rank = search_rank(self.model, db.get_bind().dialect.name, search_term, search_fields)
+        if rank is None:
+            return query
+        return query.order_by(desc(rank), asc(self.model.id))
+
     async def get_all(self, db: AsyncSession) -> List[ModelType]:
         """Obtener todos los registros sin paginación"""
         result = await db.execute(select(self.model))
@@ -125,6 +320,186 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         await db.refresh(db_obj)
         return db_obj
 
+    def _bulk_values(self, obj_in: CreateSchemaType | Dict[str, Any]) -> Dict[str, Any]:
+        """Columnas de un registro para las operaciones masivas (ver create_many)"""
+        if isinstance(obj_in, dict):
+            return dict(obj_in)
+        return obj_in.model_dump()
+
+    async def _bulk_rows(self, objs_in: List[CreateSchemaType | Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Filas de las operaciones masivas; las subclases pueden completarlas (hash, etc.)"""
+        return [self._bulk_values(obj_in) for obj_in in objs_in]
+
+    @staticmethod
+    def _batches(rows: List[Dict[str, Any]], batch_size: int):
+        batch_size = max(batch_size, 1)
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    async def create_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: List[CreateSchemaType | Dict[str, Any]],
+        batch_size: int = 1000,
+        returning: bool = True,
+        commit: bool = True
+    ) -> List[ModelType] | int:
+        """
+        Crear varios registros: un ``INSERT`` por lote de ``batch_size`` filas
+        (executemany) y un solo commit. Con ``returning`` retorna los registros
+        creados en el orden de ``objs_in`` (``INSERT ... RETURNING`` si el motor
+        lo soporta); si no, el número de filas.
+        """
+        rows = await self._bulk_rows(objs_in)
+        created: List[ModelType] = []
+        for batch in self._batches(rows, batch_size):
+            if not returning:
+                await db.execute(insert(self.model), batch)
+            elif db.get_bind().dialect.insert_executemany_returning:
+                result = await db.scalars(
+                    insert(self.model).returning(self.model, sort_by_parameter_order=True), batch
+                )
+                created.extend(result.all())
+            else:
+                # Sin RETURNING (MySQL): el ORM obtiene cada id generado
+                objs = [self.model(**row) for row in batch]
+                db.add_all(objs)
+                await db.flush()
+                created.extend(objs)
+        if commit:
+            await db.commit()
+        return created if returning else len(rows)
+
+    async def update_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Dict[Any, UpdateSchemaType | Dict[str, Any]],
+        batch_size: int = 1000,
+        returning: bool = True,
+        commit: bool = True
+    ) -> List[ModelType] | int:
+        """
+        Actualizar varios registros por id (``{id: cambios}``): ``UPDATE ...
+        WHERE id = ?`` en executemany por lote y un solo commit. Los esquemas
+        solo aportan los campos enviados, como en ``update``.
+        """
+        rows = []
+        for id, obj_in in objs_in.items():
+            if isinstance(obj_in, dict):
+                update_data = obj_in
+            else:
+                update_data = obj_in.model_dump(exclude_unset=True)
+            if update_data:
+                rows.append({**update_data, "id": id})
+        for batch in self._batches(rows, batch_size):
+            await db.execute(update(self.model), batch)
+        if commit:
+            await db.commit()
+        if not returning:
+            return len(rows)
+        ids = [row["id"] for row in rows]
+        if not ids:
+            return []
+        result = await db.execute(
+            select(self.model)
+            .where(self.model.id.in_(ids))
+            .order_by(asc(self.model.id))
+            .execution_options(populate_existing=True)
+        )
+        return result.scalars().all()
+
+    async def upsert_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: List[CreateSchemaType | Dict[str, Any]],
+        index_elements: List[str],
+        update_fields: Optional[List[str]] = None,
+        batch_size: int = 1000,
+        returning: bool = True,
+        commit: bool = True
+    ) -> List[ModelType] | int:
+        """
+        Insertar o actualizar varios registros según la restricción única de
+        ``index_elements``: ``INSERT ... ON CONFLICT`` en PostgreSQL/SQLite y
+        ``INSERT ... ON DUPLICATE KEY UPDATE`` en MySQL (que usa cualquier clave
+        única de la tabla). ``update_fields`` son las columnas que se
+        sobrescriben en los existentes (por defecto todas las enviadas salvo
+        las de ``index_elements``); una lista vacía los deja intactos.
+
+        Con ``returning`` retorna todos los registros de ``objs_in``, nuevos y
+        existentes; si no, el número de filas enviadas.
+        """
+        rows = await self._bulk_rows(objs_in)
+        if not rows:
+            return [] if returning else 0
+        if update_fields is None:
+            update_fields = [
+                key for key in rows[0]
+                if key not in index_elements and key != "id"
+            ]
+        dialect = db.get_bind().dialect
+
+        if dialect.name == "mysql":
+            stmt = mysql.insert(self.model)
+            set_ = {field: stmt.inserted[field] for field in update_fields}
+            if not set_:
+                set_ = {index_elements[0]: stmt.inserted[index_elements[0]]}
+            elif hasattr(self.model, "updated_at") and "updated_at" not in set_:
+                set_["updated_at"] = func.now()
+            stmt = stmt.on_duplicate_key_update(set_)
+        else:
+            insert_ = postgresql.insert if dialect.name == "postgresql" else sqlite.insert
+            stmt = insert_(self.model)
+            set_ = {field: stmt.excluded[field] for field in update_fields}
+            if not set_:
+                stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+            else:
+                if hasattr(self.model, "updated_at") and "updated_at" not in set_:
+                    set_["updated_at"] = func.now()
+                stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+
+        # DO NOTHING no retorna las filas existentes: se leen después
+        use_returning = (
+            returning
+            and update_fields
+            and dialect.name != "mysql"
+            and dialect.insert_executemany_returning
+        )
+        upserted: List[ModelType] = []
+        for batch in self._batches(rows, batch_size):
+            if use_returning:
+                result = await db.scalars(
+                    stmt.returning(self.model),
+                    batch,
+                    execution_options={"populate_existing": True},
+                )
+                upserted.extend(result.all())
+                continue
+            await db.execute(stmt, batch)
+            if returning:
+                upserted.extend(await self._get_by_keys(db, batch, index_elements))
+        if commit:
+            await db.commit()
+        return upserted if returning else len(rows)
+
+    async def _get_by_keys(
+        self, db: AsyncSession, rows: List[Dict[str, Any]], index_elements: List[str]
+    ) -> List[ModelType]:
+        """Registros cuyas columnas ``index_elements`` coinciden con las de ``rows``"""
+        columns = [getattr(self.model, field) for field in index_elements]
+        keys = {tuple(row[field] for field in index_elements) for row in rows}
+        if len(columns) == 1:
+            condition = columns[0].in_([key[0] for key in keys])
+        else:
+            condition = tuple_(*columns).in_(list(keys))
+        result = await db.execute(
+            select(self.model).where(condition).execution_options(populate_existing=True)
+        )
+        return result.scalars().all()
+
     async def remove(self, db: AsyncSession, *, id: int) -> ModelType:
         """Eliminar un registro (hard delete)"""
         obj = await self.get(db=db, id=id)
@@ -181,16 +556,9 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """Buscar registros por término en campos específicos"""
         query = select(self.model)
         
-        if search_term and search_fields:
-            search_conditions = []
-            for field in search_fields:
-                if hasattr(self.model, field):
-                    search_conditions.append(
-                        getattr(self.model, field).ilike(f"%{search_term}%")
-                    )
-            
-            if search_conditions:
-                query = query.where(or_(*search_conditions))
+        condition = self._search_condition(db, search_term, search_fields)
+        if condition is not None:
+            query = self._order_by_rank(db, query.where(condition), search_term, search_fields)
         
         query = query.offset(skip).limit(limit)
         result = await db.execute(query)
@@ -208,16 +576,9 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
         query = select(func.count(self.model.id))
 
-        if search_term:
-            if isinstance(search_fields, list):
-                conditions = [
-                    getattr(self.model, field).ilike(f"%{search_term}%")
-                    for field in search_fields
-                    if hasattr(self.model, field)
-                ]
-
-            if conditions:
-                query = query.where(or_(*conditions))
+        condition = self._search_condition(db, search_term, search_fields)
+        if condition is not None:
+            query = query.where(condition)
 
         result = await db.execute(query)
         return result.scalar_one()
@@ -7,6 +7,7 @@ from app.schemas.api import ApiCreate, ApiUpdate
 
 
 class CRUDApi(CRUDBase[Api, ApiCreate, ApiUpdate]):
+    search_fields = ["nombre", "descripcion", "url_api", "grupo"]
     
     async def get_by_url(self, db: AsyncSession, *, url_api: str) -> Optional[Api]:
         """Obtener API por URL"""
@@ -60,11 +61,10 @@ class CRUDApi(CRUDBase[Api, ApiCreate, ApiUpdate]):
         limit: int = 100
     ) -> List[Api]:
         """Buscar APIs por nombre, descripción o URL"""
-        search_fields = ["nombre", "descripcion", "url_api", "grupo"]
         return await self.search(
             db=db, 
             search_term=search_term, 
-            search_fields=search_fields,
+            search_fields=self.search_fields,
             skip=skip, 
             limit=limit
         )
@@ -76,11 +76,10 @@ class CRUDApi(CRUDBase[Api, ApiCreate, ApiUpdate]):
         search_term: str
     ) -> int:
         """Contar APIs que coinciden con el término de búsqueda"""
-        search_fields = ["nombre", "descripcion", "url_api", "grupo"]
         return await self.count_with_search(
             db=db, 
             search_term=search_term, 
-            search_fields=search_fields
+            search_fields=self.search_fields
         )
 
 
@@ -7,6 +7,7 @@ from app.schemas.aplicacion import AplicacionCreate, AplicacionUpdate
 
 
 class CRUDAplicacion(CRUDBase[Aplicacion, AplicacionCreate, AplicacionUpdate]):
+    search_fields = ["nombre", "descripcion"]
     
     async def get_by_key(self, db: AsyncSession, *, key: str) -> Optional[Aplicacion]:
         """Obtener aplicación por key"""
@@ -24,11 +25,10 @@ class CRUDAplicacion(CRUDBase[Aplicacion, AplicacionCreate, AplicacionUpdate]):
         limit: int = 100
     ) -> List[Aplicacion]:
         """Buscar aplicaciones por nombre o descripción"""
-        search_fields = ["nombre", "descripcion"]
         return await self.search(
             db=db, 
             search_term=search_term, 
-            search_fields=search_fields,
+            search_fields=self.search_fields,
             skip=skip, 
             limit=limit
         )
@@ -40,11 +40,10 @@ class CRUDAplicacion(CRUDBase[Aplicacion, AplicacionCreate, AplicacionUpdate]):
         search_term: str
     ) -> int:
         """Contar aplicaciones que coinciden con el término de búsqueda"""
-        search_fields = ["nombre", "descripcion"]
         return await self.count_with_search(
             db=db, 
             search_term=search_term, 
-            search_fields=search_fields
+            search_fields=self.search_fields
         )
 
 
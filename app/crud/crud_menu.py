@@ -8,6 +8,7 @@ from app.schemas.menu import MenuCreate, MenuUpdate
 
 
 class CRUDMenu(CRUDBase[Menu, MenuCreate, MenuUpdate]):
+    search_fields = ["nombre", "descripcion", "url_menu"]
     
     async def get_by_url(self, db: AsyncSession, *, url_menu: str) -> Optional[Menu]:
         """Obtener menú por URL"""
@@ -100,11 +101,10 @@ class CRUDMenu(CRUDBase[Menu, MenuCreate, MenuUpdate]):
         limit: int = 100
     ) -> List[Menu]:
         """Buscar menús por nombre o descripción"""
-        search_fields = ["nombre", "descripcion", "url_menu"]
         return await self.search(
             db=db, 
             search_term=search_term, 
-            search_fields=search_fields,
+            search_fields=self.search_fields,
             skip=skip, 
             limit=limit
         )
@@ -116,11 +116,10 @@ class CRUDMenu(CRUDBase[Menu, MenuCreate, MenuUpdate]):
         search_term: str
     ) -> List[Menu]:
         """Contar menús que coinciden con la búsqueda por nombre o descripción"""
-        search_fields = ["nombre", "descripcion", "url_menu"]
         return await self.count_with_search(
             db=db, 
             search_term=search_term, 
-            search_fields=search_fields
+            search_fields=self.search_fields
         )
 
 
@@ -9,6 +9,7 @@ from app.schemas.rol import RolCreate, RolUpdate
 
 
 class CRUDRol(CRUDBase[Rol, RolCreate, RolUpdate]):
+    search_fields = ["nombre", "descripcion"]
     
     async def get_by_nombre(self, db: AsyncSession, *, nombre: str) -> Optional[Rol]:
         """Obtener rol por nombre"""
@@ -57,11 +58,10 @@ class CRUDRol(CRUDBase[Rol, RolCreate, RolUpdate]):
         limit: int = 100
     ) -> List[Rol]:
         """Buscar roles por nombre o descripción"""
-        search_fields = ["nombre", "descripcion"]
         return await self.search(
             db=db, 
             search_term=search_term, 
-            search_fields=search_fields,
+            search_fields=self.search_fields,
             skip=skip, 
             limit=limit
         )
@@ -81,11 +81,10 @@ class CRUDRol(CRUDBase[Rol, RolCreate, RolUpdate]):
         search_term: str
     ) -> int:
         """Contar roles que coinciden con el término de búsqueda"""
-        search_fields = ["nombre", "descripcion"]
         return await self.count_with_search(
             db=db, 
             search_term=search_term, 
-            search_fields=search_fields
+            search_fields=self.search_fields
         )
 
 # Instancia del CRUD de rol
@@ -2,31 +2,23 @@ from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from passlib.context import CryptContext
+from app.core import security
 from app.crud.base import CRUDBase
 from app.models.usuario import Usuario
 from app.models.usuario_rol import UsuarioRol
 from app.schemas.usuario import UsuarioCreate, UsuarioUpdate
 
-# Configuración para hash de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class CRUDUsuario(CRUDBase[Usuario, UsuarioCreate, UsuarioUpdate]):
+    search_fields = ["nombres", "apellidos", "username", "email"]
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verificar contraseña"""
-        # Truncar la contraseña a 72 bytes para cumplir con la limitación de bcrypt
-        password_bytes = plain_password.encode('utf-8')[:72]
-        password_truncated = password_bytes.decode('utf-8', errors='ignore')
-        return pwd_context.verify(password_truncated, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verificar contraseña (bcrypt en el pool de hash, fuera del event loop)"""
+        return await security.verify_password_async(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str) -> str:
-        """Generar hash de contraseña"""
-        # Truncar la contraseña a 72 bytes para cumplir con la limitación de bcrypt
-        password_bytes = password.encode('utf-8')[:72]
-        password_truncated = password_bytes.decode('utf-8', errors='ignore')
-        return pwd_context.hash(password_truncated)
+    async def get_password_hash(self, password: str) -> str:
+        """Generar hash de contraseña (bcrypt en el pool de hash, fuera del event loop)"""
+        return await security.get_password_hash_async(password)
 
     async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[Usuario]:
         """Obtener usuario por email"""
@@ -46,7 +38,7 @@ class CRUDUsuario(CRUDBase[Usuario, UsuarioCreate, UsuarioUpdate]):
         """Crear usuario con hash de contraseña"""
         obj_in_data = obj_in.model_dump()
         if obj_in_data.get("password"):
-            hashed_password = self.get_password_hash(obj_in_data.pop("password"))
+            hashed_password = await self.get_password_hash(obj_in_data.pop("password"))
             obj_in_data["hash_clave"] = hashed_password
         
         db_obj = Usuario(**obj_in_data)
@@ -55,11 +47,22 @@ class CRUDUsuario(CRUDBase[Usuario, UsuarioCreate, UsuarioUpdate]):
         await db.refresh(db_obj)
         return db_obj
 
+    async def _bulk_rows(self, objs_in: List[UsuarioCreate | Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Como en create: la contraseña se guarda como hash_clave"""
+        rows = await super()._bulk_rows(objs_in)
+        with_password = [row for row in rows if row.get("password")]
+        hashes = await security.get_password_hashes_async([row["password"] for row in with_password])
+        for row, hashed_password in zip(with_password, hashes):
+            row["hash_clave"] = hashed_password
+        for row in rows:
+            row.pop("password", None)
+        return rows
+
     async def update_password(
         self, db: AsyncSession, *, db_obj: Usuario, new_password: str
     ) -> Usuario:
         """Actualizar contraseña de usuario"""
-        hashed_password = self.get_password_hash(new_password)
+        hashed_password = await self.get_password_hash(new_password)
         db_obj.hash_clave = hashed_password
         db.add(db_obj)
         await db.commit()
@@ -75,7 +78,7 @@ class CRUDUsuario(CRUDBase[Usuario, UsuarioCreate, UsuarioUpdate]):
             return None
         if not user.hash_clave:
             return None
-        if not self.verify_password(password, user.hash_clave):
+        if not await self.verify_password(password, user.hash_clave):
             return None
         return user
 
@@ -118,11 +121,10 @@ class CRUDUsuario(CRUDBase[Usuario, UsuarioCreate, UsuarioUpdate]):
         limit: int = 100
     ) -> List[Usuario]:
         """Buscar usuarios por nombre, apellido, username o email"""
-        search_fields = ["nombres", "apellidos", "username", "email"]
         return await self.search(
             db=db, 
             search_term=search_term, 
-            search_fields=search_fields,
+            search_fields=self.search_fields,
             skip=skip, 
             limit=limit
         )
@@ -134,11 +136,10 @@ class CRUDUsuario(CRUDBase[Usuario, UsuarioCreate, UsuarioUpdate]):
         search_term: str
     ) -> List[Usuario]:
         """Buscar usuarios por nombre, apellido, username o email"""
-        search_fields = ["nombres", "apellidos", "username", "email"]
         return await self.count_with_search(
             db=db, 
             search_term=search_term, 
-            search_fields=search_fields
+            search_fields=self.search_fields
         )
 
 
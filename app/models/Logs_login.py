@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from datetime import datetime, timezone
 from sqlalchemy.dialects.postgresql import JSONB
 from app.core.database import Base
@@ -7,12 +7,20 @@ from app.core.config import settings
 
 class LoginLog(Base):
     __tablename__ = "login_logs"
-    __table_args__ = {"schema": settings.db_schema}
+    # En PostgreSQL la tabla se particiona por mes (ver app/utils/login_log_partitions.py);
+    # por eso la llave primaria incluye la columna de partición.
+    __table_args__ = {
+        "schema": settings.db_schema,
+        "postgresql_partition_by": "RANGE (timestamp)",
+    }
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, nullable=False, index=True)
-    timestamp = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    timestamp = Column(DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc), nullable=False)
     ip = Column(String(255), nullable=False)  
     location = Column(String(255), nullable=True)
     user_agent = Column(JSONB, nullable=True)
-    
\ No newline at end of file
+
+
+# Historial por usuario (más recientes primero) y paginación por (timestamp, id)
+Index("ix_login_logs_user_ts", LoginLog.user_id, LoginLog.timestamp.desc(), LoginLog.id.desc())
@@ -7,7 +7,11 @@ from app.core.config import settings
 
 class AccessToken(Base):
     __tablename__ = "access_tokens"
-    __table_args__ = {"schema": settings.db_schema}
+    __table_args__ = (
+        Index("ix_access_tokens_user_active", "user_id", "is_revoked"),
+        Index("ix_access_tokens_exp", "expires_at"),
+        {"schema": settings.db_schema},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey(f"{settings.db_schema}.usuarios.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -21,6 +25,3 @@ class AccessToken(Base):
 
     # Relación ORM
     user = relationship("Usuario", back_populates="access_tokens")
-
-    Index("ix_access_tokens_user_active", "user_id", "is_revoked")
-    Index("ix_access_tokens_exp", "expires_at")
@@ -3,11 +3,20 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 from app.core.config import settings
+from app.core.search import prefix_index, trigram_index
 
 
 class Menu(Base):
     __tablename__ = "menu"
-    __table_args__ = {"schema": settings.db_schema}
+    __table_args__ = (
+        # Búsqueda de texto (ver app.core.search)
+        trigram_index("ix_menu_nombre_trgm", "nombre"),
+        trigram_index("ix_menu_descripcion_trgm", "descripcion"),
+        trigram_index("ix_menu_url_menu_trgm", "url_menu"),
+        prefix_index("ix_menu_nombre_prefix", "nombre"),
+        prefix_index("ix_menu_descripcion_prefix", "descripcion"),
+        {"schema": settings.db_schema},
+    )
 
     id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
     url_menu = Column(String(250), unique=True, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import UUID, Column, Integer, String, DateTime, ForeignKey, func
+from sqlalchemy import UUID, Column, Integer, String, DateTime, ForeignKey, Index, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -7,7 +7,10 @@ from app.core.config import settings
 
 class PasswordResetToken(Base):
     __tablename__ = "password_reset_tokens"
-    __table_args__ = {"schema": settings.db_schema}
+    __table_args__ = (
+        Index("idx_password_reset_tokens_expires_at", "expires_at"),
+        {"schema": settings.db_schema},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey(f"{settings.db_schema}.usuarios.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -7,7 +7,13 @@ from app.core.config import settings
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
-    __table_args__ = {"schema": settings.db_schema}
+    __table_args__ = (
+        # Sesiones por dispositivo: login, listado y revocación de sesiones
+        Index("ix_refresh_tokens_user_device_active", "user_id", "device_id", "is_revoked"),
+        Index("ix_refresh_tokens_user_active", "user_id", "is_revoked"),
+        Index("ix_refresh_tokens_exp", "expires_at"),
+        {"schema": settings.db_schema},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey(f"{settings.db_schema}.usuarios.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -27,7 +33,3 @@ class RefreshToken(Base):
 
     # Relación ORM
     user = relationship("Usuario", back_populates="refresh_tokens")
-
-    Index("ix_refresh_tokens_user_active", "user_id", "is_revoked")
-    Index("ix_refresh_tokens_exp", "expires_at")
-
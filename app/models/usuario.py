@@ -3,11 +3,21 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 from app.core.config import settings
+from app.core.search import prefix_index, trigram_index
 
 
 class Usuario(Base):
     __tablename__ = "usuarios"
-    __table_args__ = {"schema": settings.db_schema}
+    __table_args__ = (
+        # Búsqueda de texto (ver app.core.search)
+        trigram_index("ix_usuarios_nombres_trgm", "nombres"),
+        trigram_index("ix_usuarios_apellidos_trgm", "apellidos"),
+        trigram_index("ix_usuarios_username_trgm", "username"),
+        trigram_index("ix_usuarios_email_trgm", "email"),
+        prefix_index("ix_usuarios_nombres_prefix", "nombres"),
+        prefix_index("ix_usuarios_apellidos_prefix", "apellidos"),
+        {"schema": settings.db_schema},
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     username = Column(String(50), unique=True, nullable=False, index=True)
@@ -18,6 +28,7 @@ class Usuario(Base):
     firma = Column(String(250), nullable=True)
     foto = Column(String(250), nullable=True)
     activo = Column(Integer, default=1, index=True)
+    token_epoch = Column(Integer, default=0, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     deleted_at = Column(DateTime(timezone=True), nullable=True)
@@ -12,7 +12,7 @@ from app.schemas.permiso import (
     PermisoApi, PermisoApiCreate, PermisoApiUpdate, PermisoApiResponse
 )
 from app.schemas.usuario_rol import UsuarioRol, UsuarioRolCreate, UsuarioRolUpdate, UsuarioRolResponse
-from app.schemas.common import PaginatedResponse, MessageResponse, ErrorResponse
+from app.schemas.common import PaginatedResponse, CursorPaginatedResponse, MessageResponse, ErrorResponse
 
 # Exportar todos los esquemas
 __all__ = [
@@ -25,6 +25,6 @@ __all__ = [
     "PermisoMenuDelete", "PermisoMenuCreate", "PermisoMenuUpdate", "PermisoMenuResponse",
     "PermisoApi", "PermisoApiCreate", "PermisoApiUpdate", "PermisoApiResponse",
     "UsuarioRol", "UsuarioRolCreate", "UsuarioRolUpdate", "UsuarioRolResponse",
-    "PaginatedResponse", "MessageResponse", "ErrorResponse"
+    "PaginatedResponse", "CursorPaginatedResponse", "MessageResponse", "ErrorResponse"
 ]
 
@@ -18,6 +18,30 @@ class PaginatedResponse(BaseModel, Generic[T]):
     class Config:
         from_attributes = True
 
+    @classmethod
+    def from_page(cls, items: List[T], total: int, page: int, per_page: int) -> "PaginatedResponse[T]":
+        """Construir la respuesta a partir de una página y el total (CRUDBase.get_page)"""
+        pages = (total + per_page - 1) // per_page
+        return cls(
+            items=items,
+            total=total,
+            page=page,
+            per_page=per_page,
+            last_page=pages,
+            size=per_page,
+            pages=pages
+        )
+
+class CursorPaginatedResponse(BaseModel, Generic[T]):
+    """
+    Esquema para respuestas paginadas por cursor (keyset).
+    ``next_cursor`` es None en la última página.
+    """
+    items: List[T]
+    per_page: int
+    next_cursor: Optional[str] = None
+    has_more: bool
+
 class MessageResponse(BaseModel):
     """
     Esquema para respuestas de mensajes simples
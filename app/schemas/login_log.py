@@ -0,0 +1,23 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class LoginLogResponse(BaseModel):
+    id: int
+    timestamp: datetime
+    ip: str
+    location: Optional[str] = None
+    user_agent: Optional[Dict[str, Any]] = None
+
+    class Config:
+        from_attributes = True
+
+
+class LoginLogPage(BaseModel):
+    """
+    Página de logs de login; ``next_cursor`` se envía como ``cursor`` para
+    obtener la siguiente (None en la última página)
+    """
+    items: List[LoginLogResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,16 @@
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class SessionResponse(BaseModel):
+    """
+    Sesión activa de un dispositivo; ``id`` es el identificador del
+    dispositivo y ``created_at`` la fecha del último login o refresh
+    """
+    id: str
+    ip: Optional[str] = None
+    user_agent: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    expires_at: datetime
+    current: bool = False
@@ -1,10 +1,15 @@
-
 from pathlib import Path
+import logging
+import os
+import time
 import geoip2.database
+import maxminddb
 from fastapi import Request
 from user_agents import parse
 import json
 import hashlib
+from app.core.config import settings
+from app.utils.cache import LRUTTLCache
 
 class SessionContext:
     def __init__(self, ip: str, user_agent: dict, device_id: str, location: str | None = None):
@@ -16,16 +21,111 @@ class SessionContext:
 BASE_DIR = Path(__file__).resolve().parent
 MMDB_PATH = BASE_DIR / "GeoLite2-City" / "GeoLite2-City.mmdb"
 
-try:
-    geoip_reader = geoip2.database.Reader(str(MMDB_PATH))
-except Exception as e:
-    print("⚠ Error cargando GeoLite2:", e)
-    geoip_reader = None
+logger = logging.getLogger(__name__)
+
+
+class GeoIPDatabase:
+    """
+    Lector GeoLite2 en modo mmap, abierto de forma perezosa.
+
+    Con mmap las páginas del archivo las comparte el sistema operativo entre
+    todos los workers. Cada ``reload_interval`` segundos se revisa el archivo
+    en disco; si cambió (reemplazado con ``mv``/rename) se abre el nuevo y se
+    intercambia la referencia: las búsquedas nunca ven un lector a medio abrir.
+    Si el archivo nuevo no se puede abrir se sigue usando el anterior.
+    """
+
+    def __init__(self, path: Path, reload_interval: float, clock=time.monotonic):
+        self.path = Path(path)
+        self.reload_interval = reload_interval
+        self._clock = clock
+        self._reader = None
+        self._previous = None
+        self._signature = None
+        self._checked_at = None
+        self._failing = False
+        self.reloads = 0
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _open(self):
+        try:
+            return geoip2.database.Reader(str(self.path), mode=maxminddb.MODE_MMAP_EXT)
+        except ValueError:
+            # Sin la extensión C de maxminddb
+            return geoip2.database.Reader(str(self.path), mode=maxminddb.MODE_MMAP)
+
+    def load(self) -> bool:
+        """Abrir (o reabrir si cambió) el archivo. Retorna True si hubo cambio."""
+        self._checked_at = self._clock()
+        try:
+            signature = self._file_signature()
+            if signature == self._signature:
+                return False
+            reader = self._open()
+        except Exception as e:
+            # Registrar solo la primera falla de cada racha, no cada revisión
+            if not self._failing:
+                if self._reader is None:
+                    logger.warning("No se pudo cargar GeoLite2 (%s): %s", self.path, e)
+                else:
+                    logger.warning("No se pudo recargar GeoLite2, se mantiene el anterior: %s", e)
+            self._failing = True
+            return False
+        self._failing = False
+
+        # El lector anterior se cierra en el siguiente cambio, no en este,
+        # para no cortar una búsqueda que lo esté usando
+        if self._previous is not None:
+            self._previous.close()
+        self._previous, self._reader = self._reader, reader
+        if self._signature is not None:
+            self.reloads += 1
+            logger.info("GeoLite2 recargado desde %s", self.path)
+        self._signature = signature
+        return True
+
+    def get(self):
+        """Lector vigente (None si no hay base disponible)"""
+        if self._checked_at is None:
+            self.load()
+        elif self.reload_interval and self._clock() - self._checked_at >= self.reload_interval:
+            if self.load():
+                _location_cache.clear()
+        return self._reader
 
+    def close(self) -> None:
+        for reader in (self._previous, self._reader):
+            if reader is not None:
+                reader.close()
+        self._reader = self._previous = self._signature = self._checked_at = None
 
-def get_ip_location(ip: str) -> dict:
+
+geoip_database = GeoIPDatabase(
+    settings.geoip_db_path or MMDB_PATH,
+    reload_interval=settings.geoip_reload_interval_seconds
+)
+
+# IP → ubicación. Los logins en ráfaga desde IPs de NAT corporativo se repiten
+_location_cache = LRUTTLCache(
+    maxsize=settings.geoip_cache_max_entries,
+    ttl=settings.geoip_cache_ttl_seconds
+)
+
+
+def get_ip_location(ip: str) -> str:
+    location = _location_cache.get(ip)
+    if location is None:
+        location = _lookup_location(ip)
+        _location_cache.set(ip, location)
+    return location
+
+
+def _lookup_location(ip: str) -> str:
     try:
-        response = geoip_reader.city(ip)
+        response = geoip_database.get().city(ip)
         return f"{response.city.name}, {response.country.name} Latitud: {response.location.latitude}, Longitud: {response.location.longitude}"
 
     except Exception:
@@ -33,17 +133,48 @@ def get_ip_location(ip: str) -> dict:
         return "Es una IP privada / no se pudo obtener la IP"
 
 
+def geoip_cache_stats() -> dict:
+    return _location_cache.stats()
+
+
 # Obtenemos la IP real del header
-def get_ip(request: Request) -> dict:
+def get_client_ip(request: Request) -> str:
     x_forwarded_for = request.headers.get("X-Forwarded-For")
     # Si viene una lista de IPs, toma la primera (cliente real)
     if x_forwarded_for:
         raw_ip = x_forwarded_for.split(",")[0].strip()
-        IP_real = raw_ip.split(":")[0]
-    else: 
-        IP_real = request.client.host
-    ua = parse(request.headers.get("user-agent"))
-    user_agent = {
+        return raw_ip.split(":")[0]
+    return request.client.host
+
+
+# hash del header User-Agent → (user_agent, device_id). Los UA se repiten
+# mucho entre usuarios y parsearlos ejecuta decenas de expresiones regulares
+_user_agent_cache = LRUTTLCache(maxsize=settings.user_agent_cache_max_entries)
+
+
+def user_agent_fingerprint(header: str | None) -> tuple[dict, str]:
+    """User agent parseado y device_id derivado, memoizados por header"""
+    key = hashlib.blake2b((header or "").encode(), digest_size=16).digest()
+    cached = _user_agent_cache.get(key)
+    if cached is None:
+        user_agent = _parse_user_agent(header)
+        cached = (user_agent, device_id_from_user_agent(user_agent))
+        _user_agent_cache.set(key, cached)
+    user_agent, device_id = cached
+    return dict(user_agent), device_id
+
+
+def parse_user_agent(header: str | None) -> dict:
+    return user_agent_fingerprint(header)[0]
+
+
+def user_agent_cache_stats() -> dict:
+    return _user_agent_cache.stats()
+
+
+def _parse_user_agent(header: str | None) -> dict:
+    ua = parse(header or "")
+    return {
         "browser": ua.browser.family + " " + ua.browser.version_string,
         "os": ua.os.family + " " + ua.os.version_string,
         "device": (
@@ -52,33 +183,43 @@ def get_ip(request: Request) -> dict:
             "Desktop"
         )
     }
+
+
+def device_id_from_user_agent(user_agent: dict) -> str:
+    # Crear un identificador de la session del dispositivo 
+    raw = json.dumps(user_agent, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def get_ip(request: Request) -> dict:
+    ip = get_client_ip(request)
     return {
-        "ip": IP_real,
-        "user_agent": user_agent,
-        "location": get_ip_location(IP_real)
+        "ip": ip,
+        "user_agent": parse_user_agent(request.headers.get("user-agent")),
+        "location": get_ip_location(ip)
     }
     
 
-def get_session_context(request: Request):
-    """Extrae la información de la sesión del cliente desde el request."""
-    ip_data = get_ip(request)
-    ip = ip_data.get("ip")
-    user_agent = ip_data.get("user_agent")
+def get_session_context(request: Request) -> SessionContext:
+    """
+    Extrae la información de la sesión del cliente desde el request.
+    IP, user agent, dispositivo y ubicación se calculan una sola vez por request.
+    """
+    context = getattr(request.state, "session_context", None)
+    if context is not None:
+        return context
 
-    device_id = create_id_device(request)
+    ip = get_client_ip(request)
+    user_agent, device_id = user_agent_fingerprint(request.headers.get("user-agent"))
 
-    return SessionContext(
+    context = SessionContext(
         ip=ip,
         user_agent=user_agent,
         device_id=device_id,
         location=get_ip_location(ip)
-
     )
+    request.state.session_context = context
+    return context
 
 def create_id_device(request: Request) -> str:
-    # Obtener datos de la sesion 
-    ip_data = get_ip(request)
-    user_agent = ip_data["user_agent"]
-    # Crear un identificador de la session del dispositivo 
-    raw = json.dumps(user_agent, sort_keys=True)
-    return hashlib.sha256(raw.encode()).hexdigest()
\ No newline at end of file
+    return get_session_context(request).device_id
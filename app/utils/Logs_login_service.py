@@ -1,24 +1,216 @@
+import asyncio
+import base64
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.core.database import AsyncSessionLocal
 from datetime import datetime, timezone
 from app.models.Logs_login import LoginLog
 from app.utils.GeoIp2 import SessionContext
 
+logger = logging.getLogger(__name__)
+
+
+class LoginLogWriter:
+    """
+    Escritor en segundo plano de logs de login.
+
+    Las filas se encolan sin I/O y un worker las inserta en bloque cada
+    ``batch_size`` filas o cada ``flush_interval_ms`` desde la primera fila
+    pendiente. La cola es acotada: si se llena, la fila se descarta y se
+    cuenta en ``dropped`` (el login nunca espera por el log). Al detenerse se
+    vacía la cola antes de salir.
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size: int, flush_interval_ms: int, queue_limit: int,
+                 session_factory=AsyncSessionLocal):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue_limit = queue_limit
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_limit)
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        """Encolar una fila; False si la cola está llena y se descartó"""
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is self._STOP:
+                break
+            batch: List[Dict[str, Any]] = [item]
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout > 0:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+        # Vaciar lo que quede encolado antes de salir
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not self._STOP:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size])
+
+    async def _flush(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            async with self._session_factory() as db:
+                await db.execute(insert(LoginLog), rows)
+                await db.commit()
+            self.written += len(rows)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(rows)
+            logger.error("Error al guardar %s logs de login: %s", len(rows), e)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Detener el worker vaciando la cola (con límite de tiempo)"""
+        if not self.running:
+            return
+        try:
+            self._queue.put_nowait(self._STOP)
+        except asyncio.QueueFull:
+            # El worker consume la cola; el centinela entra en cuanto haya espacio
+            await self._queue.put(self._STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            self.dropped += self._queue.qsize()
+            logger.warning("Tiempo agotado al vaciar logs de login; %s descartados", self._queue.qsize())
+        finally:
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_limit": self.queue_limit,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+login_log_writer = LoginLogWriter(
+    batch_size=settings.login_log_batch_size,
+    flush_interval_ms=settings.login_log_flush_interval_ms,
+    queue_limit=settings.login_log_queue_limit,
+)
+
+
+def encode_login_cursor(timestamp: datetime, log_id: int) -> str:
+    """Cursor opaco con la posición (timestamp, id) del último log entregado"""
+    raw = f"{timestamp.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_login_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Posición de un cursor; ValueError si está mal formado"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, log_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
 class LogLoginService:
     async def create_log(
             user_id: int,
             session_data: SessionContext
     ):
-        """Registra un log de login de usuario."""
+        """
+        Registra un log de login de usuario.
+        Con el escritor en marcha solo se encola; si no (scripts, pruebas)
+        se inserta directamente en una sesión propia.
+        """
+        row = {
+            "user_id": user_id,
+            "ip": session_data.ip,
+            "user_agent": session_data.user_agent,
+            "location": session_data.location,
+            "timestamp": datetime.now(timezone.utc),
+        }
+        if login_log_writer.running:
+            login_log_writer.enqueue(row)
+            return
+
         try:
             async with AsyncSessionLocal() as bg_db:
-                login_payload = LoginLog(
-                    user_id=user_id,
-                    ip=session_data.ip,
-                    user_agent=session_data.user_agent,
-                    location=session_data.location,
-                    timestamp=datetime.now(timezone.utc)
-                )
-                bg_db.add(login_payload)
+                bg_db.add(LoginLog(**row))
                 await bg_db.commit()
         except Exception as e:
-            print(f"Error al crear log de login: {e}")
\ No newline at end of file
+            logger.error(f"Error al crear log de login: {e}")
+
+    async def list_by_user(
+            db: AsyncSession,
+            user_id: int,
+            limit: int = 20,
+            cursor: Optional[str] = None
+    ) -> Tuple[List[LoginLog], Optional[str]]:
+        """
+        Logs de login de un usuario, más recientes primero.
+        Paginación por llave (timestamp, id) sobre ix_login_logs_user_ts: cada
+        página cuesta lo mismo sin importar cuántas se hayan recorrido.
+        Retorna los logs y el cursor de la página siguiente (None si no hay más).
+        """
+        query = select(LoginLog).where(LoginLog.user_id == user_id)
+        if cursor:
+            timestamp, log_id = decode_login_cursor(cursor)
+            query = query.where(tuple_(LoginLog.timestamp, LoginLog.id) < tuple_(timestamp, log_id))
+        query = query.order_by(LoginLog.timestamp.desc(), LoginLog.id.desc()).limit(limit + 1)
+
+        logs = list((await db.execute(query)).scalars())
+        next_cursor = None
+        if len(logs) > limit:
+            logs = logs[:limit]
+            next_cursor = encode_login_cursor(logs[-1].timestamp, logs[-1].id)
+        return logs, next_cursor
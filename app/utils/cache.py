@@ -0,0 +1,86 @@
+"""
+Cache LRU con expiración por entrada y contadores de aciertos
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUTTLCache:
+    """
+    Cache en memoria (por proceso) acotado en tamaño.
+
+    Cada entrada guarda un instante de expiración absoluto (epoch en segundos);
+    cuando se supera ``maxsize`` se descarta la entrada usada menos recientemente.
+    No es thread-safe: está pensado para usarse desde el event loop.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 10_000, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, self._MISSING, count=False) is not self._MISSING
+
+    def get(self, key: Hashable, default: Any = None, *, count: bool = True) -> Any:
+        """Obtener un valor vigente; las entradas vencidas se eliminan"""
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > self._clock():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            del self._data[key]
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, *, ttl: Optional[float] = None,
+            expires_at: Optional[float] = None) -> None:
+        """Guardar un valor con TTL relativo o expiración absoluta"""
+        if expires_at is None:
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = self._clock() + ttl if ttl is not None else float("inf")
+        if expires_at <= self._clock():
+            self._data.pop(key, None)
+            return
+
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Eliminar una entrada y retornar su valor (vigente o no)"""
+        entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para observar la efectividad del cache"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
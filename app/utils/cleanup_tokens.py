@@ -1,45 +1,141 @@
-from sqlalchemy import text
-from app.core.scheduler import scheduler
-from app.core.database import AsyncSessionLocal
+"""
+Limpieza de tokens expirados por lotes
+
+Cada job borra las filas expiradas en lotes de ``token_cleanup_batch_size``
+(un ``DELETE ... WHERE id IN (SELECT id ... LIMIT n FOR UPDATE SKIP LOCKED)``
+por transacción) con una pausa de ``token_cleanup_pause_ms`` entre lotes: los
+locks duran un lote, el WAL se reparte en el tiempo y autovacuum alcanza a
+recuperar el espacio. Las filas bloqueadas por una petición en curso se saltan
+y se borran en la siguiente ejecución.
+
+MySQL no admite LIMIT en un ``IN (SELECT ...)`` ni leer en él la tabla que se
+borra: ahí el lote se elige en una tabla derivada (sin SKIP LOCKED).
+"""
+
+import asyncio
 import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+from sqlalchemy import Select, delete, select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.core.scheduler import scheduler
+from app.models.access_token import AccessToken
+from app.models.password_reset_token import PasswordResetToken
+from app.models.refresh_token import RefreshToken
 
 logger = logging.getLogger(__name__)
 
-@scheduler.scheduled_job("cron", hour=15, minute=52)
-async def cleanup_expired_refresh_tokens():
+
+def expired_batch(ids: Select, id_column, dialect: str):
     """
-    Borra refresh tokens expirados todos los días a las 03:00 AM
+    Subconsulta para ``DELETE ... WHERE id IN (...)`` a partir de un lote
+    ``select(id).where(...).limit(n)``: en MySQL se elige en una tabla
+    derivada y en los demás motores salta las filas bloqueadas.
     """
-    try:
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(
-                text("DELETE FROM refresh_tokens WHERE expires_at <= NOW()")
-            )
-            await db.commit()
-            print(f"Expired refresh tokens cleaned. Rows affected: {result.rowcount or 0}")
-            logger.info(f"Expired refresh tokens cleaned. Rows affected: {result.rowcount or 0}")
-
-    except Exception as e:
-        logger.error(f"Error cleaning refresh tokens: {e}")
-
-# Codigo de prueba
-@scheduler.scheduled_job("interval", hours=1)
-async def test_job():
+    if dialect == "mysql":
+        derived = ids.order_by(id_column).subquery("expired")
+        return select(derived.c[id_column.key]).scalar_subquery()
+    return ids.with_for_update(skip_locked=True).scalar_subquery()
+
+
+class TokenCleanup:
+    """Purga por lotes de una tabla de tokens con métricas de la última ejecución"""
+
+    def __init__(self, model, session_factory=AsyncSessionLocal, dialect: str = engine.dialect.name):
+        self.model = model
+        self._session_factory = session_factory
+        self.dialect = dialect
+        self.runs = 0
+        self.deleted = 0
+        self.errors = 0
+        self.last_deleted = 0
+        self.last_batches = 0
+        self.last_seconds = 0.0
+        self.last_run = None
+
+    def _batch_statement(self, now: datetime, batch_size: int):
+        expired = expired_batch(
+            select(self.model.id).where(self.model.expires_at <= now).limit(batch_size),
+            self.model.id,
+            self.dialect,
+        )
+        return (
+            delete(self.model)
+            .where(self.model.id.in_(expired))
+            .execution_options(synchronize_session=False)
+        )
+
+    async def run(self, batch_size: int = None, pause_ms: int = None) -> int:
+        batch_size = batch_size or settings.token_cleanup_batch_size
+        pause = (settings.token_cleanup_pause_ms if pause_ms is None else pause_ms) / 1000
+        now = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        deleted = batches = 0
+        try:
+            while True:
+                async with self._session_factory() as db:
+                    result = await db.execute(self._batch_statement(now, batch_size))
+                    await db.commit()
+                rows = result.rowcount or 0
+                deleted += rows
+                batches += 1
+                if rows < batch_size:
+                    break
+                await asyncio.sleep(pause)
+        except Exception as e:
+            self.errors += 1
+            logger.error("Error limpiando %s: %s", self.model.__tablename__, e)
+
+        self.runs += 1
+        self.deleted += deleted
+        self.last_deleted = deleted
+        self.last_batches = batches
+        self.last_seconds = time.perf_counter() - started
+        self.last_run = now
+        if deleted:
+            logger.info("%s: %s tokens expirados eliminados en %s lotes (%.0f filas/s)",
+                        self.model.__tablename__, deleted, batches, self.rows_per_second)
+        return deleted
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.last_deleted / self.last_seconds if self.last_seconds else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "deleted": self.deleted,
+            "errors": self.errors,
+            "last_deleted": self.last_deleted,
+            "last_batches": self.last_batches,
+            "last_seconds": round(self.last_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+        }
+
+
+token_cleanups = {
+    cleanup.model.__tablename__: cleanup
+    for cleanup in (
+        TokenCleanup(AccessToken),
+        TokenCleanup(RefreshToken),
+        TokenCleanup(PasswordResetToken),
+    )
+}
+
+
+@scheduler.scheduled_job("interval", minutes=settings.token_cleanup_interval_minutes,
+                         id="cleanup_expired_tokens", max_instances=1, coalesce=True)
+async def cleanup_expired_tokens():
     """
-    Borra refresh tokens con mas de 2 horas de antiguedad que esten expirados
+    Borra access, refresh y password-reset tokens expirados. Los refresh tokens
+    revocados se conservan hasta expirar: la detección de reutilización los necesita.
     """
-    try:
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(
-                text("""
-                    DELETE FROM refresh_tokens
-                    WHERE created_at <= NOW() - INTERVAL '4 hours'
-                      AND is_revoked = TRUE
-                """)
-            )
-            await db.commit()
-            print(f"Expired refresh tokens cleaned. Rows affected: {result.rowcount or 0}")
-            logger.info(f"Expired refresh tokens cleaned. Rows affected: {result.rowcount or 0}")
-
-    except Exception as e:
-        logger.error(f"Error cleaning refresh tokens: {e}")
\ No newline at end of file
+    for cleanup in token_cleanups.values():
+        await cleanup.run()
+
+
+def token_cleanup_stats() -> Dict[str, Any]:
+    return {name: cleanup.stats() for name, cleanup in token_cleanups.items()}
@@ -0,0 +1,278 @@
+"""
+Particiones mensuales y retención de ``login_logs``
+
+En PostgreSQL ``login_logs`` es una tabla particionada por rango de
+``timestamp`` con una partición por mes (``login_logs_pAAAAMM``). El
+mantenimiento crea por adelantado las particiones del mes actual y de los
+``login_log_partitions_ahead`` siguientes, y elimina completas (``DROP TABLE``)
+las que quedan fuera de ``login_log_retention_months``: la retención no borra
+filas ni deja bloat, y su costo no depende del tamaño de la tabla.
+
+Cada worker asegura las particiones al arrancar, además del job del líder.
+Si aun así falta la del mes, las filas caen en ``login_logs_default`` en vez
+de fallar la inserción; al crear después esa partición mensual se mueven a
+ella.
+
+Si la tabla no está particionada (instalaciones anteriores o motores distintos
+de PostgreSQL) la retención cae a un ``DELETE`` por lotes, con la misma
+subconsulta que la limpieza de tokens (tabla derivada en MySQL).
+"""
+
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.scheduler import scheduler
+from app.models.Logs_login import LoginLog
+from app.utils.cleanup_tokens import expired_batch
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "login_logs_p"
+DEFAULT_PARTITION = "login_logs_default"
+_PARTITION_NAME = re.compile(r"^login_logs_p(\d{4})(\d{2})$")
+
+# Filas por lote en la retención sin particiones
+DELETE_CHUNK_SIZE = 10_000
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    """Mes de una partición a partir de su nombre (None si no es mensual)"""
+    found = _PARTITION_NAME.match(name)
+    if not found:
+        return None
+    return datetime(int(found.group(1)), int(found.group(2)), 1, tzinfo=timezone.utc)
+
+
+def months_to_create(now: datetime, ahead: int) -> List[datetime]:
+    current = month_start(now)
+    return [add_months(current, offset) for offset in range(ahead + 1)]
+
+
+def retention_cutoff(now: datetime, retention_months: int) -> Optional[datetime]:
+    """Inicio del mes más antiguo que se conserva (None: sin retención)"""
+    if retention_months <= 0:
+        return None
+    return add_months(month_start(now), -retention_months)
+
+
+def expired_partitions(names: List[str], cutoff: datetime) -> List[str]:
+    """Particiones cuyo rango termina antes del corte de retención"""
+    expired = []
+    for name in names:
+        month = partition_month(name)
+        if month is not None and add_months(month, 1) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+
+def _qualified(name: str) -> str:
+    if not settings.db_schema:
+        return f'"{name}"'
+    return f'"{settings.db_schema}"."{name}"'
+
+
+class LoginLogPartitionService():
+    async def is_partitioned(db: AsyncSession) -> bool:
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        result = await db.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = COALESCE(NULLIF(:schema, ''), current_schema()) AND c.relname = :table"
+        ), {"schema": settings.db_schema, "table": LoginLog.__tablename__})
+        return result.first() is not None
+
+    async def list_partitions(db: AsyncSession) -> List[str]:
+        result = await db.execute(text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "JOIN pg_namespace n ON n.oid = parent.relnamespace "
+            "WHERE n.nspname = COALESCE(NULLIF(:schema, ''), current_schema()) AND parent.relname = :table"
+        ), {"schema": settings.db_schema, "table": LoginLog.__tablename__})
+        return [row[0] for row in result]
+
+    async def ensure_partitions(db: AsyncSession, now: Optional[datetime] = None) -> List[str]:
+        """Crear la partición DEFAULT y las del mes actual y siguientes que falten"""
+        now = now or datetime.now(timezone.utc)
+        # Serializa a los workers que arrancan a la vez y al job del líder
+        await db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                         {"key": f"{settings.db_schema}.{LoginLog.__tablename__}.partitions"})
+        existing = set(await LoginLogPartitionService.list_partitions(db))
+        created = []
+        if DEFAULT_PARTITION not in existing:
+            await db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {_qualified(DEFAULT_PARTITION)} "
+                f"PARTITION OF {_qualified(LoginLog.__tablename__)} DEFAULT"
+            ))
+            created.append(DEFAULT_PARTITION)
+        for month in months_to_create(now, settings.login_log_partitions_ahead):
+            name = partition_name(month)
+            if name in existing:
+                continue
+            await LoginLogPartitionService._create_month(db, month, DEFAULT_PARTITION in existing)
+            created.append(name)
+        return created
+
+    async def _create_month(db: AsyncSession, month: datetime, has_default: bool) -> None:
+        """
+        Crear la partición de un mes. Si la DEFAULT ya tiene filas de ese mes
+        (faltó la partición a tiempo), se mueven a la nueva antes de adjuntarla:
+        PostgreSQL no deja crear una partición cuyo rango existe en la DEFAULT.
+        """
+        name = _qualified(partition_name(month))
+        parent = _qualified(LoginLog.__tablename__)
+        bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        in_month = {"desde": month, "hasta": add_months(month, 1)}
+        pending = None
+        if has_default:
+            pending = (await db.execute(text(
+                f"SELECT 1 FROM {_qualified(DEFAULT_PARTITION)} "
+                "WHERE timestamp >= :desde AND timestamp < :hasta LIMIT 1"
+            ), in_month)).first()
+        if pending is None:
+            await db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} {bounds}"))
+            return
+        await db.execute(text(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        await db.execute(text(
+            f"WITH moved AS (DELETE FROM {_qualified(DEFAULT_PARTITION)} "
+            "WHERE timestamp >= :desde AND timestamp < :hasta RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ), in_month)
+        await db.execute(text(f"ALTER TABLE {parent} ATTACH PARTITION {name} {bounds}"))
+
+    async def drop_expired(db: AsyncSession, now: Optional[datetime] = None) -> List[str]:
+        """Eliminar completas las particiones fuera de la retención"""
+        cutoff = retention_cutoff(now or datetime.now(timezone.utc), settings.login_log_retention_months)
+        if cutoff is None:
+            return []
+        partitions = await LoginLogPartitionService.list_partitions(db)
+        names = expired_partitions(partitions, cutoff)
+        for name in names:
+            await db.execute(text(f"DROP TABLE IF EXISTS {_qualified(name)}"))
+        if DEFAULT_PARTITION in partitions:
+            # Normalmente vacía: solo guarda filas mientras falta su partición
+            await db.execute(text(
+                f"DELETE FROM {_qualified(DEFAULT_PARTITION)} WHERE timestamp < :cutoff"
+            ), {"cutoff": cutoff})
+        return names
+
+    async def delete_expired_rows(db: AsyncSession, now: Optional[datetime] = None) -> int:
+        """Retención sin particiones: DELETE por lotes para acotar cada transacción"""
+        cutoff = retention_cutoff(now or datetime.now(timezone.utc), settings.login_log_retention_months)
+        if cutoff is None:
+            return 0
+        dialect = db.get_bind().dialect.name
+        deleted = 0
+        while True:
+            chunk = expired_batch(
+                select(LoginLog.id).where(LoginLog.timestamp < cutoff).limit(DELETE_CHUNK_SIZE),
+                LoginLog.id,
+                dialect,
+            )
+            result = await db.execute(
+                delete(LoginLog)
+                .where(LoginLog.id.in_(chunk), LoginLog.timestamp < cutoff)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            deleted += result.rowcount or 0
+            if (result.rowcount or 0) < DELETE_CHUNK_SIZE:
+                return deleted
+
+
+class LoginLogMaintenance:
+    """Job periódico del scheduler: particiones por adelantado y retención"""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self.runs = 0
+        self.created = 0
+        self.dropped = 0
+        self.deleted_rows = 0
+        self.errors = 0
+        self.last_run: Optional[datetime] = None
+
+    async def ensure_partitions(self) -> List[str]:
+        """
+        Asegurar las particiones al arrancar el worker, sin depender del
+        scheduler (deshabilitado o con el job del líder fallando)
+        """
+        try:
+            async with self._session_factory() as db:
+                if not await LoginLogPartitionService.is_partitioned(db):
+                    return []
+                created = await LoginLogPartitionService.ensure_partitions(db)
+                await db.commit()
+        except Exception as e:
+            self.errors += 1
+            logger.error("Error asegurando las particiones de login_logs: %s", e)
+            return []
+        self.created += len(created)
+        if created:
+            logger.info("login_logs: particiones creadas al arrancar %s", created)
+        return created
+
+    async def run_once(self) -> Tuple[List[str], List[str], int]:
+        created: List[str] = []
+        dropped: List[str] = []
+        deleted = 0
+        try:
+            async with self._session_factory() as db:
+                if await LoginLogPartitionService.is_partitioned(db):
+                    created = await LoginLogPartitionService.ensure_partitions(db)
+                    dropped = await LoginLogPartitionService.drop_expired(db)
+                    await db.commit()
+                else:
+                    deleted = await LoginLogPartitionService.delete_expired_rows(db)
+        except Exception as e:
+            self.errors += 1
+            logger.error("Error en el mantenimiento de login_logs: %s", e)
+        self.runs += 1
+        self.created += len(created)
+        self.dropped += len(dropped)
+        self.deleted_rows += deleted
+        self.last_run = datetime.now(timezone.utc)
+        if created or dropped:
+            logger.info("login_logs: particiones creadas %s, eliminadas %s", created, dropped)
+        return created, dropped, deleted
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "partitions_created": self.created,
+            "partitions_dropped": self.dropped,
+            "rows_deleted": self.deleted_rows,
+            "errors": self.errors,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+        }
+
+
+login_log_maintenance = LoginLogMaintenance()
+
+
+# Primera ejecución al arrancar el scheduler: las particiones deben existir antes de insertar
+@scheduler.scheduled_job("interval", seconds=settings.login_log_maintenance_interval_seconds,
+                         id="login_log_maintenance", next_run_time=datetime.now(timezone.utc),
+                         misfire_grace_time=None, max_instances=1, coalesce=True)
+async def maintain_login_logs():
+    await login_log_maintenance.run_once()
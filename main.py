@@ -1,17 +1,51 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api import api_router
+from app.auth.permission_index import permission_index
+from app.auth.refresh_singleflight import refresh_single_flight
+from app.auth.revocation_bus import revocation_bus
+from app.auth.signing import keyring
+from app.auth.token_cache import access_token_cache
+from app.auth.token_store import token_store
+from app.core.scheduler import scheduler_runner
+from app.core.security import password_hash_stats
+from app.utils.GeoIp2 import geoip_cache_stats, geoip_database, user_agent_cache_stats
+from app.utils.Logs_login_service import login_log_writer
+from app.utils.cleanup_tokens import token_cleanup_stats
+from app.utils.login_log_partitions import login_log_maintenance
 from scalar_fastapi import get_scalar_api_reference
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Abrir GeoLite2 (mmap) al iniciar el worker y no en el import
+    geoip_database.load()
+    # Particiones de login_logs antes de escribir, aunque el scheduler no corra
+    await login_log_maintenance.ensure_partitions()
+    login_log_writer.start()
+    # Escuchar las revocaciones publicadas por los demás workers
+    await revocation_bus.start()
+    # Jobs periódicos (limpieza, particiones): solo los ejecuta el worker líder
+    scheduler_runner.start()
+    yield
+    await scheduler_runner.stop()
+    await revocation_bus.stop()
+    # Vaciar los logs de login pendientes antes de cerrar
+    await login_log_writer.stop()
+    await token_store.close()
+    geoip_database.close()
+
+
 # Crear la aplicación FastAPI
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="Sistema completo de autenticación con FastAPI Async",
     docs_url="/docs",
-    redoc_url=None
+    redoc_url=None,
+    lifespan=lifespan
 )
 
 
@@ -52,3 +86,34 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": settings.app_name}
 
+
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks(request: Request):
+    """Llaves públicas de firma para verificar tokens localmente"""
+    headers = {
+        "Cache-Control": f"public, max-age={settings.jwks_max_age_seconds}",
+        "ETag": keyring.jwks_etag,
+    }
+    if request.headers.get("if-none-match") == keyring.jwks_etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=keyring.jwks_body, media_type="application/json", headers=headers)
+
+
+@app.get("/health/metrics")
+async def health_metrics():
+    """Contadores internos del worker (caches, colas, jobs)"""
+    return {
+        "auth_cache": access_token_cache.stats(),
+        "password_hash": password_hash_stats(),
+        "permission_index": permission_index.stats(),
+        "refresh_singleflight": refresh_single_flight.stats(),
+        "revocation_bus": revocation_bus.stats(),
+        "token_store": token_store.stats(),
+        "geoip_cache": geoip_cache_stats(),
+        "geoip_reloads": geoip_database.reloads,
+        "user_agent_cache": user_agent_cache_stats(),
+        "login_log_writer": login_log_writer.stats(),
+        "login_log_maintenance": login_log_maintenance.stats(),
+        "scheduler": scheduler_runner.stats(),
+        "token_cleanup": token_cleanup_stats(),
+    }
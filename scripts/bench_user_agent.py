@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del parseo de user agents por login
+
+Compara el costo de obtener ``{browser, os, device}`` + ``device_id`` con
+``user_agents.parse`` en cada login contra la capa memoizada de GeoIp2.
+
+Uso:
+    python -m scripts.bench_user_agent [--logins 20000]
+"""
+
+import argparse
+import random
+import time
+from app.utils import GeoIp2
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.6099.144 Mobile Safari/537.36",
+    "Mozilla/5.0 (iPad; CPU OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
+]
+
+
+def uncached(header: str):
+    user_agent = GeoIp2._parse_user_agent(header)
+    return user_agent, GeoIp2.device_id_from_user_agent(user_agent)
+
+
+def bench(fn, headers) -> float:
+    start = time.perf_counter()
+    for header in headers:
+        fn(header)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de parseo de user agents")
+    parser.add_argument("--logins", type=int, default=20_000)
+    args = parser.parse_args()
+
+    # Distribución sesgada: pocos UA concentran la mayoría de logins
+    rng = random.Random(0)
+    headers = rng.choices(USER_AGENTS, weights=[40, 15, 12, 10, 10, 8, 3, 2], k=args.logins)
+
+    # Antes: se parseaba dos veces por login (get_ip + create_id_device)
+    before = bench(lambda h: (uncached(h), uncached(h)), headers)
+    GeoIp2._user_agent_cache.clear()
+    after = bench(GeoIp2.user_agent_fingerprint, headers)
+
+    per_login_before = before / args.logins * 1e6
+    per_login_after = after / args.logins * 1e6
+    print(f"Logins simulados: {args.logins}")
+    print(f"Antes (2 parseos por login): {per_login_before:8.1f} µs/login")
+    print(f"Después (memoizado):         {per_login_after:8.1f} µs/login")
+    print(f"CPU ahorrada:                {per_login_before - per_login_after:8.1f} µs/login "
+          f"({before / after:.0f}x)")
+    print(f"Cache: {GeoIp2.user_agent_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
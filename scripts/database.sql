@@ -1,6 +1,9 @@
 -- Set client messages to warning to reduce verbosity
 SET client_min_messages = WARNING;
 
+-- Trigramas para los índices de búsqueda (ILIKE '%term%')
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Table: password_reset_tokens
 DROP TABLE IF EXISTS password_reset_tokens CASCADE;
 CREATE TABLE IF NOT EXISTS password_reset_tokens (
@@ -152,6 +155,9 @@ CREATE INDEX idx_menu_activo ON "menu"(activo);
 CREATE INDEX idx_menu_visible ON "menu"(visible);
 CREATE INDEX idx_menu_aplicacion_activo ON "menu"(id_aplicacion, activo);
 CREATE INDEX idx_menu_nombre ON "menu"(nombre);
+CREATE INDEX ix_menu_nombre_trgm ON "menu" USING gin (nombre gin_trgm_ops);
+CREATE INDEX ix_menu_descripcion_trgm ON "menu" USING gin (descripcion gin_trgm_ops);
+CREATE INDEX ix_menu_url_menu_trgm ON "menu" USING gin (url_menu gin_trgm_ops);
 
 -- Table: permiso_api
 DROP TABLE IF EXISTS "permiso_api" CASCADE;
@@ -259,6 +265,7 @@ CREATE TABLE "usuarios" (
   firma VARCHAR(250),
   foto VARCHAR(250),
   activo INTEGER DEFAULT 1,
+  token_epoch INTEGER NOT NULL DEFAULT 0,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   deleted_at TIMESTAMP
@@ -271,6 +278,10 @@ CREATE INDEX idx_usuarios_username ON "usuarios"(username);
 CREATE INDEX idx_usuarios_activo ON "usuarios"(activo);
 CREATE INDEX idx_usuarios_created_at ON "usuarios"(created_at);
 CREATE INDEX idx_usuarios_nombres_apellidos ON "usuarios"(nombres, apellidos);
+CREATE INDEX ix_usuarios_nombres_trgm ON "usuarios" USING gin (nombres gin_trgm_ops);
+CREATE INDEX ix_usuarios_apellidos_trgm ON "usuarios" USING gin (apellidos gin_trgm_ops);
+CREATE INDEX ix_usuarios_username_trgm ON "usuarios" USING gin (username gin_trgm_ops);
+CREATE INDEX ix_usuarios_email_trgm ON "usuarios" USING gin (email gin_trgm_ops);
 
 -- Table: usuario_roles
 DROP TABLE IF EXISTS "usuario_roles" CASCADE;
@@ -330,27 +341,46 @@ CREATE TABLE "refresh_tokens" (
 -- Índices
 CREATE INDEX ix_refresh_tokens_user_id ON refresh_tokens (user_id);
 CREATE INDEX ix_refresh_tokens_user_active ON refresh_tokens (user_id, is_revoked);
+CREATE INDEX ix_refresh_tokens_user_device_active ON refresh_tokens (user_id, device_id, is_revoked);
 CREATE INDEX ix_refresh_tokens_exp ON refresh_tokens (expires_at);
 
 
 -- Table: login_logs
+-- Particionada por mes; la aplicación crea las particiones por adelantado y
+-- elimina las que superan la retención (app/utils/login_log_partitions.py).
+-- Sin FK a usuarios: en tablas particionadas encarece cada inserción y
+-- bloquea el DROP de particiones antiguas.
 CREATE TABLE login_logs (
-    id INTEGER PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY,
     user_id INTEGER NOT NULL,
     timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    ip VARCHAR(45) NOT NULL,
+    ip VARCHAR(255) NOT NULL,
     location VARCHAR(255),
     user_agent JSONB,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
 
-    CONSTRAINT fk_login_logs_user
-      FOREIGN KEY (user_id)
-      REFERENCES usuarios(id)
-      ON DELETE CASCADE
-);
+-- Índices (se propagan a cada partición)
+CREATE INDEX ix_login_logs_user_ts ON login_logs (user_id, timestamp DESC, id DESC);
 
--- Índices
-CREATE INDEX ix_login_logs_user_id ON login_logs (user_id);
-CREATE INDEX ix_login_logs_timestamp ON login_logs (timestamp);
+-- Partición DEFAULT: recibe las filas de un mes cuya partición aún no existe
+-- (la aplicación las mueve a la mensual al crearla)
+CREATE TABLE IF NOT EXISTS login_logs_default PARTITION OF login_logs DEFAULT;
+
+-- Mes actual y los LOGIN_LOG_PARTITIONS_AHEAD (2) siguientes; después las
+-- crea la aplicación al arrancar y en el job de mantenimiento
+DO $$
+DECLARE
+    desde DATE;
+BEGIN
+    FOR i IN 0..2 LOOP
+        desde := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => i))::date;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS login_logs_p%s PARTITION OF login_logs FOR VALUES FROM (%L) TO (%L)',
+            to_char(desde, 'YYYYMM'), desde || ' 00:00+00', (desde + INTERVAL '1 month')::date || ' 00:00+00'
+        );
+    END LOOP;
+END $$;
 
 
 -- ============================
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Generar una llave privada de firma JWT en JWT_KEYS_DIR
+
+Uso:
+    python -m scripts.generate_jwt_key <kid> [--alg ES256|EdDSA]
+
+Luego configurar JWT_ACTIVE_KID=<kid> y reiniciar. Para retirar la llave
+anterior, reemplazar su <kid>.pem por la pública (<kid>.pub.pem) y
+eliminarla cuando hayan expirado los tokens firmados con ella.
+"""
+
+import argparse
+import os
+from pathlib import Path
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from app.core.config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar llave de firma JWT")
+    parser.add_argument("kid", help="Identificador de la llave (kid)")
+    parser.add_argument("--alg", choices=["ES256", "EdDSA"], default="ES256")
+    parser.add_argument("--dir", default=settings.jwt_keys_dir or "keys")
+    args = parser.parse_args()
+
+    if args.alg == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+
+    directory = Path(args.dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{args.kid}.pem"
+    if path.exists():
+        raise SystemExit(f"❌ Ya existe {path}")
+
+    path.write_bytes(private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    ))
+    os.chmod(path, 0o600)
+    print(f"✅ Llave {args.alg} creada en {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+-- ============================================================
+-- Migración de login_logs a tabla particionada por mes
+--
+-- Para instalaciones creadas antes del particionado. Renombra la tabla
+-- actual, crea la particionada con una partición por cada mes que tenga
+-- datos (más el actual y los 2 siguientes) y la DEFAULT, copia las filas y
+-- elimina la tabla anterior.
+-- Ejecutar en una ventana de mantenimiento: la copia es proporcional al
+-- tamaño de la tabla. Las particiones siguientes las crea la aplicación.
+-- ============================================================
+
+BEGIN;
+
+ALTER TABLE login_logs RENAME TO login_logs_old;
+ALTER INDEX IF EXISTS ix_login_logs_user_id RENAME TO ix_login_logs_old_user_id;
+ALTER INDEX IF EXISTS ix_login_logs_timestamp RENAME TO ix_login_logs_old_timestamp;
+
+CREATE TABLE login_logs (
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY,
+    user_id INTEGER NOT NULL,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ip VARCHAR(255) NOT NULL,
+    location VARCHAR(255),
+    user_agent JSONB,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE INDEX ix_login_logs_user_ts ON login_logs (user_id, timestamp DESC, id DESC);
+
+DO $$
+DECLARE
+    mes DATE;
+BEGIN
+    FOR mes IN
+        SELECT DISTINCT date_trunc('month', timestamp AT TIME ZONE 'UTC')::date FROM login_logs_old
+        UNION
+        SELECT (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => i))::date
+        FROM generate_series(0, 2) AS i
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS login_logs_p%s PARTITION OF login_logs FOR VALUES FROM (%L) TO (%L)',
+            to_char(mes, 'YYYYMM'), mes || ' 00:00+00', (mes + INTERVAL '1 month')::date || ' 00:00+00'
+        );
+    END LOOP;
+END $$;
+
+CREATE TABLE IF NOT EXISTS login_logs_default PARTITION OF login_logs DEFAULT;
+
+INSERT INTO login_logs (id, user_id, timestamp, ip, location, user_agent)
+SELECT id, user_id, timestamp, ip, location, user_agent FROM login_logs_old;
+
+SELECT setval(
+    pg_get_serial_sequence('login_logs', 'id'),
+    COALESCE((SELECT MAX(id) FROM login_logs), 0) + 1,
+    false
+);
+
+DROP TABLE login_logs_old;
+
+COMMIT;
@@ -16,6 +16,7 @@ from app.crud.crud_aplicacion import aplicacion as crud_aplicacion
 from app.schemas.usuario import UsuarioCreate
 from app.schemas.rol import RolCreate
 from app.schemas.aplicacion import AplicacionCreate
+from app.utils.login_log_partitions import LoginLogPartitionService
 
 async def create_tables():
     """Crear todas las tablas en la base de datos"""
@@ -24,8 +25,17 @@ async def create_tables():
     engine = create_async_engine(settings.database_url, echo=False)
     
     async with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            # Los índices de búsqueda usan gin_trgm_ops
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         # Crear todas las tablas
         await conn.run_sync(Base.metadata.create_all)
+
+    # login_logs es particionada: crear las particiones iniciales
+    async with async_sessionmaker(engine, class_=AsyncSession)() as db:
+        if await LoginLogPartitionService.is_partitioned(db):
+            await LoginLogPartitionService.ensure_partitions(db)
+            await db.commit()
     
     await engine.dispose()
     print("✅ Tablas creadas exitosamente")
@@ -78,16 +88,22 @@ async def create_initial_data():
                 }
             ]
             
-            created_roles = {}
-            for role_data in roles_data:
-                existing_role = await crud_rol.get_by_nombre(db, nombre=role_data["nombre"])
-                if not existing_role:
-                    role = await crud_rol.create(db, obj_in=RolCreate(**role_data))
-                    created_roles[role_data["nombre"]] = role
-                    print(f"     ✅ Rol creado: {role.nombre}")
-                else:
-                    created_roles[role_data["nombre"]] = existing_role
-                    print(f"     ⚠️  Rol ya existe: {existing_role.nombre}")
+            created_roles = {
+                role.nombre: role
+                for role in await crud_rol.get_multi(
+                    db, filters={"nombre": [role_data["nombre"] for role_data in roles_data]}
+                )
+            }
+            for nombre in created_roles:
+                print(f"     ⚠️  Rol ya existe: {nombre}")
+            new_roles = [
+                RolCreate(**role_data)
+                for role_data in roles_data
+                if role_data["nombre"] not in created_roles
+            ]
+            for role in await crud_rol.create_many(db, objs_in=new_roles):
+                created_roles[role.nombre] = role
+                print(f"     ✅ Rol creado: {role.nombre}")
             
             # Crear usuario super administrador
             print("  👤 Creando usuario super administrador...")
@@ -0,0 +1,136 @@
+"""
+Fixtures compartidas de las pruebas
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+import pytest
+from sqlalchemy import Column, Integer, String, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from app.crud.base import CRUDBase
+
+ItemBase = declarative_base()
+
+
+class Item(ItemBase):
+    """Modelo genérico para probar CRUDBase fuera del esquema de la aplicación"""
+    __tablename__ = "items"
+    id = Column(Integer, primary_key=True)
+    clave = Column(String(20), unique=True, nullable=True)
+    nombre = Column(String(50), nullable=False)
+    email = Column(String(50), nullable=True)
+    orden = Column(Integer, nullable=True)
+    activo = Column(Integer, default=1)
+
+
+class CRUDItem(CRUDBase):
+    search_fields = ["nombre"]
+
+
+class ItemsDB:
+    """
+    BD SQLite en memoria con la tabla ``items``. ``run`` crea la tabla, carga
+    ``seed`` y ejecuta ``scenario(db)``; ``statements`` guarda el SQL que
+    ejecutó el escenario (sin la carga inicial).
+    """
+
+    model = Item
+
+    def __init__(self):
+        self.crud = CRUDItem(Item)
+        self.statements: List[str] = []
+
+    def run(self, scenario: Callable[[AsyncSession], Awaitable[Any]],
+            seed: Iterable[Dict[str, Any]] = ()) -> Any:
+        async def run():
+            engine = create_async_engine("sqlite+aiosqlite://")
+            async with engine.begin() as conn:
+                await conn.run_sync(ItemBase.metadata.create_all)
+            try:
+                async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                    rows = [Item(**row) for row in seed]
+                    if rows:
+                        db.add_all(rows)
+                        await db.commit()
+                    self.statements.clear()
+                    event.listen(engine.sync_engine, "before_cursor_execute",
+                                 lambda conn, cursor, sql, *args: self.statements.append(sql))
+                    return await scenario(db)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(run())
+
+
+class FakeResult:
+    """Resultado mínimo con las lecturas que usan los servicios"""
+
+    def __init__(self, rows: Iterable[Any] = (), rowcount: Optional[int] = None):
+        self.rows = list(rows)
+        self.rowcount = len(self.rows) if rowcount is None else rowcount
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def all(self):
+        return self.rows
+
+    def scalars(self):
+        return iter(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class RecordingSession:
+    """
+    Sesión mínima que registra sentencias, commits y rollbacks. Cada
+    ``execute`` responde con ``rows``, o con ``respond(sql)`` si se indica.
+    También sirve como ``session_factory`` (``async with``).
+    """
+
+    def __init__(self, rows: Iterable[Any] = (), *, dialect: str = "postgresql",
+                 respond: Optional[Callable[[str], Sequence[Any]]] = None):
+        self.dialect = type("Dialect", (), {"name": dialect})
+        self.rows = list(rows)
+        self.respond = respond
+        self.statements: List[Any] = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    @property
+    def sql(self) -> List[str]:
+        return [str(statement) for statement in self.statements]
+
+    def get_bind(self):
+        return self
+
+    async def execute(self, statement, *args, **kwargs):
+        self.statements.append(statement)
+        if self.respond is not None:
+            return FakeResult(self.respond(str(statement)))
+        return FakeResult(self.rows)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def items() -> ItemsDB:
+    return ItemsDB()
+
+
+@pytest.fixture
+def recording_session():
+    """Fábrica de RecordingSession"""
+    return RecordingSession
@@ -0,0 +1,114 @@
+"""
+Pruebas de las operaciones masivas de CRUDBase (create_many, update_many, upsert_many)
+"""
+
+import asyncio
+import pytest
+from sqlalchemy import select
+from app.crud.crud_usuario import usuario as crud_usuario
+from app.core import security
+from app.core.config import settings
+from app.core.security import verify_password
+from app.schemas.usuario import UsuarioCreate
+
+
+def _items(n, start=0):
+    return [{"clave": f"k{i}", "nombre": f"item {i}"} for i in range(start, start + n)]
+
+
+class TestCreateMany:
+    def test_retorna_en_orden_con_defaults(self, items):
+        async def scenario(db):
+            return await items.crud.create_many(db, objs_in=_items(5))
+
+        rows = items.run(scenario)
+        assert [r.clave for r in rows] == ["k0", "k1", "k2", "k3", "k4"]
+        assert all(r.id is not None and r.activo == 1 for r in rows)
+
+    def test_lotes_y_un_commit(self, items):
+        async def scenario(db):
+            items.statements.clear()
+            count = await items.crud.create_many(db, objs_in=_items(25), batch_size=10, returning=False)
+            inserts = [s for s in items.statements if s.startswith("INSERT")]
+            total = await items.crud.count(db)
+            return count, len(inserts), total
+
+        assert items.run(scenario) == (25, 3, 25)
+
+    def test_sin_commit(self, items):
+        async def scenario(db):
+            await items.crud.create_many(db, objs_in=_items(2), commit=False)
+            await db.rollback()
+            return await items.crud.count(db)
+
+        assert items.run(scenario) == 0
+
+
+class TestUpdateMany:
+    def test_por_id(self, items):
+        async def scenario(db):
+            rows = await items.crud.create_many(db, objs_in=_items(3))
+            updated = await items.crud.update_many(db, objs_in={
+                rows[0].id: {"nombre": "uno"},
+                rows[2].id: {"activo": 0},
+            })
+            return [(r.clave, r.nombre, r.activo) for r in updated]
+
+        assert items.run(scenario) == [("k0", "uno", 1), ("k2", "item 2", 0)]
+
+
+class TestUpsertMany:
+    def test_inserta_y_actualiza(self, items):
+        async def scenario(db):
+            await items.crud.create_many(db, objs_in=_items(2))
+            rows = await items.crud.upsert_many(
+                db,
+                objs_in=[{"clave": "k1", "nombre": "nuevo"}, {"clave": "k9", "nombre": "item 9"}],
+                index_elements=["clave"],
+            )
+            all_rows = (await db.execute(select(items.model).order_by(items.model.clave))).scalars().all()
+            return sorted(r.clave for r in rows), [(r.clave, r.nombre) for r in all_rows]
+
+        returned, stored = items.run(scenario)
+        assert returned == ["k1", "k9"]
+        assert stored == [("k0", "item 0"), ("k1", "nuevo"), ("k9", "item 9")]
+
+    def test_sin_campos_no_modifica_y_retorna_existentes(self, items):
+        async def scenario(db):
+            await items.crud.create_many(db, objs_in=_items(2))
+            rows = await items.crud.upsert_many(
+                db,
+                objs_in=[{"clave": "k0", "nombre": "otro"}, {"clave": "k5", "nombre": "item 5"}],
+                index_elements=["clave"],
+                update_fields=[],
+            )
+            return sorted((r.clave, r.nombre) for r in rows)
+
+        assert items.run(scenario) == [("k0", "item 0"), ("k5", "item 5")]
+
+
+class TestUsuario:
+    def test_hash_de_contrasena(self):
+        user_in = UsuarioCreate(
+            username="masivo", email="masivo@test.com", password="Clave123!",
+            nombres="Masivo", apellidos="Prueba",
+        )
+        rows = asyncio.run(crud_usuario._bulk_rows([user_in]))
+        assert "password" not in rows[0]
+        assert verify_password("Clave123!", rows[0]["hash_clave"])
+
+    def test_mas_filas_que_el_pool_no_responde_503(self, monkeypatch):
+        """El alta masiva espera turno en el pool en lugar de rechazar"""
+        monkeypatch.setattr(settings, "password_hash_queue_limit", 0)
+        capacity = settings.password_hash_workers
+        users = [
+            {"username": f"u{i}", "email": f"u{i}@test.com", "password": f"Clave{i}!"}
+            for i in range(capacity * 2 + 1)
+        ]
+        rows = asyncio.run(crud_usuario._bulk_rows(users))
+        assert len({row["hash_clave"] for row in rows}) == len(users)
+        assert security.password_hash_stats()["pending"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,88 @@
+"""
+Pruebas del lector GeoLite2 con carga perezosa y recarga en caliente
+"""
+
+import os
+import pytest
+from app.utils.GeoIp2 import GeoIPDatabase
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeReader:
+    def __init__(self, content: bytes):
+        self.content = content
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = tmp_path / "GeoLite2-City.mmdb"
+    path.write_bytes(b"v1")
+    clock = FakeClock()
+    db = GeoIPDatabase(path, reload_interval=60, clock=clock)
+    opened = []
+
+    def fake_open():
+        content = path.read_bytes()
+        if content == b"corrupto":
+            raise ValueError("archivo inválido")
+        reader = FakeReader(content)
+        opened.append(reader)
+        return reader
+
+    monkeypatch.setattr(db, "_open", fake_open)
+    return db, path, clock, opened
+
+
+def _replace(path, content: bytes):
+    """Reemplazo atómico como lo haría un job de actualización"""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+
+
+class TestGeoIPDatabase:
+    """Carga perezosa y recarga atómica"""
+
+    def test_carga_perezosa(self, database):
+        db, path, clock, opened = database
+        assert opened == []
+        assert db.get().content == b"v1"
+        db.get()
+        assert len(opened) == 1
+
+    def test_recarga_al_cambiar_archivo(self, database):
+        db, path, clock, opened = database
+        first = db.get()
+        _replace(path, b"v2-mas-grande")
+        assert db.get() is first  # aún no pasa el intervalo
+        clock.now += 61
+        assert db.get().content == b"v2-mas-grande"
+        assert db.reloads == 1
+        assert not first.closed  # se cierra en el siguiente cambio
+
+    def test_archivo_invalido_mantiene_el_anterior(self, database):
+        db, path, clock, opened = database
+        first = db.get()
+        _replace(path, b"corrupto")
+        clock.now += 61
+        assert db.get() is first
+        assert db.reloads == 0
+
+    def test_sin_archivo(self, tmp_path):
+        db = GeoIPDatabase(tmp_path / "no-existe.mmdb", reload_interval=60)
+        assert db.get() is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,82 @@
+"""
+Pruebas de la paginación por cursor (keyset) de CRUDBase
+"""
+
+import pytest
+from app.crud.base import decode_cursor, encode_cursor
+
+ROWS = [
+    {"id": i, "nombre": f"item {i:02d}", "orden": None if i % 4 == 0 else i % 3, "activo": 0 if i == 5 else 1}
+    for i in range(1, 21)
+]
+
+
+def _walk(items, per_page, **kwargs):
+    """Recorrer todas las páginas; retorna los ids en orden"""
+    async def scenario(db):
+        ids, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = await items.crud.get_multi_keyset(db, limit=per_page, cursor=cursor, **kwargs)
+            ids.extend(r.id for r in rows)
+            pages += 1
+            if cursor is None:
+                break
+        return ids, pages
+
+    return items.run(scenario, seed=ROWS)
+
+
+def _expected(descending=False):
+    key = lambda r: (r["orden"] is None, r["orden"] if r["orden"] is not None else 0, r["id"])
+    return [r["id"] for r in sorted(ROWS, key=key, reverse=descending)]
+
+
+class TestCursor:
+    def test_ida_y_vuelta(self):
+        assert decode_cursor(encode_cursor("orden", 3, 17)) == ("orden", 3, 17)
+
+    @pytest.mark.parametrize("cursor", ["no-es-base64!", "bm9qc29u", encode_cursor("id", None, 1)[:-2]])
+    def test_invalido(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestKeyset:
+    """Todas las filas exactamente una vez, en el mismo orden que sin paginar"""
+
+    def test_por_id(self, items):
+        ids, pages = _walk(items, 6)
+        assert ids == list(range(1, 21))
+        assert pages == 4
+
+    def test_por_id_desc(self, items):
+        ids, _ = _walk(items, 7, order_direction="desc")
+        assert ids == list(range(20, 0, -1))
+
+    def test_columna_nullable(self, items):
+        ids, _ = _walk(items, 3, order_by="orden")
+        assert ids == _expected()
+
+    def test_columna_nullable_desc(self, items):
+        ids, _ = _walk(items, 4, order_by="orden", order_direction="desc")
+        assert ids == _expected(descending=True)
+
+    def test_filtros_y_busqueda(self, items):
+        ids, _ = _walk(items, 2, filters={"activo": 1}, search_term="item 0")
+        assert ids == [1, 2, 3, 4, 6, 7, 8, 9]
+
+    def test_pagina_exacta_sin_cursor_siguiente(self, items):
+        ids, pages = _walk(items, 20)
+        assert len(ids) == 20
+        assert pages == 1
+
+    def test_cursor_de_otro_orden(self, items):
+        async def scenario(db):
+            await items.crud.get_multi_keyset(db, cursor=encode_cursor("id", None, 3), order_by="orden")
+
+        with pytest.raises(ValueError):
+            items.run(scenario)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
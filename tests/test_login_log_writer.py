@@ -0,0 +1,100 @@
+"""
+Pruebas del escritor en bloque de logs de login
+"""
+
+import asyncio
+import pytest
+from app.utils.Logs_login_service import LoginLogWriter
+
+
+class FakeSession:
+    def __init__(self, sink, fail=False):
+        self.sink = sink
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, rows):
+        if self.fail:
+            raise RuntimeError("BD caída")
+        self.sink.append(list(rows))
+
+    async def commit(self):
+        pass
+
+
+def _writer(batches, fail=False, **kwargs):
+    options = {"batch_size": 3, "flush_interval_ms": 20, "queue_limit": 100}
+    options.update(kwargs)
+    return LoginLogWriter(session_factory=lambda: FakeSession(batches, fail), **options)
+
+
+def _row(n):
+    return {"user_id": n, "ip": "127.0.0.1"}
+
+
+class TestLoginLogWriter:
+    """Agrupación, descarte y vaciado al detener"""
+
+    def test_agrupa_por_tamano_e_intervalo(self):
+        async def scenario():
+            batches = []
+            writer = _writer(batches)
+            writer.start()
+            for n in range(4):
+                writer.enqueue(_row(n))
+            await asyncio.sleep(0.1)
+            await writer.stop()
+            return batches, writer.stats()
+
+        batches, stats = asyncio.run(scenario())
+        assert [len(b) for b in batches] == [3, 1]
+        assert stats["written"] == 4
+        assert stats["batches"] == 2
+
+    def test_vacia_al_detener(self):
+        async def scenario():
+            batches = []
+            writer = _writer(batches, flush_interval_ms=60_000, batch_size=100)
+            writer.start()
+            for n in range(5):
+                writer.enqueue(_row(n))
+            await writer.stop()
+            return batches, writer
+
+        batches, writer = asyncio.run(scenario())
+        assert sum(len(b) for b in batches) == 5
+        assert not writer.running
+
+    def test_cola_llena_descarta(self):
+        async def scenario():
+            writer = _writer([], queue_limit=2)
+            writer.start()
+            results = [writer.enqueue(_row(n)) for n in range(4)]
+            await writer.stop()
+            return results, writer.stats()
+
+        results, stats = asyncio.run(scenario())
+        assert results == [True, True, False, False]
+        assert stats["dropped"] == 2
+        assert stats["max_depth"] == 2
+
+    def test_errores_se_cuentan(self):
+        async def scenario():
+            writer = _writer([], fail=True)
+            writer.start()
+            writer.enqueue(_row(1))
+            await writer.stop()
+            return writer.stats()
+
+        stats = asyncio.run(scenario())
+        assert stats["failed"] == 1
+        assert stats["written"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
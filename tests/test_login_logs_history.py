@@ -0,0 +1,170 @@
+"""
+Pruebas del historial de logins: particiones mensuales, retención y cursor
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+from app.core.config import settings
+from app.models.Logs_login import LoginLog
+from app.utils.Logs_login_service import LogLoginService, decode_login_cursor, encode_login_cursor
+from app.utils.login_log_partitions import (
+    LoginLogMaintenance,
+    LoginLogPartitionService,
+    add_months,
+    expired_partitions,
+    months_to_create,
+    partition_month,
+    partition_name,
+    retention_cutoff,
+)
+
+NOW = datetime(2026, 1, 15, 12, 30, tzinfo=timezone.utc)
+
+
+def _partitions(session_class, partitions, pending=False, dialect="postgresql"):
+    """Sesión que responde al catálogo con ``partitions`` y a la DEFAULT con ``pending``"""
+    def respond(sql):
+        if "pg_inherits" in sql:
+            return [(name,) for name in partitions]
+        if sql.startswith("SELECT 1 FROM"):
+            return [(1,)] if pending else []
+        return []
+    return session_class(dialect=dialect, respond=respond)
+
+
+def _logs(count):
+    return [
+        LoginLog(id=count - n, user_id=1, ip="127.0.0.1", timestamp=NOW - timedelta(minutes=n))
+        for n in range(count)
+    ]
+
+
+class TestParticiones:
+    """Nombres, rangos y retención de las particiones mensuales"""
+
+    def test_meses_a_crear_cruzan_el_anio(self):
+        months = months_to_create(datetime(2025, 11, 20, tzinfo=timezone.utc), 2)
+        assert [partition_name(m) for m in months] == [
+            "login_logs_p202511", "login_logs_p202512", "login_logs_p202601"
+        ]
+
+    def test_nombre_ida_y_vuelta(self):
+        month = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        assert partition_month(partition_name(month)) == month
+        assert partition_month("login_logs_old") is None
+        assert add_months(month, -14) == datetime(2022, 12, 1, tzinfo=timezone.utc)
+
+    def test_retencion_elimina_meses_completos(self):
+        cutoff = retention_cutoff(NOW, 3)
+        assert cutoff == datetime(2025, 10, 1, tzinfo=timezone.utc)
+        names = ["login_logs_p202508", "login_logs_p202509", "login_logs_p202510",
+                 "login_logs_p202601", "login_logs_default"]
+        assert expired_partitions(names, cutoff) == ["login_logs_p202508", "login_logs_p202509"]
+
+    def test_sin_retencion(self, recording_session, monkeypatch):
+        monkeypatch.setattr(settings, "login_log_retention_months", 0)
+        assert retention_cutoff(NOW, 0) is None
+        assert asyncio.run(LoginLogPartitionService.drop_expired(recording_session(), now=NOW)) == []
+
+    def test_drop_expired_solo_particiones_viejas(self, recording_session, monkeypatch):
+        monkeypatch.setattr(settings, "login_log_retention_months", 1)
+        db = recording_session([("login_logs_p202511",), ("login_logs_p202512",), ("login_logs_p202601",)])
+        dropped = asyncio.run(LoginLogPartitionService.drop_expired(db, now=NOW))
+        assert dropped == ["login_logs_p202511"]
+        assert "DROP TABLE" in str(db.statements[-1])
+
+    def test_crea_default_y_meses_por_adelantado(self, recording_session, monkeypatch):
+        monkeypatch.setattr(settings, "login_log_partitions_ahead", 2)
+        db = _partitions(recording_session, [])
+        created = asyncio.run(LoginLogPartitionService.ensure_partitions(db, now=NOW))
+        assert created == ["login_logs_default", "login_logs_p202601", "login_logs_p202602", "login_logs_p202603"]
+        assert "pg_advisory_xact_lock" in db.sql[0]
+        assert any("PARTITION OF" in sql and sql.endswith(" DEFAULT") for sql in db.sql)
+
+    def test_mes_con_filas_en_default_se_mueve_y_adjunta(self, recording_session, monkeypatch):
+        monkeypatch.setattr(settings, "login_log_partitions_ahead", 0)
+        db = _partitions(recording_session, ["login_logs_default"], pending=True)
+        created = asyncio.run(LoginLogPartitionService.ensure_partitions(db, now=NOW))
+        assert created == ["login_logs_p202601"]
+        moved = next(sql for sql in db.sql if sql.startswith("WITH moved"))
+        assert "DELETE FROM" in moved and "INSERT INTO" in moved
+        assert "ATTACH PARTITION" in db.sql[-1]
+
+    def test_retencion_limpia_la_default(self, recording_session, monkeypatch):
+        monkeypatch.setattr(settings, "login_log_retention_months", 1)
+        db = _partitions(recording_session, ["login_logs_default", "login_logs_p202511"])
+        assert asyncio.run(LoginLogPartitionService.drop_expired(db, now=NOW)) == ["login_logs_p202511"]
+        assert db.sql[-1].startswith("DELETE FROM") and "login_logs_default" in db.sql[-1]
+
+    def test_retencion_sin_particiones_en_mysql(self, recording_session, monkeypatch):
+        """Lote en tabla derivada: sin LIMIT directo en el IN (errores 1235 y 1093)"""
+        monkeypatch.setattr(settings, "login_log_retention_months", 1)
+        db = recording_session(dialect="mysql")
+        assert asyncio.run(LoginLogPartitionService.delete_expired_rows(db, now=NOW)) == 0
+        sql = " ".join(str(db.statements[0].compile(dialect=mysql.dialect())).split())
+        assert sql.startswith("DELETE FROM login_logs WHERE login_logs.id IN (SELECT expired.id FROM (SELECT")
+        assert ") AS expired)" in sql
+        assert db.commits == 1
+
+    def test_retencion_sin_particiones_en_postgresql(self, recording_session, monkeypatch):
+        monkeypatch.setattr(settings, "login_log_retention_months", 1)
+        db = recording_session()
+        asyncio.run(LoginLogPartitionService.delete_expired_rows(db, now=NOW))
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert "LIMIT" in sql and "FOR UPDATE SKIP LOCKED" in sql
+
+    def test_al_arrancar_sin_particionado_no_hace_nada(self, recording_session):
+        maintenance = LoginLogMaintenance(session_factory=lambda: _partitions(recording_session, [], dialect="sqlite"))
+        assert asyncio.run(maintenance.ensure_partitions()) == []
+        assert maintenance.errors == 0
+
+    def test_al_arrancar_error_no_propaga(self):
+        def broken():
+            raise RuntimeError("BD caída")
+        maintenance = LoginLogMaintenance(session_factory=broken)
+        assert asyncio.run(maintenance.ensure_partitions()) == []
+        assert maintenance.errors == 1
+
+    def test_modelo_particionado_con_indice_por_usuario(self):
+        from sqlalchemy.schema import CreateIndex, CreateTable
+        table = str(CreateTable(LoginLog.__table__).compile(dialect=postgresql.dialect()))
+        assert "PARTITION BY RANGE (timestamp)" in table
+        assert "PRIMARY KEY (id, timestamp)" in table
+        indexes = [str(CreateIndex(i).compile(dialect=postgresql.dialect())) for i in LoginLog.__table__.indexes]
+        assert any("(user_id, timestamp DESC, id DESC)" in sql for sql in indexes)
+
+
+class TestHistorialPorCursor:
+    """Paginación por llave (timestamp, id)"""
+
+    def test_cursor_ida_y_vuelta(self):
+        cursor = encode_login_cursor(NOW, 42)
+        assert decode_login_cursor(cursor) == (NOW, 42)
+
+    def test_cursor_invalido(self):
+        with pytest.raises(ValueError):
+            decode_login_cursor("no-es-un-cursor")
+
+    def test_pagina_con_siguiente(self, recording_session):
+        db = recording_session(_logs(3))
+        logs, next_cursor = asyncio.run(LogLoginService.list_by_user(db, user_id=1, limit=2))
+        assert len(logs) == 2
+        assert decode_login_cursor(next_cursor) == (logs[-1].timestamp, logs[-1].id)
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert "ORDER BY login_logs.timestamp DESC, login_logs.id DESC" in sql
+        assert "OFFSET" not in sql
+
+    def test_ultima_pagina_sin_cursor(self, recording_session):
+        db = recording_session(_logs(2))
+        cursor = encode_login_cursor(NOW, 10)
+        logs, next_cursor = asyncio.run(LogLoginService.list_by_user(db, user_id=1, limit=5, cursor=cursor))
+        assert len(logs) == 2
+        assert next_cursor is None
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert "(login_logs.timestamp, login_logs.id) <" in sql
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,55 @@
+"""
+Pruebas de la persistencia de tokens del login (viajes a la BD por login)
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import pytest
+from app.auth.login_persistence import LoginPersistenceService
+from app.core.config import settings
+from app.utils.GeoIp2 import SessionContext
+
+
+def _persist(db):
+    expires = datetime.now(timezone.utc) + timedelta(minutes=30)
+    return asyncio.run(LoginPersistenceService.persist_login(
+        db,
+        user_id=1,
+        access_token={"jti": uuid4(), "expires_at": expires},
+        refresh_token={"jti": uuid4(), "token": "refresh", "expires_at": expires},
+        session=SessionContext(ip="127.0.0.1", user_agent={}, device_id="device"),
+    ))
+
+
+class TestLoginPersistence:
+    """Una sola sentencia en PostgreSQL, sentencias core en otros motores"""
+
+    def test_postgresql_una_sentencia(self, recording_session):
+        from sqlalchemy.dialects import postgresql
+        db = recording_session()
+        _persist(db)
+        assert len(db.statements) == 1
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert sql.startswith("WITH revoked_device AS")
+        assert "INSERT INTO access_tokens" in sql
+        assert "INSERT INTO refresh_tokens" in sql
+        # La revocación por dispositivo se limita al usuario (índice compuesto)
+        assert "refresh_tokens.user_id = %(user_id_1)s AND refresh_tokens.device_id" in sql
+
+    def test_modo_epoch_no_guarda_access_token(self, recording_session, monkeypatch):
+        from sqlalchemy.dialects import postgresql
+        monkeypatch.setattr(settings, "access_token_mode", "epoch")
+        db = recording_session()
+        _persist(db)
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert "access_tokens" not in sql
+
+    def test_otros_motores(self, recording_session):
+        db = recording_session(dialect="mysql")
+        _persist(db)
+        assert len(db.statements) == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,56 @@
+"""
+Pruebas de CRUDBase.get_page: página y total en una sola consulta
+"""
+
+import pytest
+from app.schemas import PaginatedResponse
+
+SEED = [{"id": i, "nombre": f"item {i:02d}", "activo": i % 2} for i in range(1, 26)]
+
+
+def _page(items, **kwargs):
+    """Retorna (ids, total, sentencias ejecutadas)"""
+    async def scenario(db):
+        rows, total = await items.crud.get_page(db, **kwargs)
+        return [r.id for r in rows], total, list(items.statements)
+
+    return items.run(scenario, seed=SEED)
+
+
+class TestGetPage:
+    def test_una_consulta(self, items):
+        ids, total, statements = _page(items, skip=10, limit=5, order_by="id")
+        assert ids == [11, 12, 13, 14, 15]
+        assert total == 25
+        assert len(statements) == 1
+        assert "OVER" in statements[0].upper()
+
+    def test_filtros_y_busqueda_en_el_total(self, items):
+        ids, total, _ = _page(items, limit=3, filters={"activo": 1}, search_term="item 1", order_by="id")
+        assert ids == [11, 13, 15]
+        assert total == 5
+
+    def test_orden_descendente(self, items):
+        ids, _, _ = _page(items, limit=2, order_by="id", order_direction="desc")
+        assert ids == [25, 24]
+
+    def test_pagina_fuera_de_rango_cuenta_aparte(self, items):
+        ids, total, statements = _page(items, skip=100, limit=5)
+        assert ids == []
+        assert total == 25
+        assert len(statements) == 2
+
+    def test_sin_resultados(self, items):
+        ids, total, statements = _page(items, search_term="nada")
+        assert (ids, total) == ([], 0)
+        assert len(statements) == 1
+
+
+class TestFromPage:
+    def test_campos_derivados(self):
+        response = PaginatedResponse.from_page([1, 2], total=25, page=3, per_page=10)
+        assert (response.pages, response.last_page, response.size) == (3, 3, 10)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
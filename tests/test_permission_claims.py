@@ -0,0 +1,80 @@
+"""
+Pruebas unitarias para el claim compacto de permisos (bitset de APIs)
+"""
+
+import pytest
+from app.auth.permission_claims import (
+    CLAIM_NAME, bitset_allows, build_claim, decode_api_bitset,
+    encode_api_bitset, is_stale, token_api_bitset
+)
+from app.auth.permission_index import permission_index
+
+ROWS = [
+    (1, 3, "/api/v1/auth/me", 2),
+    (1, 4, "/api/v1/usuarios", 2),
+    (2, 900, "/api/v1/roles", 2),
+]
+
+
+@pytest.fixture
+def index():
+    permission_index.load_rows(ROWS)
+    yield permission_index
+    permission_index.invalidate_all()
+
+
+class TestBitset:
+    """Codificación del bitset"""
+
+    def test_ida_y_vuelta(self):
+        bits = decode_api_bitset(encode_api_bitset([1, 4, 900]))
+        assert bitset_allows(bits, [4])
+        assert bitset_allows(bits, [2, 900])
+        assert not bitset_allows(bits, [2, 3, 901])
+
+    def test_vacio(self):
+        assert decode_api_bitset(encode_api_bitset([])) == 0
+
+    def test_presupuesto_usa_referencia(self):
+        claim = build_claim(range(0, 5000, 7), version=1, max_bytes=16)
+        assert claim["v"] == 1
+        assert "b" not in claim and len(claim["ref"]) == 16
+        assert "b" in build_claim([1, 2, 3], version=1, max_bytes=64)
+
+    def test_ids_enormes_usan_referencia(self):
+        assert encode_api_bitset([10 ** 9]) is None
+        assert "ref" in build_claim([10 ** 9], version=1)
+
+
+class TestTokenClaim:
+    """Uso del claim contra la matriz vigente"""
+
+    def test_version_del_indice_es_determinista(self, index):
+        version = index.version
+        index.load_rows(list(reversed(ROWS)))
+        assert index.version == version
+        index.load_rows(ROWS[:2])
+        assert index.version != version
+
+    def test_token_vigente(self, index):
+        claims = {
+            "roles": ["ADMIN"],
+            CLAIM_NAME: build_claim(index.api_ids_for_roles([1]), index.version),
+        }
+        bits = token_api_bitset(claims, ["ADMIN"])
+        assert bitset_allows(bits, index.api_ids_for_urls(["/api/v1/usuarios"]))
+        assert not bitset_allows(bits, index.api_ids_for_urls(["/api/v1/roles"]))
+        assert not is_stale(claims)
+
+    def test_token_desactualizado(self, index):
+        claims = {"roles": ["ADMIN"], CLAIM_NAME: build_claim([3, 4], index.version + 1)}
+        assert token_api_bitset(claims, ["ADMIN"]) is None
+        assert is_stale(claims)
+
+    def test_roles_cambiados(self, index):
+        claims = {"roles": ["ADMIN"], CLAIM_NAME: build_claim([3, 4], index.version)}
+        assert token_api_bitset(claims, ["ADMIN", "USER"]) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,103 @@
+"""
+Pruebas unitarias para el índice compilado de permisos rol → API
+"""
+
+import asyncio
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.auth.permission_index import PermissionIndex
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+ROWS = [
+    (1, 10, "/api/v1/usuarios", 2),
+    (1, 11, "/api/v1/roles", 2),
+    (2, 10, "/api/v1/usuarios", 2),
+]
+
+
+class TestPermissionIndex:
+    """Pruebas de compilación, consulta e invalidación"""
+
+    def test_allows(self):
+        index = PermissionIndex(ttl=60)
+        index.load_rows(ROWS)
+        assert index.allows([1], ["/api/v1/roles"])
+        assert index.allows([3, 2], ["/api/v1/roles", "/api/v1/usuarios"])
+        assert not index.allows([2], ["/api/v1/roles"])
+        assert not index.allows([], ["/api/v1/usuarios"])
+        assert index.role_api_ids(1) == {10, 11}
+
+    def test_vigencia_por_ttl(self):
+        clock = FakeClock()
+        index = PermissionIndex(ttl=60, clock=clock)
+        assert not index.is_fresh()
+        index.load_rows(ROWS)
+        assert index.is_fresh()
+        clock.now += 61
+        assert not index.is_fresh()
+
+    def test_recarga_parcial_de_rol(self):
+        index = PermissionIndex(ttl=60)
+        index.load_rows(ROWS)
+        index.invalidate_role(1)
+        assert not index.is_fresh()
+        index.load_rows([(1, 12, "/api/v1/menus", 2)], roles={1})
+        assert index.is_fresh()
+        assert index.role_urls(1) == {"/api/v1/menus"}
+        assert index.role_urls(2) == {"/api/v1/usuarios"}
+
+    def test_rol_sin_permisos_tras_recarga(self):
+        index = PermissionIndex(ttl=60)
+        index.load_rows(ROWS)
+        index.invalidate_role(2)
+        index.load_rows([], roles={2})
+        assert not index.allows([2], ["/api/v1/usuarios"])
+        assert index.allows([1], ["/api/v1/usuarios"])
+
+    def test_invalidar_api_marca_sus_roles(self):
+        index = PermissionIndex(ttl=60)
+        index.load_rows(ROWS)
+        index.invalidate_api(10)
+        assert index.stats()["dirty_roles"] == 2
+        index.load_rows([(1, 11, "/api/v1/roles", 2)], roles={1, 2})
+        assert index.is_fresh()
+        assert not index.allows([1, 2], ["/api/v1/usuarios"])
+
+    def test_api_desconocida_reconstruye_todo(self):
+        index = PermissionIndex(ttl=60)
+        index.load_rows(ROWS)
+        index.invalidate_api(99)
+        assert not index.is_fresh()
+
+    def test_allows_route(self):
+        index = PermissionIndex(ttl=60)
+        index.load_rows(ROWS + [(2, 12, "/api/v1/usuarios/{id}", 5)])
+        assert index.allows_route([1], "GET", "/api/v1/usuarios")
+        assert not index.allows_route([1], "POST", "/api/v1/usuarios")
+        assert index.allows_route([2], "DELETE", "/api/v1/usuarios/7")
+        assert not index.allows_route([1], "DELETE", "/api/v1/usuarios/7")
+        index.invalidate_api(12)
+        assert not index.allows_route([2], "DELETE", "/api/v1/usuarios/7")
+
+
+    def test_build_sin_filtro_de_activo(self, recording_session):
+        """Autoriza las mismas filas que get_apis_by_rol, sin mirar ``activo``"""
+        db = recording_session([(1, 10, "/api/v1/usuarios", 2)])
+        index = PermissionIndex(ttl=60)
+        asyncio.run(index.ensure_fresh(db))
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert "activo" not in sql
+        assert "JOIN roles" not in sql
+        assert index.allows([1], ["/api/v1/usuarios"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
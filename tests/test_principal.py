@@ -0,0 +1,54 @@
+"""
+Pruebas unitarias para el cargador de principal
+"""
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.auth.principal import Principal, load_principal
+from app.models.usuario import Usuario
+
+
+class TestPrincipal:
+    """Pruebas para los datos derivados del principal"""
+
+    def test_roles_y_aplicaciones(self):
+        principal = Principal(Usuario(id=1), [(1, "ADMIN", 2), (3, "LECTOR", 2), (4, "SOPORTE", 5)])
+        assert principal.id == 1
+        assert principal.role_ids == [1, 3, 4]
+        assert principal.role_names == ["ADMIN", "LECTOR", "SOPORTE"]
+        assert principal.application_ids == [2, 5]
+
+    def test_has_any_role(self):
+        principal = Principal(Usuario(id=1), [(1, "ADMIN", 2)])
+        assert principal.has_any_role(["ADMIN", "SUPER_ADMIN"])
+        assert not principal.has_any_role(["SUPER_ADMIN"])
+
+
+class TestLoadPrincipal:
+    """Verifica que el principal se resuelve en una sola consulta"""
+
+    class FakeResult:
+        def all(self):
+            return []
+
+    class FakeSession:
+        def __init__(self):
+            self.statements = []
+
+        async def execute(self, statement):
+            self.statements.append(statement)
+            return TestLoadPrincipal.FakeResult()
+
+    def test_una_sola_consulta_con_jti(self):
+        import asyncio
+        db = self.FakeSession()
+        asyncio.run(load_principal(db, user_id=1, jti="00000000-0000-0000-0000-000000000000"))
+        assert len(db.statements) == 1
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert "access_tokens" in sql
+        assert "usuario_roles" in sql
+        assert "roles" in sql
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,215 @@
+"""
+Pruebas de la rotación atómica del refresh token y su single-flight
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+from app.api.endpoints import auth as auth_endpoints
+from app.auth.dependencies import verify_refresh_token
+from app.auth.jwt_handler import hash_token
+from app.auth.principal import Principal
+from app.auth.refresh_rotation import RefreshRotationService
+from app.auth.refresh_singleflight import RefreshSingleFlight
+from app.core.config import settings
+from app.core.database import get_db
+from app.utils.GeoIp2 import SessionContext
+from main import app
+
+EXPIRES = datetime.now(timezone.utc) + timedelta(days=1)
+
+
+def _rotate(db):
+    return asyncio.run(RefreshRotationService.rotate(
+        db,
+        user_id=1,
+        token_jti=uuid4(),
+        token="anterior",
+        access_token={"jti": uuid4(), "expires_at": EXPIRES},
+        refresh_token={"jti": uuid4(), "token": "nuevo", "expires_at": EXPIRES},
+        session=SessionContext(ip="127.0.0.1", user_agent={}, device_id="device"),
+    ))
+
+
+class TestRotacion:
+    """Una sentencia en PostgreSQL; sin fila vigente no se inserta nada"""
+
+    def test_postgresql_una_sentencia(self, recording_session, monkeypatch):
+        monkeypatch.setattr(settings, "access_token_mode", "stateful")
+        db = recording_session()
+        assert _rotate(db) is None
+        assert len(db.statements) == 1
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert sql.startswith("WITH used_refresh_token AS")
+        assert "refresh_tokens.is_revoked = false RETURNING" in sql
+        assert "INSERT INTO access_tokens" in sql
+        assert "INSERT INTO refresh_tokens" in sql
+        assert sql.count("FROM used_refresh_token") == 3
+
+    def test_otros_motores_sin_fila_no_inserta(self, recording_session):
+        db = recording_session(dialect="mysql")
+        assert _rotate(db) is None
+        assert len(db.statements) == 1
+
+
+class TestEndpointRefresh:
+    """Commit único en el camino feliz y detección de reutilización"""
+
+    @pytest.fixture
+    def client(self, recording_session, monkeypatch):
+        db = recording_session()
+        user = SimpleNamespace(id=1, token_epoch=0)
+
+        async def fake_principal(db, *, user_id, jti=None):
+            return Principal(user, [(1, "ADMIN", 1)]), "not_checked"
+
+        monkeypatch.setattr(auth_endpoints, "load_principal", fake_principal)
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[verify_refresh_token] = lambda: {
+            "payload": {"sub": "1", "jti": str(uuid4())},
+            "refresh_token": "anterior",
+        }
+        yield TestClient(app), db, monkeypatch
+        app.dependency_overrides.clear()
+
+    def _used(self, monkeypatch, used, revoked_at=None):
+        async def fake_rotate(db, **kwargs):
+            return used
+
+        async def fake_revoked_at(db, **kwargs):
+            return revoked_at
+
+        monkeypatch.setattr(RefreshRotationService, "rotate", fake_rotate)
+        monkeypatch.setattr(RefreshRotationService, "revoked_at", fake_revoked_at)
+
+    def test_rotacion_exitosa(self, client):
+        client, db, monkeypatch = client
+        self._used(monkeypatch, SimpleNamespace(id=5, token_hash=hash_token("anterior"), device_id="d"))
+        response = client.post("/api/v1/auth/refresh")
+        assert response.status_code == 200
+        assert "refresh_token" in response.cookies
+        assert db.commits == 1
+
+    def test_hash_invalido(self, client):
+        client, db, monkeypatch = client
+        self._used(monkeypatch, SimpleNamespace(id=5, token_hash=hash_token("otro"), device_id="d"))
+        response = client.post("/api/v1/auth/refresh")
+        assert response.status_code == 401
+        assert db.rollbacks == 1
+        assert db.commits == 0
+
+    def test_reutilizacion_revoca_todo(self, client):
+        client, db, monkeypatch = client
+        self._used(monkeypatch, None, revoked_at=datetime.now(timezone.utc) - timedelta(hours=1))
+        response = client.post("/api/v1/auth/refresh")
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Refresh token revocado"
+        assert db.commits == 1
+        assert "UPDATE refresh_tokens" in str(db.statements[-1])
+
+    def test_token_desconocido(self, client):
+        client, db, monkeypatch = client
+        self._used(monkeypatch, None)
+        response = client.post("/api/v1/auth/refresh")
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Refresh token invalido"
+        assert db.commits == 0
+
+    def test_carrera_entre_workers_responde_409(self, client):
+        client, db, monkeypatch = client
+        self._used(monkeypatch, None, revoked_at=datetime.now(timezone.utc))
+        response = client.post("/api/v1/auth/refresh")
+        assert response.status_code == 409
+        # Sin revocación masiva
+        assert db.commits == 0
+        assert not any("UPDATE refresh_tokens" in str(st) for st in db.statements)
+
+
+class TestSingleFlight:
+    """Una rotación por jti; los concurrentes y tardíos reciben el mismo par"""
+
+    def test_concurrentes_comparten_una_rotacion(self):
+        flight = RefreshSingleFlight(grace_seconds=10, max_entries=10)
+        calls = []
+
+        async def rotate():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"access_token": "a", "refresh_token": "r"}
+
+        async def scenario():
+            return await asyncio.gather(*(flight.run("jti", "token", rotate) for _ in range(5)))
+
+        results = asyncio.run(scenario())
+        assert len(calls) == 1
+        assert all(result == results[0] for result in results)
+        # Dentro de la ventana de gracia tampoco se rota de nuevo
+        assert asyncio.run(flight.run("jti", "token", rotate)) == results[0]
+        assert len(calls) == 1
+        assert flight.stats()["shared"] == 5
+
+    def test_otro_token_mismo_jti_no_comparte(self):
+        flight = RefreshSingleFlight(grace_seconds=10, max_entries=10)
+
+        async def rotate():
+            return {"access_token": "a", "refresh_token": "r"}
+
+        asyncio.run(flight.run("jti", "token", rotate))
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(flight.run("jti", "otro", rotate))
+        assert error.value.status_code == 401
+
+    def test_error_se_comparte_y_no_se_guarda(self):
+        flight = RefreshSingleFlight(grace_seconds=10, max_entries=10)
+        calls = []
+
+        async def rotate():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise HTTPException(status_code=401, detail="Refresh token invalido")
+
+        async def scenario():
+            return await asyncio.gather(
+                *(flight.run("jti", "token", rotate) for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(scenario())
+        assert len(calls) == 1
+        assert all(isinstance(r, HTTPException) for r in results)
+        assert flight.stats()["recent"] == 0
+
+
+    def test_lider_cancelado_no_cancela_a_los_que_esperan(self):
+        """Un seguidor toma el relevo y rota; nadie recibe CancelledError"""
+        flight = RefreshSingleFlight(grace_seconds=10, max_entries=10)
+        calls = []
+
+        async def rotate():
+            calls.append(1)
+            await asyncio.sleep(0.05 if len(calls) == 1 else 0.01)
+            return {"access_token": f"a{len(calls)}", "refresh_token": "r"}
+
+        async def scenario():
+            leader = asyncio.create_task(flight.run("jti", "token", rotate))
+            await asyncio.sleep(0)
+            followers = [asyncio.create_task(flight.run("jti", "token", rotate)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            results = await asyncio.gather(*followers, return_exceptions=True)
+            return leader, results
+
+        leader, results = asyncio.run(scenario())
+        assert leader.cancelled()
+        assert results == [{"access_token": "a2", "refresh_token": "r"}] * 3
+        assert len(calls) == 2
+        assert flight.stats()["takeovers"] == 3
+        assert flight.stats()["inflight"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,237 @@
+"""
+Pruebas del bus de revocaciones entre workers
+"""
+
+import asyncio
+import json
+import time
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.auth.revocation_bus import (
+    LoopbackRevocationBus,
+    PostgresRevocationBus,
+    RevocationEvent,
+)
+from app.auth.permission_index import PermissionIndex, permission_index
+from app.auth.token_cache import AccessTokenCache, access_token_cache
+from app.models.rol import Rol
+from app.models.usuario import Usuario
+
+
+def _cache_with_user(user_id=7, epoch=1):
+    cache = AccessTokenCache(max_tokens=100, max_users=100, user_ttl=60)
+    user = Usuario(id=user_id, token_epoch=epoch)
+    cache.remember_principal(user, [])
+    return cache
+
+
+class TestLoopback:
+    """Entrega en el propio proceso a todos los suscriptores"""
+
+    def test_publica_y_entrega(self, recording_session):
+        bus = LoopbackRevocationBus()
+        received = []
+        bus.subscribe(received.append)
+        asyncio.run(bus.publish(recording_session(), 7))
+        assert [e.user_id for e in received] == [7]
+        assert bus.stats()["published"] == 1
+        assert bus.stats()["received"] == 1
+
+    def test_error_de_un_suscriptor_no_corta_la_entrega(self):
+        bus = LoopbackRevocationBus()
+        received = []
+
+        def broken(event):
+            raise RuntimeError("fallo")
+
+        bus.subscribe(broken)
+        bus.subscribe(received.append)
+        bus.deliver(RevocationEvent(7))
+        assert len(received) == 1
+        assert bus.errors == 1
+
+
+class TestPostgres:
+    """pg_notify en la transacción del llamador; el listener decodifica el JSON"""
+
+    def test_publish_usa_pg_notify(self, recording_session):
+        bus = PostgresRevocationBus(channel="auth_revocations", reconnect_seconds=1)
+        db = recording_session()
+        asyncio.run(bus.publish(db, 7))
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert "pg_notify" in sql
+        assert "json_build_object" in sql
+        assert "token_epoch" in sql
+
+    def test_on_notify(self):
+        bus = PostgresRevocationBus(channel="auth_revocations", reconnect_seconds=1)
+        received = []
+        bus.subscribe(received.append)
+        payload = json.dumps({"user_id": 7, "epoch": 3, "sent_at": time.time()})
+        bus._on_notify(None, 1, "auth_revocations", payload)
+        assert (received[0].user_id, received[0].epoch) == (7, 3)
+        assert bus.last_lag_ms is not None
+
+    def test_payload_invalido(self):
+        bus = PostgresRevocationBus(channel="auth_revocations", reconnect_seconds=1)
+        bus._on_notify(None, 1, "auth_revocations", "no-json")
+        assert bus.errors == 1
+        assert bus.received == 0
+
+
+class TestPermisos:
+    """Los cambios de roles/APIs llegan al índice de permisos de todos los workers"""
+
+    def test_publish_usa_pg_notify_en_la_conexion(self):
+        class Connection:
+            statements = []
+
+            def execute(self, statement):
+                self.statements.append(statement)
+
+        bus = PostgresRevocationBus(channel="auth_revocations", reconnect_seconds=1)
+        conn = Connection()
+        bus.publish_permissions(conn, "rol", 3)
+        compiled = conn.statements[0].compile(dialect=postgresql.dialect())
+        assert "pg_notify" in str(compiled)
+        assert {"permissions", "rol", 3} <= set(compiled.params.values())
+        assert bus.stats()["permissions_published"] == 1
+
+    def test_on_notify_entrega_al_indice(self):
+        bus = PostgresRevocationBus(channel="auth_revocations", reconnect_seconds=1)
+        received = []
+        bus.subscribe(received.append)
+        changes = []
+        bus.subscribe_permissions(lambda kind, key: changes.append((kind, key)))
+        payload = json.dumps({"type": "permissions", "kind": "api", "id": 9, "sent_at": time.time()})
+        bus._on_notify(None, 1, "auth_revocations", payload)
+        assert changes == [("api", 9)]
+        assert received == []
+
+    def test_on_notify_tipo_invalido(self):
+        bus = PostgresRevocationBus(channel="auth_revocations", reconnect_seconds=1)
+        bus._on_notify(None, 1, "auth_revocations", json.dumps({"type": "permissions", "kind": "x", "id": 1}))
+        assert bus.errors == 1
+        assert bus.permissions_received == 0
+
+    def test_apply_change_marca_el_rol(self):
+        index = PermissionIndex(ttl=300)
+        index.load_rows([(1, 10, "/api/a", None)])
+        index.apply_change("rol", 1)
+        assert not index.is_fresh()
+
+    def test_flush_publica_una_vez_por_transaccion(self, monkeypatch):
+        """Se publica en el flush (misma transacción) y una sola vez por rol"""
+        published = []
+        monkeypatch.setattr(permission_index, "publisher",
+                            lambda connection, kind, key: published.append((kind, key)))
+        monkeypatch.setattr(access_token_cache, "publisher", None)
+
+        async def run():
+            engine = create_async_engine("sqlite+aiosqlite://")
+            async with engine.begin() as conn:
+                await conn.run_sync(Rol.__table__.create)
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                rol = Rol(nombre="EDITOR", id_aplicacion=1)
+                db.add(rol)
+                await db.commit()
+                rol.descripcion = "uno"
+                await db.flush()
+                rol.activo = 0
+                await db.commit()
+            await engine.dispose()
+
+        asyncio.run(run())
+        assert published == [("rol", 1)]
+
+
+class TestUsuarios:
+    """Los cambios de usuarios y roles descartan el snapshot en todos los workers"""
+
+    def test_publish_usa_pg_notify_en_la_conexion(self):
+        class Connection:
+            statements = []
+
+            def execute(self, statement):
+                self.statements.append(statement)
+
+        bus = PostgresRevocationBus(channel="auth_revocations", reconnect_seconds=1)
+        conn = Connection()
+        bus.publish_user_change(conn, 7)
+        compiled = conn.statements[0].compile(dialect=postgresql.dialect())
+        assert "pg_notify" in str(compiled)
+        assert {"users", 7} <= set(compiled.params.values())
+        assert bus.stats()["users_published"] == 1
+
+    def test_on_notify_descarta_un_usuario(self):
+        bus = PostgresRevocationBus(channel="auth_revocations", reconnect_seconds=1)
+        cache = _cache_with_user(user_id=7)
+        cache.remember_principal(Usuario(id=8, token_epoch=0), [])
+        bus.subscribe_user_changes(cache.apply_user_change)
+        bus._on_notify(None, 1, "auth_revocations", json.dumps({"type": "users", "user_id": 7}))
+        assert cache.get_principal(7) is None
+        assert cache.get_principal(8) is not None
+        assert bus.stats()["users_received"] == 1
+
+    def test_on_notify_sin_usuario_descarta_todos(self):
+        bus = PostgresRevocationBus(channel="auth_revocations", reconnect_seconds=1)
+        cache = _cache_with_user(user_id=7)
+        bus.subscribe_user_changes(cache.apply_user_change)
+        bus._on_notify(None, 1, "auth_revocations", json.dumps({"type": "users", "user_id": None}))
+        assert cache.get_principal(7) is None
+
+    def test_flush_de_rol_publica_una_vez_por_transaccion(self, monkeypatch):
+        """Un rol modificado se publica como cambio de todos los usuarios"""
+        published = []
+        monkeypatch.setattr(access_token_cache, "publisher",
+                            lambda connection, user_id: published.append(user_id))
+        monkeypatch.setattr(permission_index, "publisher", None)
+
+        async def run():
+            engine = create_async_engine("sqlite+aiosqlite://")
+            async with engine.begin() as conn:
+                await conn.run_sync(Rol.__table__.create)
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                rol = Rol(nombre="EDITOR", id_aplicacion=1)
+                db.add(rol)
+                await db.commit()
+                rol.descripcion = "uno"
+                await db.flush()
+                rol.activo = 0
+                await db.commit()
+                rol.descripcion = "dos"
+                await db.commit()
+            await engine.dispose()
+
+        asyncio.run(run())
+        assert published == [None, None]
+
+
+class TestAplicarRevocacion:
+    """El cache descarta al usuario salvo que ya refleje el epoch del evento"""
+
+    def test_epoch_nuevo_invalida(self):
+        cache = _cache_with_user(epoch=1)
+        cache.apply_revocation(7, 2)
+        assert cache.get_principal(7) is None
+
+    def test_snapshot_al_dia_se_conserva(self):
+        cache = _cache_with_user(epoch=2)
+        cache.apply_revocation(7, 2)
+        assert cache.get_user_epoch(7) == 2
+
+    def test_jtis_cacheados_se_invalidan(self):
+        cache = _cache_with_user(epoch=2)
+        cache.remember_valid("jti", 7, time.time() + 60)
+        cache.apply_revocation(7, 2)
+        assert cache.is_valid("jti") is None
+
+    def test_sin_epoch_invalida(self):
+        cache = _cache_with_user()
+        cache.apply_revocation(7)
+        assert cache.get_principal(7) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,63 @@
+"""
+Pruebas unitarias para el matcher de rutas de Api.url_api
+"""
+
+import pytest
+from app.auth.route_matcher import RouteMatcher, split_path
+
+
+@pytest.fixture
+def matcher():
+    return RouteMatcher.from_entries([
+        (4, "/api/v1/usuarios", 2),
+        (5, "/api/v1/usuarios", 3),
+        (6, "/api/v1/usuarios/{id}", 4),
+        (7, "/api/v1/usuarios/{id}", 5),
+        (8, "/api/v1/usuarios/me", 2),
+        (1, "/api/v1/auth/login", 1),
+        (20, "/api/v1/archivos/**", None),
+        (21, "/api/v1/roles/*/permisos", 2),
+    ])
+
+
+class TestRouteMatcher:
+    """Pruebas de resolución por ruta y método"""
+
+    def test_split_path(self):
+        assert split_path("/api//v1/usuarios/?x=1") == ["api", "v1", "usuarios"]
+
+    def test_estatico_por_metodo(self, matcher):
+        assert matcher.match("GET", "/api/v1/usuarios") == {4}
+        assert matcher.match("post", "/api/v1/usuarios/") == {5}
+        assert matcher.match("PATCH", "/api/v1/usuarios") == frozenset()
+
+    def test_parametro(self, matcher):
+        assert matcher.match("PUT", "/api/v1/usuarios/15") == {6}
+        assert matcher.match("DELETE", "/api/v1/usuarios/15") == {7}
+        assert matcher.match("GET", "/api/v1/roles/3/permisos") == {21}
+
+    def test_estatico_tiene_prioridad(self, matcher):
+        assert matcher.match("GET", "/api/v1/usuarios/me") == {8}
+        # Sin handler estático para DELETE se retrocede al parámetro
+        assert matcher.match("DELETE", "/api/v1/usuarios/me") == {7}
+
+    def test_cualquier_metodo(self, matcher):
+        assert matcher.match("POST", "/api/v1/auth/login") == {1}
+        assert matcher.match("GET", "/api/v1/auth/login") == {1}
+
+    def test_comodin_final(self, matcher):
+        assert matcher.match("GET", "/api/v1/archivos") == {20}
+        assert matcher.match("GET", "/api/v1/archivos/a/b/c.pdf") == {20}
+        assert matcher.match("GET", "/api/v1/otros") == frozenset()
+
+    def test_reemplazar_y_eliminar(self, matcher):
+        matcher.add(4, "/api/v1/usuarios/lista", 2)
+        assert matcher.match("GET", "/api/v1/usuarios") == frozenset()
+        assert matcher.match("GET", "/api/v1/usuarios/lista") == {4}
+        matcher.remove(4)
+        assert 4 not in matcher
+        assert matcher.match("GET", "/api/v1/usuarios/lista") == frozenset()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,192 @@
+"""
+Pruebas del scheduler (líder único) y de la limpieza de tokens por lotes
+"""
+
+import asyncio
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+from app.core.scheduler import LeaderLock, SchedulerRunner, scheduler
+from app.models.refresh_token import RefreshToken
+from app.utils.cleanup_tokens import TokenCleanup, token_cleanups
+import app.utils.login_log_partitions  # registra el job de particiones
+
+
+class _Result:
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+
+
+class FakeSession:
+    def __init__(self, log, counts):
+        self.log = log
+        self.counts = counts
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, *args, **kwargs):
+        self.log.append(statement)
+        return _Result(self.counts.pop(0))
+
+    async def commit(self):
+        self.log.append("commit")
+
+
+class FakeConnection:
+    """Conexión dedicada del lock: responde ``acquired`` a la sentencia de obtención"""
+
+    def __init__(self, log, acquired):
+        self.log = log
+        self.acquired = acquired
+        self.closed = False
+
+    async def execution_options(self, **kwargs):
+        return self
+
+    async def execute(self, statement, params=None):
+        self.log.append((str(statement), params))
+        return type("Result", (), {"scalar": lambda _: self.acquired})()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBind:
+    def __init__(self, dialect, acquired=1):
+        self.dialect = type("Dialect", (), {"name": dialect})
+        self.log = []
+        self.acquired = acquired
+        self.connections = []
+
+    async def connect(self):
+        conn = FakeConnection(self.log, self.acquired)
+        self.connections.append(conn)
+        return conn
+
+
+class FakeLock:
+    def __init__(self, acquire=True):
+        self.acquire = acquire
+        self.alive = True
+        self.held = False
+
+    async def try_acquire(self):
+        self.held = self.acquire
+        return self.acquire
+
+    async def is_alive(self):
+        return self.alive
+
+    async def release(self):
+        self.held = False
+
+
+class TestLimpiezaPorLotes:
+    """Lotes acotados, una transacción por lote y métricas de filas/s"""
+
+    def _cleanup(self, counts, dialect="postgresql"):
+        log = []
+        cleanup = TokenCleanup(RefreshToken, session_factory=lambda: FakeSession(log, counts), dialect=dialect)
+        return cleanup, log
+
+    def test_lotes_hasta_vaciar(self):
+        cleanup, log = self._cleanup([3, 3, 1])
+        deleted = asyncio.run(cleanup.run(batch_size=3, pause_ms=0))
+        assert deleted == 7
+        assert log.count("commit") == 3
+        stats = cleanup.stats()
+        assert stats["last_batches"] == 3
+        assert stats["deleted"] == 7
+        assert stats["rows_per_second"] > 0
+
+    def test_sentencia_acotada_y_sin_bloqueos(self):
+        cleanup, log = self._cleanup([0])
+        asyncio.run(cleanup.run(batch_size=5000, pause_ms=0))
+        sql = str(log[0].compile(dialect=postgresql.dialect()))
+        assert sql.startswith("DELETE FROM refresh_tokens WHERE refresh_tokens.id IN")
+        assert "LIMIT" in sql
+        assert "FOR UPDATE SKIP LOCKED" in sql
+
+    def test_sentencia_mysql_en_tabla_derivada(self):
+        """Sin LIMIT directo en el IN ni lectura de la tabla borrada (errores 1235 y 1093)"""
+        cleanup, log = self._cleanup([0], dialect="mysql")
+        asyncio.run(cleanup.run(batch_size=5000, pause_ms=0))
+        sql = " ".join(str(log[0].compile(dialect=mysql.dialect())).split())
+        assert sql.startswith("DELETE FROM refresh_tokens WHERE refresh_tokens.id IN (SELECT expired.id FROM (SELECT")
+        assert ") AS expired)" in sql
+        assert "FOR UPDATE" not in sql
+
+    def test_error_no_propaga(self):
+        def broken():
+            raise RuntimeError("BD caída")
+        cleanup = TokenCleanup(RefreshToken, session_factory=broken)
+        assert asyncio.run(cleanup.run(batch_size=10, pause_ms=0)) == 0
+        assert cleanup.errors == 1
+
+    def test_tablas_limpiadas(self):
+        assert set(token_cleanups) == {"access_tokens", "refresh_tokens", "password_reset_tokens"}
+
+
+class TestLider:
+    """Solo el worker con el lock ejecuta los jobs"""
+
+    def test_sqlite_es_lider(self):
+        bind = type("Bind", (), {"dialect": type("Dialect", (), {"name": "sqlite"})})
+        lock = LeaderLock(1, bind=bind)
+        assert asyncio.run(lock.try_acquire())
+        assert asyncio.run(lock.is_alive())
+        asyncio.run(lock.release())
+        assert not lock.held
+
+    def test_mysql_usa_get_lock(self):
+        bind = FakeBind("mysql")
+        lock = LeaderLock(7, bind=bind)
+        assert asyncio.run(lock.try_acquire())
+        assert bind.log[0] == ("SELECT GET_LOCK(:lock, 0)", {"lock": "scheduler_7"})
+        asyncio.run(lock.release())
+        assert bind.log[-1] == ("SELECT RELEASE_LOCK(:lock)", {"lock": "scheduler_7"})
+        assert bind.connections[0].closed
+
+    def test_mysql_lock_ocupado_no_es_lider(self):
+        bind = FakeBind("mysql", acquired=0)
+        lock = LeaderLock(7, bind=bind)
+        assert not asyncio.run(lock.try_acquire())
+        assert not lock.held
+        assert bind.connections[0].closed
+
+    def test_postgresql_usa_advisory_lock(self):
+        bind = FakeBind("postgresql")
+        assert asyncio.run(LeaderLock(7, bind=bind).try_acquire())
+        assert bind.log[0] == ("SELECT pg_try_advisory_lock(:lock)", {"lock": 7})
+
+    def test_seguidor_no_arranca_jobs(self):
+        runner = SchedulerRunner(FakeLock(acquire=False), retry_seconds=1)
+        asyncio.run(runner.step())
+        assert not runner.leader
+        assert not scheduler.running
+        assert not runner.stats()["leader"]
+
+    def test_lider_arranca_y_pausa_al_perder_el_lock(self):
+        lock = FakeLock()
+        runner = SchedulerRunner(lock, retry_seconds=1)
+
+        async def scenario():
+            await runner.step()
+            assert runner.leader and scheduler.running
+            jobs = {job["id"] for job in runner.stats()["jobs"]}
+            assert {"cleanup_expired_tokens", "login_log_maintenance"} <= jobs
+            lock.alive = False
+            lock.acquire = False
+            await runner.step()
+            assert not runner.leader
+            await runner.stop()
+
+        asyncio.run(scenario())
+        assert not scheduler.running
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,65 @@
+"""
+Pruebas de la búsqueda de texto por motor (app.core.search)
+"""
+
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+from app.core.search import search_condition, search_rank
+
+
+def _sql(expression, dialect):
+    return str(expression.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+class TestCondicion:
+    def test_postgresql_ilike_con_comodines(self, items):
+        compiled = search_condition(items.model, "postgresql", "ana", ["nombre", "email"]).compile(dialect=postgresql.dialect())
+        assert str(compiled).count("ILIKE '%%' ||") == 2
+        assert set(compiled.params.values()) == {"ana"}
+
+    def test_mysql_por_prefijo(self, items):
+        sql = str(search_condition(items.model, "mysql", "ana", ["nombre"]).compile(dialect=mysql.dialect()))
+        assert "LIKE concat(%s, '%%')" in sql
+        assert "concat('%%'" not in sql
+
+    def test_escapa_comodines(self, items):
+        compiled = search_condition(items.model, "postgresql", "50%_x", ["nombre"]).compile(dialect=postgresql.dialect())
+        assert list(compiled.params.values()) == ["50/%/_x"]
+        assert "ESCAPE '/'" in str(compiled)
+
+    def test_sin_campos_o_termino(self, items):
+        assert search_condition(items.model, "postgresql", "ana", ["no_existe"]) is None
+        assert search_condition(items.model, "postgresql", "", ["nombre"]) is None
+
+
+class TestRanking:
+    def test_postgresql_word_similarity(self, items):
+        sql = _sql(search_rank(items.model, "postgresql", "ana", ["nombre", "email"]), postgresql.dialect())
+        assert sql.startswith("greatest(word_similarity('ana', items.nombre)")
+
+    def test_mysql_un_campo_sin_greatest(self, items):
+        sql = _sql(search_rank(items.model, "mysql", "ana", ["nombre"]), mysql.dialect())
+        assert not sql.lower().startswith("greatest")
+        assert "CASE WHEN" in sql
+
+    def test_otros_motores_sin_ranking(self, items):
+        assert search_rank(items.model, "sqlite", "ana", ["nombre"]) is None
+
+
+class TestCRUD:
+    def test_busqueda_sqlite_sin_cambios(self, items):
+        async def scenario(db):
+            rows = await items.crud.search(db, search_term="ANA", search_fields=["nombre", "email"])
+            total = await items.crud.count_with_search(db, search_term="ana", search_fields=["nombre"])
+            return sorted(r.id for r in rows), total
+
+        seed = [
+            {"id": 1, "nombre": "Ana Pérez", "email": "ana@x.com"},
+            {"id": 2, "nombre": "Juana", "email": None},
+            {"id": 3, "nombre": "Luis", "email": "luis@x.com"},
+        ]
+        assert items.run(scenario, seed=seed) == ([1, 2], 2)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,33 @@
+"""
+Pruebas unitarias para el hash de contraseñas fuera del event loop
+"""
+
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.core import security
+from app.core.config import settings
+
+
+class TestPasswordHashExecutor:
+    """Pruebas para el pool acotado de bcrypt"""
+
+    def test_hash_y_verificacion(self):
+        async def run():
+            hashed = await security.get_password_hash_async("Secreta123")
+            assert await security.verify_password_async("Secreta123", hashed)
+            assert not await security.verify_password_async("Otra123", hashed)
+
+        asyncio.run(run())
+
+    def test_rechaza_con_503_si_la_cola_esta_llena(self, monkeypatch):
+        limit = settings.password_hash_workers + settings.password_hash_queue_limit
+        monkeypatch.setattr(security, "_hash_pending", limit)
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(security.verify_password_async("x", "y"))
+        assert exc.value.status_code == 503
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,81 @@
+"""
+Pruebas del contexto de sesión (IP, user agent, dispositivo, ubicación)
+"""
+
+import pytest
+from starlette.requests import Request
+from app.utils import GeoIp2
+
+CHROME = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+def _request(ip: str = "10.0.0.1", forwarded: str | None = None) -> Request:
+    headers = [(b"user-agent", CHROME.encode())]
+    if forwarded:
+        headers.append((b"x-forwarded-for", forwarded.encode()))
+    return Request({"type": "http", "headers": headers, "client": (ip, 1234), "state": {}})
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+
+    def fake_lookup(ip):
+        calls.append(ip)
+        return f"ubicacion de {ip}"
+
+    GeoIp2._location_cache.clear()
+    monkeypatch.setattr(GeoIp2, "_lookup_location", fake_lookup)
+    return calls
+
+
+class TestSessionContext:
+    """Cada pieza se calcula una sola vez por request"""
+
+    def test_contexto(self, lookups):
+        context = GeoIp2.get_session_context(_request(forwarded="200.1.2.3, 10.0.0.1"))
+        assert context.ip == "200.1.2.3"
+        assert context.user_agent["browser"].startswith("Chrome")
+        assert context.location == "ubicacion de 200.1.2.3"
+        assert len(context.device_id) == 64
+
+    def test_memoizado_en_request(self, lookups, monkeypatch):
+        request = _request()
+        parses = []
+        original = GeoIp2.user_agent_fingerprint
+        monkeypatch.setattr(GeoIp2, "user_agent_fingerprint", lambda h: parses.append(h) or original(h))
+        first = GeoIp2.get_session_context(request)
+        assert GeoIp2.create_id_device(request) == first.device_id
+        assert GeoIp2.get_session_context(request) is first
+        assert len(parses) == 1
+        assert lookups == ["10.0.0.1"]
+
+    def test_cache_de_ubicacion(self, lookups):
+        before = GeoIp2.geoip_cache_stats()
+        for _ in range(3):
+            GeoIp2.get_session_context(_request(ip="200.1.2.3"))
+        assert lookups == ["200.1.2.3"]
+        stats = GeoIp2.geoip_cache_stats()
+        assert stats["hits"] - before["hits"] == 2
+        assert stats["misses"] - before["misses"] == 1
+
+
+    def test_cache_de_user_agent(self, monkeypatch):
+        parses = []
+        original = GeoIp2._parse_user_agent
+        monkeypatch.setattr(GeoIp2, "_parse_user_agent", lambda h: parses.append(h) or original(h))
+        GeoIp2._user_agent_cache.clear()
+        first, device_id = GeoIp2.user_agent_fingerprint(CHROME)
+        first["browser"] = "modificado"
+        second, same_device_id = GeoIp2.user_agent_fingerprint(CHROME)
+        assert len(parses) == 1
+        assert second["browser"].startswith("Chrome")
+        assert same_device_id == device_id == GeoIp2.device_id_from_user_agent(second)
+        assert GeoIp2.user_agent_fingerprint("curl/8.0")[1] != device_id
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
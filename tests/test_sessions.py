@@ -0,0 +1,52 @@
+"""
+Pruebas del registro de sesiones activas por dispositivo
+"""
+
+import asyncio
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+from app.auth.sessions import SessionService
+from app.models.access_token import AccessToken
+from app.models.refresh_token import RefreshToken
+
+
+def _sql(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class TestSesiones:
+    """Listado y cierre de sesiones como sentencias únicas e indexadas"""
+
+    def test_indices_en_table_args(self):
+        refresh = {i.name: [c.name for c in i.columns] for i in RefreshToken.__table__.indexes}
+        assert refresh["ix_refresh_tokens_user_device_active"] == ["user_id", "device_id", "is_revoked"]
+        assert "ix_refresh_tokens_exp" in refresh
+        access = {i.name for i in AccessToken.__table__.indexes}
+        assert {"ix_access_tokens_user_active", "ix_access_tokens_exp"} <= access
+
+    def test_listar_sesiones(self, recording_session):
+        db = recording_session([("device", "127.0.0.1", {}, None, None)])
+        sessions = asyncio.run(SessionService.list_sessions(db, user_id=7))
+        assert len(sessions) == 1
+        sql = _sql(db.statements[0])
+        assert "refresh_tokens.user_id = %(user_id_1)s" in sql
+        assert "refresh_tokens.is_revoked = false" in sql
+        assert "ORDER BY refresh_tokens.created_at DESC" in sql
+
+    def test_cerrar_sesion(self, recording_session):
+        db = recording_session([(1,)])
+        assert asyncio.run(SessionService.revoke_session(db, user_id=7, device_id="device"))
+        sql = _sql(db.statements[0])
+        assert sql.startswith("DELETE FROM refresh_tokens")
+        assert "refresh_tokens.user_id" in sql and "refresh_tokens.device_id" in sql
+        assert "RETURNING" not in sql
+        # Sin RETURNING la misma sentencia vale en MySQL
+        assert "RETURNING" not in str(db.statements[0].compile(dialect=mysql.dialect()))
+
+    def test_cerrar_sesion_inexistente(self, recording_session):
+        db = recording_session()
+        assert not asyncio.run(SessionService.revoke_session(db, user_id=7, device_id="otro"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,95 @@
+"""
+Pruebas unitarias para la firma de JWT (HS256 / ES256 / EdDSA) y el JWKS
+"""
+
+import json
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from app.auth import signing
+from app.auth.signing import load_keyring
+from app.core.config import settings
+
+
+def _write_private(path, private_key):
+    path.write_bytes(private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    ))
+
+
+def _write_public(path, private_key):
+    path.write_bytes(private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    ))
+
+
+@pytest.fixture
+def keys_dir(tmp_path, monkeypatch):
+    old = ec.generate_private_key(ec.SECP256R1())
+    _write_public(tmp_path / "k1.pub.pem", old)
+    _write_private(tmp_path / "k2.pem", ec.generate_private_key(ec.SECP256R1()))
+    _write_private(tmp_path / "k3.pem", ed25519.Ed25519PrivateKey.generate())
+    monkeypatch.setattr(settings, "jwt_keys_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "jwt_active_kid", "k2")
+    return tmp_path, old
+
+
+class TestKeyRing:
+    """Pruebas del keyring"""
+
+    def test_hs256_por_defecto(self):
+        ring = signing.keyring
+        assert not ring.is_asymmetric
+        token = ring.encode({"sub": "1"})
+        assert "kid" not in jwt.get_unverified_header(token)
+        assert ring.decode(token)["sub"] == "1"
+        assert json.loads(ring.jwks_body) == {"keys": []}
+
+    def test_es256_con_kid(self, keys_dir):
+        ring = load_keyring()
+        token = ring.encode({"sub": "1"})
+        header = jwt.get_unverified_header(token)
+        assert header["kid"] == "k2"
+        assert header["alg"] == "ES256"
+        assert ring.decode(token)["sub"] == "1"
+
+    def test_verifica_llave_retirada(self, keys_dir):
+        tmp_path, old = keys_dir
+        token = jwt.encode({"sub": "1"}, old, algorithm="ES256", headers={"kid": "k1"})
+        assert load_keyring().decode(token)["sub"] == "1"
+
+    def test_eddsa(self, keys_dir, monkeypatch):
+        monkeypatch.setattr(settings, "jwt_active_kid", "k3")
+        ring = load_keyring()
+        token = ring.encode({"sub": "1"})
+        assert jwt.get_unverified_header(token)["alg"] == "EdDSA"
+        assert ring.decode(token)["sub"] == "1"
+
+    def test_rechaza_kid_desconocido_y_hs256(self, keys_dir):
+        ring = load_keyring()
+        with pytest.raises(jwt.InvalidTokenError):
+            ring.decode(jwt.encode({"sub": "1"}, "x" * 32, algorithm="HS256", headers={"kid": "zz"}))
+        # Un token HS256 con kid válido no debe aceptarse (confusión de algoritmo)
+        with pytest.raises(jwt.InvalidTokenError):
+            ring.decode(jwt.encode({"sub": "1"}, "x" * 32, algorithm="HS256", headers={"kid": "k2"}))
+
+    def test_jwks(self, keys_dir):
+        ring = load_keyring()
+        keys = {k["kid"]: k for k in json.loads(ring.jwks_body)["keys"]}
+        assert set(keys) == {"k1", "k2", "k3"}
+        assert keys["k2"]["alg"] == "ES256" and keys["k2"]["kty"] == "EC"
+        assert keys["k3"]["alg"] == "EdDSA" and keys["k3"]["kty"] == "OKP"
+        assert "d" not in keys["k2"]
+
+    def test_kid_activo_invalido(self, keys_dir, monkeypatch):
+        monkeypatch.setattr(settings, "jwt_active_kid", "k1")
+        with pytest.raises(RuntimeError):
+            load_keyring()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
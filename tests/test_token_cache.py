@@ -0,0 +1,123 @@
+"""
+Pruebas unitarias para el cache de revocación de access tokens
+"""
+
+import time
+import pytest
+from app.utils.cache import LRUTTLCache
+from app.auth.token_cache import AccessTokenCache
+from app.models.usuario import Usuario
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLRUTTLCache:
+    """Pruebas para el cache LRU con expiración"""
+
+    def test_hit_y_miss(self):
+        cache = LRUTTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_expiracion(self):
+        clock = FakeClock()
+        cache = LRUTTLCache(maxsize=10, ttl=5, clock=clock)
+        cache.set("a", 1)
+        clock.now += 6
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_desaloja_menos_reciente(self):
+        cache = LRUTTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.stats()["evictions"] == 1
+
+
+class TestAccessTokenCache:
+    """Pruebas para la invalidación de jtis"""
+
+    def test_jti_valido_hasta_exp(self):
+        cache = AccessTokenCache(max_tokens=10, max_users=10, user_ttl=30)
+        cache.remember_valid("jti-1", 1, time.time() + 60)
+        assert cache.is_valid("jti-1") is True
+        assert cache.is_valid("jti-2") is None
+
+    def test_revocar_jti(self):
+        cache = AccessTokenCache(max_tokens=10, max_users=10, user_ttl=30)
+        cache.remember_valid("jti-1", 1, time.time() + 60)
+        cache.revoke("jti-1")
+        assert cache.is_valid("jti-1") is None
+
+    def test_revocar_usuario(self):
+        cache = AccessTokenCache(max_tokens=10, max_users=10, user_ttl=30)
+        cache.remember_valid("jti-1", 1, time.time() + 60)
+        cache.remember_valid("jti-2", 1, time.time() + 60)
+        cache.remember_valid("jti-3", 2, time.time() + 60)
+        cache.revoke_user(1)
+        assert cache.is_valid("jti-1") is None
+        assert cache.is_valid("jti-2") is None
+        assert cache.is_valid("jti-3") is True
+
+    def test_no_cachea_justo_despues_de_revocar(self):
+        cache = AccessTokenCache(max_tokens=10, max_users=10, user_ttl=30)
+        cache.revoke_user(1)
+        cache.remember_valid("jti-1", 1, time.time() + 60)
+        assert cache.is_valid("jti-1") is None
+
+    def test_jti_revocado_negativo(self):
+        cache = AccessTokenCache(max_tokens=10, max_users=10, user_ttl=30)
+        cache.remember_revoked("jti-1", time.time() + 60)
+        assert cache.is_valid("jti-1") is False
+
+    def test_snapshot_principal(self):
+        cache = AccessTokenCache(max_tokens=10, max_users=10, user_ttl=30)
+        cache.remember_principal(
+            Usuario(id=7, username="ana", email="ana@ejemplo.com", activo=1),
+            [(1, "ADMIN", 1)]
+        )
+        user, roles = cache.get_principal(7)
+        assert user.id == 7
+        assert user.username == "ana"
+        assert roles == [(1, "ADMIN", 1)]
+        cache.forget_user(7)
+        assert cache.get_principal(7) is None
+
+    def test_epoch_desde_snapshot(self):
+        cache = AccessTokenCache(max_tokens=10, max_users=10, user_ttl=30)
+        assert cache.get_user_epoch(7) is None
+        cache.remember_principal(Usuario(id=7, username="ana", email="ana@ejemplo.com", token_epoch=3), [])
+        assert cache.get_user_epoch(7) == 3
+        cache.revoke_user(7)
+        assert cache.get_user_epoch(7) is None
+
+
+class TestAccessTokenEpoch:
+    """Pruebas para el claim epc de los tokens sin estado"""
+
+    def test_claim_epc(self):
+        from app.auth.jwt_handler import create_access_token, verify_token
+        token = create_access_token(user_id=1, roles=[], epoch=4)
+        assert verify_token(token["token"])["epc"] == 4
+
+    def test_sin_epoch_no_hay_claim(self):
+        from app.auth.jwt_handler import create_access_token, verify_token
+        token = create_access_token(user_id=1, roles=[])
+        assert "epc" not in verify_token(token["token"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,37 @@
+"""
+Pruebas unitarias para el hash HMAC de refresh/reset tokens
+"""
+
+import bcrypt
+import pytest
+from app.auth.jwt_handler import hash_token, verify_token_hash
+from app.core.config import settings
+
+
+class TestTokenHash:
+    """Pruebas para hash_token y verify_token_hash"""
+
+    def test_hash_determinista_de_64_caracteres(self):
+        digest = hash_token("token-de-prueba")
+        assert len(digest) == 64
+        assert digest == hash_token("token-de-prueba")
+        assert digest != hash_token("otro-token")
+
+    def test_verifica_hmac(self):
+        digest = hash_token("token-de-prueba")
+        assert verify_token_hash("token-de-prueba", digest)
+        assert not verify_token_hash("otro-token", digest)
+
+    def test_acepta_bcrypt_heredado(self):
+        legacy = bcrypt.hashpw(b"token-de-prueba", bcrypt.gensalt(rounds=4)).decode()
+        assert verify_token_hash("token-de-prueba", legacy)
+        assert not verify_token_hash("otro-token", legacy)
+
+    def test_rechaza_bcrypt_fuera_de_ventana(self, monkeypatch):
+        monkeypatch.setattr(settings, "token_hash_accept_bcrypt", False)
+        legacy = bcrypt.hashpw(b"token-de-prueba", bcrypt.gensalt(rounds=4)).decode()
+        assert not verify_token_hash("token-de-prueba", legacy)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
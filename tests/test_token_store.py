@@ -0,0 +1,161 @@
+"""
+Pruebas del almacén de tokens en memoria y de la selección de backend
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import pytest
+from app.auth.jwt_handler import hash_token
+from app.auth.token_store import MemoryTokenStore, SQLTokenStore, create_token_store
+from app.core.config import settings
+from app.utils.GeoIp2 import SessionContext
+
+EXPIRES = datetime.now(timezone.utc) + timedelta(days=1)
+
+
+def _session(device_id="device"):
+    return SessionContext(ip="127.0.0.1", user_agent={"browser": "x"}, device_id=device_id)
+
+
+def _tokens(token="refresh"):
+    access = {"jti": str(uuid4()), "expires_at": EXPIRES}
+    refresh = {"jti": str(uuid4()), "token": token, "expires_at": EXPIRES}
+    return access, refresh
+
+
+def _login(store, user_id=1, device_id="device", token="refresh"):
+    access, refresh = _tokens(token)
+    asyncio.run(store.persist_login(None, user_id=user_id, access_token=access,
+                                    refresh_token=refresh, session=_session(device_id)))
+    return access, refresh
+
+
+def _rotate(store, refresh, user_id=1, token="siguiente"):
+    access, successor = _tokens(token)
+    used = asyncio.run(store.rotate_refresh_token(
+        None, user_id=user_id, token_jti=refresh["jti"], token_hash=hash_token(refresh["token"]),
+        access_token=access, refresh_token=successor, session=_session("otro"),
+    ))
+    return used, access, successor
+
+
+@pytest.fixture(autouse=True)
+def stateful(monkeypatch):
+    monkeypatch.setattr(settings, "access_token_mode", "stateful")
+
+
+class TestLogin:
+    """El login guarda ambos tokens y reemplaza la sesión del dispositivo"""
+
+    def test_access_token_vigente(self):
+        store = MemoryTokenStore()
+        access, _ = _login(store)
+        assert asyncio.run(store.access_token_state(None, user_id=1, jti=access["jti"])) is True
+        assert asyncio.run(store.access_token_state(None, user_id=2, jti=access["jti"])) is None
+
+    def test_revoca_sesion_previa_del_dispositivo(self):
+        store = MemoryTokenStore()
+        _, first = _login(store)
+        _login(store)
+        _login(store, device_id="tablet")
+        sessions = asyncio.run(store.list_sessions(None, 1))
+        assert sorted(s.device_id for s in sessions) == ["device", "tablet"]
+        assert asyncio.run(store.refresh_revoked_at(None, user_id=1, token_jti=first["jti"])) is not None
+
+    def test_modo_epoch_no_guarda_access_token(self, monkeypatch):
+        monkeypatch.setattr(settings, "access_token_mode", "epoch")
+        store = MemoryTokenStore()
+        access, _ = _login(store)
+        assert asyncio.run(store.access_token_state(None, user_id=1, jti=access["jti"])) is None
+
+
+class TestRotacion:
+    """Se consume una sola vez y el sucesor conserva el dispositivo"""
+
+    def test_rota_y_conserva_device_id(self):
+        store = MemoryTokenStore()
+        _, refresh = _login(store)
+        used, _, successor = _rotate(store, refresh)
+        assert used.device_id == "device"
+        assert [s.device_id for s in asyncio.run(store.list_sessions(None, 1))] == ["device"]
+        assert _rotate(store, successor, token="otro")[0] is not None
+
+    def test_reutilizacion_no_crea_sucesor(self):
+        store = MemoryTokenStore()
+        _, refresh = _login(store)
+        _rotate(store, refresh)
+        used, access, _ = _rotate(store, refresh)
+        assert used is None
+        assert asyncio.run(store.refresh_revoked_at(None, user_id=1, token_jti=refresh["jti"])) is not None
+        assert asyncio.run(store.access_token_state(None, user_id=1, jti=access["jti"])) is None
+
+    def test_hash_distinto_no_consume(self):
+        store = MemoryTokenStore()
+        _, refresh = _login(store)
+        used = asyncio.run(store.rotate_refresh_token(
+            None, user_id=1, token_jti=refresh["jti"], token_hash=hash_token("falso"),
+            access_token=_tokens()[0], refresh_token=_tokens()[1], session=_session(),
+        ))
+        assert used is None
+        assert asyncio.run(store.refresh_revoked_at(None, user_id=1, token_jti=refresh["jti"])) is None
+
+    def test_otro_usuario_no_consume(self):
+        store = MemoryTokenStore()
+        _, refresh = _login(store)
+        assert _rotate(store, refresh, user_id=2)[0] is None
+
+    def test_token_expirado(self):
+        now = [EXPIRES.timestamp() + 1]
+        store = MemoryTokenStore(clock=lambda: now[0])
+        _, refresh = _login(store)
+        assert _rotate(store, refresh)[0] is None
+        store.prune()
+        assert store.stats()["refresh_tokens"] == 0
+
+
+class TestRevocacion:
+    def test_revocar_por_usuario(self):
+        store = MemoryTokenStore()
+        access, refresh = _login(store)
+        _login(store, user_id=2)
+        asyncio.run(store.revoke_access_tokens_by_user(None, 1))
+        asyncio.run(store.revoke_refresh_tokens_by_user(None, 1))
+        assert asyncio.run(store.access_token_state(None, user_id=1, jti=access["jti"])) is False
+        assert asyncio.run(store.list_sessions(None, 1)) == []
+        assert len(asyncio.run(store.list_sessions(None, 2))) == 1
+
+    def test_cerrar_sesion_elimina_sin_marcar_reutilizacion(self):
+        store = MemoryTokenStore()
+        _, refresh = _login(store)
+        assert asyncio.run(store.delete_session(None, 1, "device"))
+        assert not asyncio.run(store.delete_session(None, 1, "device"))
+        assert asyncio.run(store.refresh_revoked_at(None, user_id=1, token_jti=refresh["jti"])) is None
+
+
+class TestResetTokens:
+    def test_guardar_y_usar(self):
+        store = MemoryTokenStore()
+        asyncio.run(store.save_reset_token(None, user_id=1, jti="r1", token_hash="h",
+                                           expires_at=EXPIRES, ip_address=None, user_agent=None))
+        record = asyncio.run(store.get_reset_token(None, "r1"))
+        assert (record.user_id, record.token_hash, record.used_at) == (1, "h", None)
+        asyncio.run(store.use_reset_tokens_by_user(None, 1))
+        assert asyncio.run(store.get_reset_token(None, "r1")).used_at is not None
+        assert asyncio.run(store.get_reset_token(None, "otro")) is None
+
+
+class TestBackend:
+    def test_seleccion(self):
+        assert isinstance(create_token_store("sql"), SQLTokenStore)
+        assert isinstance(create_token_store("memory"), MemoryTokenStore)
+        assert create_token_store("sql").joins_principal
+        assert not create_token_store("memory").joins_principal
+
+    def test_backend_desconocido(self):
+        with pytest.raises(ValueError):
+            create_token_store("cassandra")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])